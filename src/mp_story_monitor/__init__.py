@@ -8,6 +8,7 @@ from .tracker import (
     DEFAULT_PHASE_ORDER,
     write_progress_error,
 )
+from .proxy import TrackerProxy
 
 __all__ = [
     "ProgressTracker",
@@ -16,4 +17,5 @@ __all__ = [
     "VIEWER_HTML_FILENAME",
     "DEFAULT_PHASE_ORDER",
     "write_progress_error",
+    "TrackerProxy",
 ]
@@ -0,0 +1,283 @@
+"""Index of a story's asset output files by slug, for reset lookups.
+
+AssetIndex maps each output file's stem slug to its path, type, size and mtime. It is built
+with one os.scandir pass over the story (only files with an output extension or a "_muxed"
+name are stat'ed, hidden and tool directories are skipped)
+and refreshed incrementally: every directory's mtime is recorded, and a refresh only
+re-lists directories whose mtime changed (creating, deleting or renaming a file in a
+directory bumps it). Directories changed within the last second are always re-listed, so
+coarse filesystem timestamps cannot hide a second change in the same tick.
+
+The index is persisted as _asset_index.json in the story folder, so a new process starts
+from it instead of a full walk. index_for(story_path) returns the process-wide instance.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from mp_story_monitor.atomic import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
+
+ASSET_INDEX_FILENAME = "_asset_index.json"
+ASSET_INDEX_FORMAT = 2
+# Stories whose index index_for() keeps in memory (least recently used dropped first; an
+# index is persisted, so a dropped one reloads from _asset_index.json). Same bound as the
+# server's watched stories.
+ASSET_INDEX_MAX_STORIES = 64
+# Directory mtimes this recent are not trusted to cover later changes in the same tick
+_RACY_WINDOW_NS = 1_000_000_000
+
+# Extensions by asset type
+ASSET_EXTENSIONS: Dict[str, Set[str]] = {
+    "image": {".png", ".jpg", ".jpeg", ".webp"},
+    "audio": {".wav", ".mp3", ".flac"},
+    "video": {".mp4", ".webm", ".mov"},
+    "text": {".txt"},
+}
+_TYPE_BY_EXT = {ext: kind for kind, exts in ASSET_EXTENSIONS.items() for ext in exts}
+# Muxed variants ("<name>_muxed.<ext>") are indexed whatever their extension, as video
+_MUXED_MARKER = "_muxed"
+
+
+# Directories never holding outputs: hidden ones (.git, .trash, ...) and tool caches
+_PRUNED_DIR_NAMES = frozenset({"node_modules", "__pycache__"})
+
+
+def is_pruned_dir(name: str) -> bool:
+    """True for directory names that story walks skip."""
+    return name.startswith(".") or name in _PRUNED_DIR_NAMES
+
+
+def _file_type(name: str) -> Optional[str]:
+    """ASSET_EXTENSIONS key for an indexed output file name, None if it is not indexed."""
+    kind = _TYPE_BY_EXT.get(os.path.splitext(name)[1].lower())
+    if kind is None and _MUXED_MARKER in name:
+        return "video"
+    return kind
+
+
+def asset_slug(name: str) -> str:
+    """Normalize asset name to match production's slug logic."""
+    return name.lower().replace("_", "-").replace(" ", "-")
+
+
+@dataclass(frozen=True)
+class AssetFile:
+    path: Path
+    type: str  # key of ASSET_EXTENSIONS
+    size: int
+    mtime_ns: int
+
+
+class _DirRecord:
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self, mtime_ns: int, files: Dict[str, Tuple[int, int]], subdirs: List[str]):
+        self.mtime_ns = mtime_ns
+        self.files = files  # name -> (size, mtime_ns), output extensions only
+        self.subdirs = subdirs  # child directory names
+
+
+def _join(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+class AssetIndex:
+    """Slug -> output files under story_path, kept current by directory mtime."""
+
+    def __init__(self, story_path: Path, *, persist: bool = True):
+        self.story_path = Path(story_path)
+        self.persist = persist
+        self.index_path = self.story_path / ASSET_INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._dirs: Dict[str, _DirRecord] = {}
+        self._by_slug: Dict[str, Set[str]] = {}  # stem slug -> relative paths
+        self._loaded = False
+        self.dirs_scanned = 0  # directories re-listed by the last refresh
+
+    # -- slug map maintenance -------------------------------------------------
+
+    def _add_files(self, rel_dir: str, names: Iterable[str]) -> None:
+        for name in names:
+            self._by_slug.setdefault(asset_slug(os.path.splitext(name)[0]), set()).add(_join(rel_dir, name))
+
+    def _remove_files(self, rel_dir: str, names: Iterable[str]) -> None:
+        for name in names:
+            slug = asset_slug(os.path.splitext(name)[0])
+            paths = self._by_slug.get(slug)
+            if paths is not None:
+                paths.discard(_join(rel_dir, name))
+                if not paths:
+                    del self._by_slug[slug]
+
+    def _drop_dir(self, rel_dir: str) -> None:
+        record = self._dirs.pop(rel_dir, None)
+        if record is None:
+            return
+        self._remove_files(rel_dir, record.files)
+        for sub in record.subdirs:
+            self._drop_dir(_join(rel_dir, sub))
+
+    # -- persistence ----------------------------------------------------------
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not self.persist:
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("format") != ASSET_INDEX_FORMAT:
+            return
+        try:
+            for rel_dir, (mtime_ns, files, subdirs) in data["dirs"].items():
+                record = _DirRecord(int(mtime_ns), {n: (int(s), int(m)) for n, s, m in files}, list(subdirs))
+                self._dirs[rel_dir] = record
+                self._add_files(rel_dir, record.files)
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Ignoring unreadable asset index {self.index_path}")
+            self._dirs.clear()
+            self._by_slug.clear()
+
+    def _save(self) -> None:
+        data = {
+            "format": ASSET_INDEX_FORMAT,
+            "dirs": {
+                rel_dir: [r.mtime_ns, [[n, s, m] for n, (s, m) in r.files.items()], r.subdirs]
+                for rel_dir, r in self._dirs.items()
+            },
+        }
+        try:
+            atomic_write_bytes(self.index_path, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"Failed to save asset index {self.index_path}: {e}")
+
+    # -- refresh --------------------------------------------------------------
+
+    def _scan_dir(self, rel_dir: str, path: str, mtime_ns: int) -> bool:
+        """Re-list one directory; return True if its files or subdirectories changed."""
+        files: Dict[str, Tuple[int, int]] = {}
+        subdirs: List[str] = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not is_pruned_dir(entry.name):
+                            subdirs.append(entry.name)
+                    elif _file_type(entry.name) is not None:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        files[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            self._drop_dir(rel_dir)
+            return True
+        self.dirs_scanned += 1
+        old = self._dirs.get(rel_dir)
+        if time.time_ns() - mtime_ns < _RACY_WINDOW_NS:
+            mtime_ns = -1  # re-list next time as well
+        if old is not None:
+            for sub in set(old.subdirs) - set(subdirs):
+                self._drop_dir(_join(rel_dir, sub))
+            changed = old.files != files or old.subdirs != subdirs
+            self._remove_files(rel_dir, old.files)
+        else:
+            changed = True
+        self._dirs[rel_dir] = _DirRecord(mtime_ns, files, subdirs)
+        self._add_files(rel_dir, files)
+        return changed
+
+    def _refresh_dir(self, rel_dir: str, path: str) -> bool:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            had = rel_dir in self._dirs
+            self._drop_dir(rel_dir)
+            return had
+        changed = False
+        record = self._dirs.get(rel_dir)
+        if record is None or record.mtime_ns != mtime_ns:
+            changed = self._scan_dir(rel_dir, path, mtime_ns)
+            record = self._dirs.get(rel_dir)
+            if record is None:
+                return changed
+        # A change inside a subdirectory does not touch this directory's mtime
+        for sub in record.subdirs:
+            changed |= self._refresh_dir(_join(rel_dir, sub), os.path.join(path, sub))
+        return changed
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the story folder (re-lists changed directories only)."""
+        with self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        if not self._loaded:
+            self._load()
+        self.dirs_scanned = 0
+        if self._refresh_dir("", str(self.story_path)) and self.persist and self.story_path.is_dir():
+            self._save()
+
+    # -- queries --------------------------------------------------------------
+
+    def lookup(
+        self, slug: str, exts: Optional[Set[str]] = None, *, refresh: bool = True, include_empty: bool = False
+    ) -> List[AssetFile]:
+        """Non-empty output files whose stem slug contains slug, optionally limited to exts.
+
+        Matches are re-stat'ed, so a file rewritten or removed since the last refresh is
+        reported as it is now. include_empty also reports empty files.
+        """
+        with self._lock:
+            if refresh:
+                self._refresh_locked()
+            # Substring match (as production names outputs "<prefix>_<slug>-<suffix>"): one pass
+            # over the distinct slugs in memory, no filesystem access
+            rel_paths = sorted(p for key, paths in self._by_slug.items() if slug in key for p in paths)
+        found = []
+        for rel in rel_paths:
+            ext = os.path.splitext(rel)[1].lower()
+            if exts is not None and ext not in exts:
+                continue
+            path = self.story_path / rel
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_size == 0 and not include_empty:
+                continue
+            found.append(AssetFile(path, _file_type(rel), st.st_size, st.st_mtime_ns))
+        return found
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(r.files) for r in self._dirs.values())
+
+
+_indexes: "OrderedDict[str, AssetIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def index_for(story_path: Path) -> AssetIndex:
+    """The process-wide AssetIndex for a story folder (at most ASSET_INDEX_MAX_STORIES kept)."""
+    key = str(Path(story_path).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = AssetIndex(Path(key))
+            while len(_indexes) > ASSET_INDEX_MAX_STORIES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
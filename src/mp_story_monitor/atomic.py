@@ -0,0 +1,61 @@
+"""Atomic publishing of state files: readers never observe a half-written document."""
+from __future__ import annotations
+
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+# Contract: key holding the monotonically increasing snapshot version in JSON state files
+VERSION_KEY = "version"
+
+
+def _fsync_default() -> bool:
+    return bool(os.environ.get("PROGRESS_FSYNC"))
+
+
+def atomic_write_bytes(path: Path, data: bytes, *, fsync: Optional[bool] = None) -> None:
+    """Publish data at path via temp file + rename in the same directory.
+
+    fsync=None follows the PROGRESS_FSYNC env var. With fsync enabled the file is flushed to
+    disk before the rename and the directory entry afterwards, so the new content survives a
+    crash; without it the rename is still atomic for concurrent readers.
+    """
+    path = Path(path)
+    if fsync is None:
+        fsync = _fsync_default()
+    # os.open with 0o666 (unlike mkstemp's 0o600) keeps the usual umask-derived permissions
+    tmp_name = str(path.parent / f".{path.name}.{uuid.uuid4().hex[:12]}.tmp")
+    fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        try:
+            dir_fd = os.open(str(path.parent), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_text(
+    path: Path, text: str, *, encoding: str = "utf-8", fsync: Optional[bool] = None
+) -> None:
+    """Text variant of atomic_write_bytes."""
+    atomic_write_bytes(path, text.encode(encoding), fsync=fsync)
+
@@ -0,0 +1,427 @@
+"""Load test for serve_progress: simulated viewers polling state files plus reset bursts.
+
+Builds synthetic story folders (progress, director skeleton and media files per scene),
+starts serve_progress --root on them in a subprocess (or targets a running server with
+--url) and drives:
+
+- N viewers, each polling _progress.json and _director_progress.json every interval seconds
+  with If-None-Match, as the viewer page does;
+- every reset_interval seconds, a burst of concurrent POST api/reset-asset requests, each
+  followed until its job is done.
+
+It reports throughput, error / 503 counts and p50/p95/p99 latency per request kind, plus
+the server's own view from api/metrics. Use --max-p99-ms to fail (exit 1) on a regression:
+
+    python -m mp_story_monitor.bench --viewers 200 --duration 60 --max-p99-ms 50
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+VIEWER_POLL_INTERVAL_SEC = 2.0  # matches the viewer page's fallback polling
+POLLED_FILES = ("_progress.json", "_director_progress.json")
+REQUEST_TIMEOUT_SEC = 10.0
+SERVER_START_TIMEOUT_SEC = 10.0
+JOB_WAIT_TIMEOUT_SEC = 30.0
+
+
+def make_synthetic_story(
+    story_path: Path,
+    *,
+    chapters: int = 4,
+    scenes: int = 6,
+    assets_per_scene: int = 4,
+    media_bytes: int = 2048,
+) -> List[str]:
+    """Write a story folder shaped like a pipeline's output; return its asset names."""
+    story_path.mkdir(parents=True, exist_ok=True)
+    assets: List[str] = []
+    skeleton_chapters = []
+    for c in range(1, chapters + 1):
+        skeleton_scenes = []
+        for s in range(scenes):
+            scene_dir = story_path / f"Chapter{c:02d}" / f"scene_{s:02d}"
+            scene_dir.mkdir(parents=True, exist_ok=True)
+            scene_assets = []
+            for a in range(assets_per_scene):
+                name = f"c{c:02d}_s{s:02d}_asset{a:02d}"
+                scene_assets.append({"name": name, "type": "image", "status": "done"})
+                (scene_dir / f"{name}.png").write_bytes(os.urandom(media_bytes))
+                (scene_dir / f"{name}_narration.mp3").write_bytes(os.urandom(media_bytes))
+                assets.append(name)
+            skeleton_scenes.append({"scene_id": f"C{c:02d}_S{s:02d}", "assets": scene_assets})
+        skeleton_chapters.append({"chapter_id": f"C{c:02d}", "scenes": skeleton_scenes})
+    phases = {"reddit": "done", "director": "done", "production": "running", "assembly": "pending"}
+    progress = {
+        "phases": phases,
+        "phase_order": list(phases),
+        "current_step": "Generating scene media",
+        "phase_progress": {"production": {"complete": len(assets) // 2, "total": len(assets)}},
+        "story_path": str(story_path),
+    }
+    director = {"title": story_path.name, "chapters": skeleton_chapters}
+    (story_path / "_progress.json").write_text(json.dumps(progress, indent=2), encoding="utf-8")
+    (story_path / "_director_progress.json").write_text(json.dumps(director, indent=2), encoding="utf-8")
+    return assets
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class KindStats:
+    """Latency samples (seconds) and outcome counts for one kind of request."""
+
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, latency: float, status: int) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict:
+        values = sorted(self.latencies)
+
+        def ms(v: Optional[float]) -> Optional[float]:
+            return round(v * 1000, 3) if v is not None else None
+
+        return {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+            "errors": self.errors,
+            "busy_503": self.statuses.get(503, 0),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "p50_ms": ms(percentile(values, 0.50)),
+            "p95_ms": ms(percentile(values, 0.95)),
+            "p99_ms": ms(percentile(values, 0.99)),
+            "max_ms": ms(values[-1] if values else None),
+        }
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.kinds: Dict[str, KindStats] = {}
+
+    def record(self, kind: str, latency: float, status: int) -> None:
+        with self._lock:
+            self.kinds.setdefault(kind, KindStats()).record(latency, status)
+
+    def error(self, kind: str) -> None:
+        with self._lock:
+            self.kinds.setdefault(kind, KindStats()).errors += 1
+
+
+def _request(
+    host: str, port: int, method: str, path: str, *, body: Optional[bytes] = None, headers: Optional[Dict] = None
+) -> Tuple[int, Dict[str, str], bytes, float]:
+    """One request on a fresh connection (the server closes after each response)."""
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SEC)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        data = resp.read()
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data, time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def _viewer(
+    host: str, port: int, prefix: str, interval: float, deadline: float, recorder: _Recorder, rng: random.Random
+) -> None:
+    etags: Dict[str, str] = {}
+    # Viewers open the page at different times; spread their ticks over one interval
+    next_tick = time.monotonic() + rng.uniform(0, interval)
+    while True:
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if time.monotonic() >= deadline:
+            return
+        for name in POLLED_FILES:
+            headers = {"Accept-Encoding": "gzip"}
+            if name in etags:
+                headers["If-None-Match"] = etags[name]
+            try:
+                status, resp_headers, _, latency = _request(host, port, "GET", prefix + name, headers=headers)
+            except (OSError, http.client.HTTPException):
+                recorder.error(name)
+                continue
+            recorder.record(name, latency, status)
+            if status == 200 and "etag" in resp_headers:
+                etags[name] = resp_headers["etag"]
+        next_tick += interval
+
+
+def _reset_and_wait(host: str, port: int, prefix: str, asset: str, recorder: _Recorder) -> None:
+    body = json.dumps({"asset_name": asset}).encode("utf-8")
+    try:
+        status, _, data, latency = _request(
+            host, port, "POST", prefix + "api/reset-asset", body=body, headers={"Content-Type": "application/json"}
+        )
+    except (OSError, http.client.HTTPException):
+        recorder.error("reset_post")
+        return
+    recorder.record("reset_post", latency, status)
+    if status != 202:
+        return
+    job_path = prefix + json.loads(data)["job"]
+    started = time.perf_counter() - latency
+    deadline = time.monotonic() + JOB_WAIT_TIMEOUT_SEC
+    while time.monotonic() < deadline:
+        try:
+            status, _, data, _ = _request(host, port, "GET", job_path)
+        except (OSError, http.client.HTTPException):
+            status = 0
+        if status == 200 and json.loads(data).get("status") in ("done", "error"):
+            recorder.record("reset_job", time.perf_counter() - started, 200)
+            return
+        time.sleep(0.05)
+    recorder.error("reset_job")
+
+
+def _reset_bursts(
+    host: str,
+    port: int,
+    targets: List[Tuple[str, str]],
+    burst: int,
+    interval: float,
+    deadline: float,
+    recorder: _Recorder,
+    rng: random.Random,
+) -> None:
+    workers: List[threading.Thread] = []
+    next_burst = time.monotonic() + interval / 2
+    while targets:
+        delay = next_burst - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if time.monotonic() >= deadline:
+            break
+        for _ in range(min(burst, len(targets))):
+            prefix, asset = targets.pop(rng.randrange(len(targets)))
+            t = threading.Thread(target=_reset_and_wait, args=(host, port, prefix, asset, recorder), daemon=True)
+            t.start()
+            workers.append(t)
+        next_burst += interval
+    for t in workers:
+        t.join(JOB_WAIT_TIMEOUT_SEC)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(root: Path, port: int, workers: Optional[int], max_in_flight: Optional[int]) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "mp_story_monitor.serve_progress", "--root", str(root), "--port", str(port)]
+    if workers is not None:
+        cmd += ["--workers", str(workers)]
+    if max_in_flight is not None:
+        cmd += ["--max-in-flight", str(max_in_flight)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SEC
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"serve_progress exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"serve_progress did not start listening on port {port}")
+
+
+def _server_metrics(host: str, port: int) -> Optional[Dict]:
+    """Server-side latency percentiles per endpoint from api/metrics (None if unavailable)."""
+    try:
+        status, _, data, _ = _request(host, port, "GET", "/api/metrics?format=json")
+    except (OSError, http.client.HTTPException):
+        return None
+    if status != 200:
+        return None
+    series = json.loads(data).get("http_request_duration_seconds", {}).get("series", [])
+    return {
+        s["labels"].get("endpoint", ""): {"count": s["count"], "p50_s": s["p50"], "p95_s": s["p95"], "p99_s": s["p99"]}
+        for s in series
+    }
+
+
+def run_load(
+    *,
+    url: Optional[str] = None,
+    root: Optional[Path] = None,
+    stories: int = 4,
+    viewers: int = 50,
+    duration: float = 30.0,
+    interval: float = VIEWER_POLL_INTERVAL_SEC,
+    reset_burst: int = 5,
+    reset_interval: float = 10.0,
+    workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    seed: int = 0,
+) -> Dict:
+    """Run one load test and return its report.
+
+    Without url a server is started on synthetic stories under root (a temporary directory
+    if None) and stopped afterwards. With url (e.g. http://host:port/stories/<id>/ or the
+    root of a single-story server) viewers poll that story and no resets are sent, since
+    its assets are unknown.
+    """
+    rng = random.Random(seed)
+    recorder = _Recorder()
+    proc = None
+    tmp = None
+    targets: List[Tuple[str, str]] = []
+    try:
+        if url is None:
+            if root is None:
+                tmp = tempfile.mkdtemp(prefix="mpsm-bench-")
+                root = Path(tmp)
+            prefixes = []
+            for i in range(stories):
+                story_id = f"bench_story_{i:02d}"
+                prefix = f"/stories/{story_id}/"
+                prefixes.append(prefix)
+                targets += [(prefix, a) for a in make_synthetic_story(Path(root) / story_id)]
+            host, port = "127.0.0.1", _free_port()
+            proc = _start_server(Path(root), port, workers, max_in_flight)
+        else:
+            parts = urlsplit(url)
+            host, port = parts.hostname or "127.0.0.1", parts.port or 80
+            prefixes = [parts.path.rstrip("/") + "/"]
+
+        started = time.monotonic()
+        deadline = started + duration
+        threads = [
+            threading.Thread(
+                target=_viewer,
+                args=(host, port, prefixes[i % len(prefixes)], interval, deadline, recorder, random.Random(rng.random())),
+                daemon=True,
+            )
+            for i in range(viewers)
+        ]
+        if reset_burst > 0 and targets:
+            threads.append(threading.Thread(
+                target=_reset_bursts,
+                args=(host, port, targets, reset_burst, reset_interval, deadline, recorder, rng),
+                daemon=True,
+            ))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+        return {
+            "config": {
+                "stories": len(prefixes), "viewers": viewers, "duration_sec": duration, "interval_sec": interval,
+                "reset_burst": reset_burst, "reset_interval_sec": reset_interval,
+                "workers": workers, "max_in_flight": max_in_flight,
+            },
+            "elapsed_sec": round(elapsed, 3),
+            "kinds": {kind: stats.summary(elapsed) for kind, stats in sorted(recorder.kinds.items())},
+            "server": _server_metrics(host, port),
+        }
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def format_report(report: Dict) -> str:
+    """Plain-text table of a run_load() report."""
+    cfg = report["config"]
+    lines = [
+        f"{cfg['viewers']} viewers on {cfg['stories']} stories, polling every {cfg['interval_sec']}s; "
+        f"reset bursts of {cfg['reset_burst']} every {cfg['reset_interval_sec']}s; {report['elapsed_sec']}s",
+        f"{'kind':<26}{'requests':>9}{'req/s':>9}{'errors':>8}{'503':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+
+    def cell(v: Optional[float]) -> str:
+        return f"{v:>10.2f}" if v is not None else f"{'-':>10}"
+
+    for kind, s in report["kinds"].items():
+        lines.append(
+            f"{kind:<26}{s['requests']:>9}{s['throughput_rps']:>9.1f}{s['errors']:>8}{s['busy_503']:>6}"
+            f"{cell(s['p50_ms'])}{cell(s['p95_ms'])}{cell(s['p99_ms'])}{cell(s['max_ms'])}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load-test serve_progress with simulated viewers and reset bursts.")
+    parser.add_argument("--url", help="Target a running server instead of starting one on synthetic stories")
+    parser.add_argument("--root", type=Path, help="Where to create synthetic stories (default: a temp directory)")
+    parser.add_argument("--stories", type=int, default=4, help="Synthetic stories to serve (default 4)")
+    parser.add_argument("--viewers", type=int, default=50, help="Concurrent simulated viewers (default 50)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (default 30)")
+    parser.add_argument(
+        "--interval", type=float, default=VIEWER_POLL_INTERVAL_SEC,
+        help=f"Seconds between a viewer's polls (default {VIEWER_POLL_INTERVAL_SEC})",
+    )
+    parser.add_argument("--reset-burst", type=int, default=5, help="Reset POSTs per burst, 0 for none (default 5)")
+    parser.add_argument("--reset-interval", type=float, default=10.0, help="Seconds between bursts (default 10)")
+    parser.add_argument("--workers", type=int, help="Server --workers")
+    parser.add_argument("--max-in-flight", type=int, help="Server --max-in-flight")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for tick offsets and reset targets")
+    parser.add_argument("--json", type=Path, help="Also write the full report as JSON to this file")
+    parser.add_argument(
+        "--max-p99-ms", type=float,
+        help="Exit 1 if any polled file's p99 latency exceeds this, or any poll failed or got 503",
+    )
+    args = parser.parse_args()
+    report = run_load(
+        url=args.url, root=args.root, stories=args.stories, viewers=args.viewers, duration=args.duration,
+        interval=args.interval, reset_burst=args.reset_burst, reset_interval=args.reset_interval,
+        workers=args.workers, max_in_flight=args.max_in_flight, seed=args.seed,
+    )
+    print(format_report(report))
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.max_p99_ms is not None:
+        failed = [
+            kind for kind in POLLED_FILES
+            if kind in report["kinds"] and (
+                (report["kinds"][kind]["p99_ms"] or 0) > args.max_p99_ms
+                or report["kinds"][kind]["errors"]
+                or report["kinds"][kind]["busy_503"]
+            )
+        ]
+        if failed:
+            print(f"FAIL: {', '.join(failed)} over p99 {args.max_p99_ms} ms or had errors", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,53 @@
-"""Command protocol for monitor control actions."""
+"""Command protocol for monitor control actions.
+
+Commands live in an append-only journal, _commands.jsonl, in the story folder: one JSON
+record per line ("add" with the full command, "update" with a new status/result). Writers
+append under an fcntl lock on _commands.lock, so concurrent POSTs and the pipeline marking
+commands done never lose each other's records, and an append costs the same however many
+commands the story has. Every record gets the next sequence number; read_commands(since=N)
+returns only commands added or updated after N. Each process keeps an in-memory index per
+story, refreshed by reading just the bytes appended since its last read. Every
+COMMAND_JOURNAL_COMPACT_EVERY records the journal is rewritten with the pending and
+unacknowledged commands and the most recent acknowledged ones; older ones move to
+_commands.archive.jsonl. A legacy _commands.json is imported on the first write and then
+renamed to _commands.json.imported, so nothing keeps reading a frozen copy of it.
+"""
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import threading
 import time
 import uuid
-from dataclasses import dataclass, asdict
-from datetime import datetime, timezone
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+from mp_story_monitor.atomic import atomic_write_text
+from mp_story_monitor.watch import WATCH_POLL_INTERVAL_SEC, FileWatcher
 
-COMMANDS_FILENAME = "_commands.json"
+COMMANDS_FILENAME = "_commands.json"  # legacy snapshot format, imported into the journal
+COMMANDS_IMPORTED_SUFFIX = ".imported"  # the legacy file is renamed to this after import
+COMMANDS_JOURNAL_FILENAME = "_commands.jsonl"
+COMMANDS_ARCHIVE_FILENAME = "_commands.archive.jsonl"
+COMMANDS_LOCK_FILENAME = "_commands.lock"
+COMMAND_JOURNAL_COMPACT_EVERY = 1000
+COMMAND_JOURNAL_KEEP_PROCESSED = 100
+# Processed commands nobody acknowledged (e.g. finished by the server's reset job) are archivable after this
+COMMAND_JOURNAL_UNACKED_RETENTION_SEC = 3600
+_ASYNC_WAIT_SLICE_SEC = 0.25
+# Command fields an "update" record carries
+_UPDATE_FIELDS = ("status", "result", "processed_at", "acked_at")
 
 
 class CommandAction(str, Enum):
@@ -29,6 +66,8 @@ class Command:
     created_at: str = ""
     processed_at: Optional[str] = None
     result: Optional[str] = None
+    seq: int = 0  # journal sequence number of the command's latest record
+    acked_at: Optional[str] = None  # set when a consumer acknowledges it (mark_command_done with story_path)
 
 
 def create_command(action: CommandAction, target: str) -> Command:
@@ -42,30 +81,466 @@ def create_command(action: CommandAction, target: str) -> Command:
     )
 
 
-def read_commands(story_path: Path) -> List[Command]:
-    """Read commands from _commands.json in the given directory.
+def _dumps(record: Dict) -> str:
+    return json.dumps(record, separators=(",", ":"))
+
+
+class CommandJournal:
+    """One story's command journal and this process's index of it. Use journal_for()."""
+
+    def __init__(self, story_path: Path):
+        self.story_path = Path(story_path)
+        self.path = self.story_path / COMMANDS_JOURNAL_FILENAME
+        self._lock = threading.RLock()
+        self._reset_index()
+
+    def _reset_index(self) -> None:
+        self._index: "OrderedDict[str, Command]" = OrderedDict()
+        self._by_status: Dict[str, Set[str]] = {}
+        self._seq = 0
+        self._records = 0  # records in the current journal file
+        self._offset = 0
+        self._file_key = None  # (inode, size) last read, or the legacy file's key
+
+    # -- reading --
+
+    def _put(self, cmd: Command) -> None:
+        old = self._index.get(cmd.id)
+        if old is not None:
+            self._by_status.get(old.status, set()).discard(cmd.id)
+        self._index[cmd.id] = cmd
+        self._by_status.setdefault(cmd.status, set()).add(cmd.id)
+
+    def _apply(self, record: Dict) -> None:
+        op = record.get("op")
+        seq = record.get("seq", 0)
+        if op == "add":
+            cmd = Command(**record["command"])
+            cmd.seq = seq
+            self._put(cmd)
+        elif op == "update":
+            old = self._index.get(record["id"])
+            if old is not None:
+                fields = {k: record[k] for k in _UPDATE_FIELDS if k in record}
+                self._put(replace(old, seq=seq, **fields))
+        self._seq = max(self._seq, seq)
+        self._records += 1
+
+    def _load_legacy(self) -> None:
+        legacy = self.story_path / COMMANDS_FILENAME
+        try:
+            st = os.stat(legacy)
+        except OSError:
+            if self._file_key is not None:
+                self._reset_index()
+            return
+        key = ("legacy", st.st_ino, st.st_size, st.st_mtime_ns)
+        if key == self._file_key:
+            return
+        self._reset_index()
+        try:
+            data = json.loads(legacy.read_text(encoding="utf-8"))
+            for i, c in enumerate(data.get("commands", []), start=1):
+                self._put(Command(**{**c, "seq": i}))
+                self._seq = i
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            pass
+        self._file_key = key
+
+    def refresh(self) -> None:
+        """Bring the index up to date, reading only what was appended since the last call."""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._load_legacy()
+                return
+            if (st.st_ino, st.st_size) == self._file_key:
+                return
+            with open(self.path, "rb") as f:
+                fst = os.fstat(f.fileno())
+                if self._file_key is None or self._file_key[0] != fst.st_ino or fst.st_size < self._offset:
+                    # First read, or the journal was compacted/rewritten since
+                    self._reset_index()
+                f.seek(self._offset)
+                data = f.read(fst.st_size - self._offset)
+            end = data.rfind(b"\n") + 1  # ignore a line still being written
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, TypeError, KeyError):
+                    continue
+            self._offset += end
+            self._file_key = (fst.st_ino, self._offset)
+
+    def commands(self, since: Optional[int] = None) -> List[Command]:
+        """Commands in the order added; with since, only those added or updated after it."""
+        with self._lock:
+            self.refresh()
+            cmds = self._index.values()
+            if since is not None:
+                cmds = (c for c in cmds if c.seq > since)
+            return [replace(c) for c in cmds]
+
+    def get(self, command_id: str) -> Optional[Command]:
+        with self._lock:
+            self.refresh()
+            cmd = self._index.get(command_id)
+            return replace(cmd) if cmd is not None else None
+
+    def by_status(self, status: str) -> List[Command]:
+        with self._lock:
+            self.refresh()
+            ids = self._by_status.get(status, set())
+            return [replace(c) for c in self._index.values() if c.id in ids]
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest record (0 for an empty journal)."""
+        with self._lock:
+            self.refresh()
+            return self._seq
+
+    # -- writing --
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            fd = os.open(str(self.story_path / COMMANDS_LOCK_FILENAME), os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # releases the flock
+
+    def _rewrite_locked(self, cmds: List[Command]) -> None:
+        """Replace the journal with add records for cmds, keeping their sequence numbers."""
+        lines = [_dumps({"op": "header", "seq": self._seq})]
+        lines += [_dumps({"op": "add", "seq": c.seq, "command": asdict(c)}) for c in cmds]
+        atomic_write_text(self.path, "\n".join(lines) + "\n")
+        self._reset_index()
+        self.refresh()
+
+    def _append_locked(self, records: List[Dict]) -> None:
+        self.refresh()
+        if not self.path.exists() and self._index:
+            self._rewrite_locked(list(self._index.values()))  # import legacy _commands.json
+            legacy = self.story_path / COMMANDS_FILENAME
+            try:
+                os.replace(legacy, legacy.with_name(COMMANDS_FILENAME + COMMANDS_IMPORTED_SUFFIX))
+            except OSError:
+                pass
+        lines = []
+        for record in records:
+            self._seq += 1
+            record["seq"] = self._seq
+            lines.append(_dumps(record) + "\n")
+        data = "".join(lines).encode("utf-8")
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        self.refresh()
+        # Records that no longer describe a live command: superseded updates, processed commands
+        if self._records - len(self._index) >= COMMAND_JOURNAL_COMPACT_EVERY:
+            self._compact_locked(COMMAND_JOURNAL_KEEP_PROCESSED)
+
+    def append(self, cmd: Command) -> None:
+        """Add cmd to the journal; sets cmd.seq."""
+        with self._locked():
+            self._append_locked([{"op": "add", "command": asdict(cmd)}])
+            cmd.seq = self._seq
+
+    def update(self, cmd: Command) -> None:
+        """Record cmd's status/result/processed_at (added if the journal does not have it)."""
+        with self._locked():
+            self.refresh()
+            if cmd.id in self._index:
+                record = {"op": "update", "id": cmd.id, "status": cmd.status,
+                          "result": cmd.result, "processed_at": cmd.processed_at}
+            else:
+                record = {"op": "add", "command": asdict(cmd)}
+            self._append_locked([record])
+            cmd.seq = self._seq
+
+    def acknowledge(self, cmd: Command, result: str = "") -> bool:
+        """Mark cmd done with result and record the acknowledgement, unless already acknowledged.
+
+        Check and append happen under the journal lock, so of several consumers racing to
+        acknowledge the same command exactly one gets True.
+        """
+        with self._locked():
+            self.refresh()
+            current = self._index.get(cmd.id)
+            if current is not None and current.acked_at is not None:
+                return False
+            now = datetime.now(timezone.utc).isoformat()
+            cmd.status = "done"
+            cmd.result = result
+            cmd.processed_at = now
+            cmd.acked_at = now
+            if current is not None:
+                record = {"op": "update", "id": cmd.id, "status": cmd.status, "result": cmd.result,
+                          "processed_at": cmd.processed_at, "acked_at": cmd.acked_at}
+            else:
+                record = {"op": "add", "command": asdict(cmd)}
+            self._append_locked([record])
+            cmd.seq = self._seq
+            return True
+
+    def merge(self, cmds: List[Command]) -> None:
+        """Add the commands of cmds the journal lacks and record changes to the others.
+
+        Under the journal lock, like every write. Commands not in cmds are kept, and a
+        command updated since the caller read it (journal seq newer than cmd.seq) is left
+        alone, so a read-modify-write never loses another writer's records. Sets cmd.seq.
+        """
+        with self._locked():
+            self.refresh()
+            records = []
+            for cmd in cmds:
+                current = self._index.get(cmd.id)
+                if current is None:
+                    records.append({"op": "add", "command": asdict(cmd)})
+                elif not (cmd.seq and current.seq > cmd.seq):
+                    fields = {k: getattr(cmd, k) for k in _UPDATE_FIELDS}
+                    if any(getattr(current, k) != v for k, v in fields.items()):
+                        records.append({"op": "update", "id": cmd.id, **fields})
+            if records:
+                self._append_locked(records)
+            for cmd in cmds:
+                current = self._index.get(cmd.id)
+                if current is not None:
+                    cmd.seq = current.seq
+
+    def _compact_locked(self, keep_processed: int) -> None:
+        cmds = list(self._index.values())
+        # Unacknowledged commands stay live for a while: a CommandWatcher may not have delivered them yet
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=COMMAND_JOURNAL_UNACKED_RETENTION_SEC)
+        processed = [c for c in cmds if c.status != "pending"
+                     and (c.acked_at is not None or _processed_before(c, cutoff))]
+        archived = processed[:-keep_processed] if keep_processed else processed
+        if archived:
+            with open(self.story_path / COMMANDS_ARCHIVE_FILENAME, "a", encoding="utf-8") as f:
+                f.write("".join(_dumps(asdict(c)) + "\n" for c in archived))
+        archived_ids = {c.id for c in archived}
+        self._rewrite_locked([c for c in cmds if c.id not in archived_ids])
+
+    def compact(self, keep_processed: int = COMMAND_JOURNAL_KEEP_PROCESSED) -> None:
+        """Move all but the keep_processed most recent archivable processed commands to the archive."""
+        with self._locked():
+            self.refresh()
+            self._compact_locked(keep_processed)
+
+
+def _processed_before(cmd: Command, cutoff: datetime) -> bool:
+    if not cmd.processed_at:
+        return False
+    try:
+        processed = datetime.fromisoformat(cmd.processed_at)
+    except ValueError:
+        return False
+    if processed.tzinfo is None:
+        processed = processed.replace(tzinfo=timezone.utc)
+    return processed < cutoff
+
+
+_journals: Dict[str, CommandJournal] = {}
+_journals_lock = threading.Lock()
 
-    Returns an empty list if the file does not exist or is malformed.
+
+def journal_for(story_path: Path) -> CommandJournal:
+    """The process-wide CommandJournal for a story folder."""
+    key = str(Path(story_path).resolve())
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = _journals[key] = CommandJournal(Path(key))
+        return journal
+
+
+def read_commands(story_path: Path, since: Optional[int] = None) -> List[Command]:
+    """Read the story's commands, in the order they were added.
+
+    With since (a Command.seq / CommandJournal.seq value), only commands added or updated
+    after it are returned. Returns an empty list if there are none.
     """
-    cmd_file = story_path / COMMANDS_FILENAME
-    if not cmd_file.exists():
-        return []
+    return journal_for(story_path).commands(since)
+
+
+def read_archived_commands(story_path: Path) -> List[Command]:
+    """Processed commands moved out of the journal by compaction, oldest first."""
+    result = []
     try:
-        data = json.loads(cmd_file.read_text(encoding="utf-8"))
-        return [Command(**c) for c in data.get("commands", [])]
-    except (json.JSONDecodeError, TypeError, KeyError):
-        return []
+        with open(Path(story_path) / COMMANDS_ARCHIVE_FILENAME, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result.append(Command(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return result
 
 
 def write_commands(story_path: Path, commands: List[Command]) -> None:
-    """Write commands to _commands.json in the given directory."""
-    cmd_file = story_path / COMMANDS_FILENAME
-    payload = {"commands": [asdict(c) for c in commands]}
-    cmd_file.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    """Save commands to the journal: new ones are added, changed ones updated.
+
+    Commands missing from the list are not removed (compaction archives processed ones), so
+    read_commands() / modify / write_commands() cannot drop a command appended meanwhile.
+    """
+    journal_for(story_path).merge(commands)
 
 
-def mark_command_done(cmd: Command, result: str = "") -> None:
-    """Mark a command as done with an optional result message."""
+def append_command(story_path: Path, cmd: Command) -> None:
+    """Add a command to the journal (one appended line, under the journal lock)."""
+    journal_for(story_path).append(cmd)
+
+
+def update_command(story_path: Path, cmd: Command) -> None:
+    """Record the command's new status/result/processed_at in the journal."""
+    journal_for(story_path).update(cmd)
+
+
+def mark_command_done(cmd: Command, result: str = "", story_path: Optional[Path] = None) -> bool:
+    """Mark a command as done with an optional result message.
+
+    With story_path this is a consumer's acknowledgement: it is recorded in the story's
+    journal (with acked_at) atomically, only if no consumer has acknowledged the command yet.
+    Returns False in that case, leaving cmd unchanged.
+    """
+    if story_path is not None:
+        return journal_for(story_path).acknowledge(cmd, result)
     cmd.status = "done"
     cmd.result = result
     cmd.processed_at = datetime.now(timezone.utc).isoformat()
+    return True
+
+
+class CommandWatcher:
+    """Delivers a story's new commands to a pipeline as they are posted.
+
+    Blocks on a FileWatcher on the journal (inotify on Linux, so it wakes as soon as the
+    server appends; mtime polling every poll_interval elsewhere) and reads only records
+    appended since the last wake. Every command added after the watcher starts is delivered
+    once, until some consumer acknowledges it with ack() (the server's reset job may already
+    have marked it done by then). Commands that exist at start are delivered only if still
+    pending and unacknowledged, and not at all with include_existing=False.
+
+        with CommandWatcher(story_path) as watcher:
+            for cmd in watcher:
+                handle(cmd)
+                watcher.ack(cmd, "regenerated")
+
+    Async consumers use "async for cmd in watcher" or "await watcher.aget(timeout)".
+    """
+
+    def __init__(
+        self,
+        story_path: Path,
+        *,
+        include_existing: bool = True,
+        poll_interval: float = WATCH_POLL_INTERVAL_SEC,
+        use_inotify: Optional[bool] = None,
+    ):
+        self.story_path = Path(story_path)
+        self._journal = journal_for(self.story_path)
+        self._watcher = FileWatcher(
+            self.story_path, [COMMANDS_JOURNAL_FILENAME, COMMANDS_FILENAME],
+            poll_interval=poll_interval, use_inotify=use_inotify,
+        )
+        self._lock = threading.Lock()
+        self._pending: "deque[Command]" = deque()
+        self._delivered: Set[str] = set()
+        # Commands from before the watcher started that must not be delivered
+        self._skip: Set[str] = {
+            c.id for c in self._journal.commands()
+            if not (include_existing and c.status == "pending" and c.acked_at is None)
+        }
+        self._cursor = 0
+        self._closed = False
+
+    @property
+    def backend(self) -> str:
+        """"inotify" or "poll"."""
+        return self._watcher.backend
+
+    def _collect(self) -> None:
+        seq = self._journal.seq
+        for cmd in self._journal.commands(since=self._cursor):
+            if cmd.acked_at is not None:
+                self._delivered.discard(cmd.id)
+            elif cmd.id not in self._delivered and cmd.id not in self._skip:
+                self._delivered.add(cmd.id)
+                self._pending.append(cmd)
+        # Records after seq may be seen again next time; _delivered filters them
+        self._cursor = max(self._cursor, seq)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Command]:
+        """Next new command; blocks up to timeout (None = forever). None on timeout/close."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while not self._closed:
+                if self._pending:
+                    return self._pending.popleft()
+                generation = self._watcher.generation
+                self._collect()
+                if self._pending:
+                    continue
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._watcher.wait(generation, remaining)
+            return None
+
+    def ack(self, cmd: Command, result: str = "") -> bool:
+        """mark_command_done(cmd, result) and record it; False if another consumer acknowledged it."""
+        return mark_command_done(cmd, result, story_path=self.story_path)
+
+    def __iter__(self) -> Iterator[Command]:
+        while True:
+            cmd = self.get()
+            if cmd is None:
+                return
+            yield cmd
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Command]:
+        """Async get(): waits in the default executor in short slices, so it stays cancellable."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._closed:
+            remaining = _ASYNC_WAIT_SLICE_SEC if deadline is None else min(
+                _ASYNC_WAIT_SLICE_SEC, deadline - time.monotonic()
+            )
+            if remaining <= 0:
+                return None
+            cmd = await loop.run_in_executor(None, self.get, remaining)
+            if cmd is not None:
+                return cmd
+        return None
+
+    def __aiter__(self) -> "CommandWatcher":
+        return self
+
+    async def __anext__(self) -> Command:
+        cmd = await self.aget()
+        if cmd is None:
+            raise StopAsyncIteration
+        return cmd
+
+    def close(self) -> None:
+        """Stop watching; blocked get() calls return None."""
+        self._closed = True
+        self._watcher.close()
+
+    def __enter__(self) -> "CommandWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,83 @@
+"""Low-contention progress counters for many concurrent worker threads.
+
+Each thread increments its own shard (a dict owned by that thread), so increments take no
+lock and never race. Shards are cumulative and are only summed when a snapshot is needed,
+which is why a reader can never lose an update that a writer has made. When a thread exits,
+its shard is folded into a shared base total, so short-lived workers do not accumulate shards.
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Dict, List, Tuple
+
+
+class _ShardOwner:
+    """Held only by its thread's thread-local storage; collected when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+class ShardedCounters:
+    """Per-thread (complete, total) counters keyed by phase, merged on read."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: List[Dict[str, List[int]]] = []
+        self._base: Dict[str, List[int]] = {}  # shards of exited threads, folded together
+        self._shards_lock = threading.Lock()  # taken when a thread's shard is created or retired
+
+    def _shard(self) -> Dict[str, List[int]]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            owner = _ShardOwner()
+            weakref.finalize(owner, ShardedCounters._retire, weakref.ref(self), shard)
+            self._local.owner = owner
+            self._local.shard = shard
+        return shard
+
+    @staticmethod
+    def _retire(counters_ref: "weakref.ref[ShardedCounters]", shard: Dict[str, List[int]]) -> None:
+        """Fold an exited thread's shard into the base total (no more writes can reach it)."""
+        counters = counters_ref()
+        if counters is None:
+            return
+        with counters._shards_lock:
+            for key, cell in shard.items():
+                acc = counters._base.setdefault(key, [0, 0, 0])
+                acc[0] += cell[0]
+                acc[1] += cell[1]
+                acc[2] += cell[2]
+            counters._shards = [s for s in counters._shards if s is not shard]
+
+    def add(self, key: str, complete: int = 0, total: int = 0) -> None:
+        """Add to this thread's shard. Cells are [complete, total, operations]."""
+        shard = self._shard()
+        cell = shard.get(key)
+        if cell is None:
+            cell = shard[key] = [0, 0, 0]
+        cell[0] += complete
+        cell[1] += total
+        cell[2] += 1
+
+    def _snapshot(self) -> List[Dict[str, List[int]]]:
+        """The live shards plus a copy of the base, taken together under the lock."""
+        with self._shards_lock:
+            return [{key: list(cell) for key, cell in self._base.items()}] + list(self._shards)
+
+    def totals(self) -> Dict[str, Tuple[int, int]]:
+        """Sum of (complete, total) per key across all shards."""
+        merged: Dict[str, List[int]] = {}
+        for shard in self._snapshot():
+            for key, cell in list(shard.items()):
+                acc = merged.setdefault(key, [0, 0])
+                acc[0] += cell[0]
+                acc[1] += cell[1]
+        return {key: (acc[0], acc[1]) for key, acc in merged.items()}
+
+    def operations(self) -> int:
+        """Total number of add() calls across all shards."""
+        return sum(cell[2] for shard in self._snapshot() for cell in list(shard.values()))
@@ -0,0 +1,184 @@
+"""Append-only progress event log: _progress.jsonl with offset-based incremental reads.
+
+Each line is a compact JSON event. The first line is a header carrying the log's epoch; it is
+either {"type": "log"} for a fresh log or {"type": "snapshot", "state": {...}} after
+compaction, when the history is folded into a single snapshot line. Readers keep
+(epoch, offset) and ask only for bytes past offset; an epoch change means the log was
+compacted and the reader must restart from offset 0.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from mp_story_monitor.atomic import atomic_write_bytes
+
+# Contract: event log filename under story_path
+PROGRESS_EVENTS_FILENAME = "_progress.jsonl"
+
+EVENT_LOG_COMPACT_EVERY = 10_000
+# Upper bound on bytes returned by one read_events() call
+READ_EVENTS_MAX_BYTES = 1 << 20
+
+
+def _dumps(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _read_header(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            line = f.readline()
+        return json.loads(line) if line.endswith(b"\n") else None
+    except (OSError, ValueError):
+        return None
+
+
+def _read_last_seq(path: Path) -> int:
+    """Sequence number of the last complete event, reading only the tail of the file."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 8192))
+            tail = f.read()
+    except OSError:
+        return 0
+    for line in reversed(tail.split(b"\n")):
+        try:
+            seq = json.loads(line).get("seq")
+        except (ValueError, AttributeError):
+            continue
+        if isinstance(seq, int):
+            return seq
+    return 0
+
+
+def _truncate_torn_tail(path: Path) -> None:
+    """Cut a partial last line (a crash mid-append) so the next event starts on a new line."""
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 8192)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                keep = start + newline + 1
+                if keep < end:
+                    f.truncate(keep)
+                return
+            pos = start
+
+
+class ProgressEventLog:
+    """Writer side of _progress.jsonl. Not thread-safe; ProgressTracker serializes access."""
+
+    def __init__(self, story_path: Path, *, compact_every: int = EVENT_LOG_COMPACT_EVERY):
+        self.path = Path(story_path) / PROGRESS_EVENTS_FILENAME
+        self.compact_every = compact_every
+        self._since_compact = 0
+        header = _read_header(self.path)
+        if header and isinstance(header.get("epoch"), int):
+            self.epoch = header["epoch"]
+            _truncate_torn_tail(self.path)
+            self._seq = _read_last_seq(self.path)
+            self._file = open(self.path, "ab")
+        else:
+            self.epoch = time.time_ns()
+            self._seq = 0
+            self._file = open(self.path, "wb")
+            self._file.write(_dumps({"type": "log", "epoch": self.epoch, "seq": 0}))
+            self._file.flush()
+
+    @property
+    def offset(self) -> int:
+        """Byte offset just past the last appended event (including buffered bytes)."""
+        return self._file.tell() if self._file else 0
+
+    def append(self, event_type: str, **fields: Any) -> None:
+        """Buffer one event; call flush() to make it visible to readers."""
+        if self._file is None:
+            return
+        self._seq += 1
+        self._since_compact += 1
+        event = {"seq": self._seq, "ts": datetime.now(timezone.utc).isoformat(), "type": event_type}
+        event.update(fields)
+        self._file.write(_dumps(event))
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def needs_compaction(self) -> bool:
+        return self._since_compact >= self.compact_every
+
+    def compact(self, state: Dict[str, Any]) -> None:
+        """Replace the log with a single snapshot line under a new epoch."""
+        if self._file is None:
+            return
+        self._file.close()
+        self.epoch = time.time_ns()
+        header = {
+            "type": "snapshot",
+            "epoch": self.epoch,
+            "seq": self._seq,
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "state": state,
+        }
+        atomic_write_bytes(self.path, _dumps(header))
+        self._file = open(self.path, "ab")
+        self._since_compact = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_events(
+    story_path: Path,
+    offset: int = 0,
+    epoch: Optional[int] = None,
+    max_bytes: int = READ_EVENTS_MAX_BYTES,
+) -> Dict[str, Any]:
+    """Return events appended after byte offset.
+
+    Result: {"epoch", "offset", "reset", "events"}. Pass the returned epoch/offset back on the
+    next call. reset=True means the caller's position was invalid (log compacted or replaced)
+    and events start again from the beginning of the log. Only complete lines are returned.
+    """
+    path = Path(story_path) / PROGRESS_EVENTS_FILENAME
+    empty = {"epoch": None, "offset": 0, "reset": offset != 0, "events": []}
+    try:
+        # Header and body come from one open handle so a concurrent compaction can't mix logs
+        with open(path, "rb") as f:
+            first = f.readline()
+            try:
+                header = json.loads(first) if first.endswith(b"\n") else None
+            except ValueError:
+                header = None
+            if not isinstance(header, dict):
+                return empty
+            current_epoch = header.get("epoch")
+            size = os.fstat(f.fileno()).st_size
+            reset = offset < 0 or offset > size or (epoch is not None and epoch != current_epoch)
+            if reset:
+                offset = 0
+            f.seek(offset)
+            chunk = f.read(max_bytes)
+    except OSError:
+        return empty
+    end = chunk.rfind(b"\n") + 1
+    events: List[Dict[str, Any]] = []
+    for line in chunk[:end].splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return {"epoch": current_epoch, "offset": offset + end, "reset": reset, "events": events}
@@ -0,0 +1,120 @@
+"""Process-wide heartbeat scheduler shared by all ProgressTrackers.
+
+One daemon thread serves every registered tracker from a heap of due times, instead of a
+sleeping thread per tracker. First beats are staggered randomly across the interval so
+trackers started together don't write in lockstep, and beats falling within batch_window of
+each other are handled in a single wake-up. The thread exits when the last registration is
+removed and is restarted on the next register().
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BATCH_WINDOW_SEC = 0.5
+
+
+class HeartbeatScheduler:
+    def __init__(self, batch_window: float = DEFAULT_BATCH_WINDOW_SEC):
+        self.batch_window = batch_window
+        self._cond = threading.Condition(threading.Lock())
+        self._heap: List[Tuple[float, int]] = []  # (due monotonic time, token)
+        self._entries: Dict[int, Tuple[Callable[[], Optional[Callable[[], None]]], float]] = {}
+        self._tokens = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self.ticks = 0
+
+    def register(self, callback: Callable[[], None], interval: float) -> int:
+        """Call callback every interval seconds; returns a token for unregister().
+
+        Bound methods are held weakly, so a tracker that is dropped without unregistering
+        stops receiving beats instead of being kept alive by the scheduler.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self._cond:
+            token = next(self._tokens)
+            self._entries[token] = (ref, interval)
+            heapq.heappush(self._heap, (time.monotonic() + random.uniform(0, interval), token))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mp-story-heartbeat", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return token
+
+    def unregister(self, token: Optional[int]) -> None:
+        if token is None:
+            return
+        with self._cond:
+            if self._entries.pop(token, None) is not None:
+                self._cond.notify()
+
+    @property
+    def active(self) -> int:
+        """Number of registered callbacks."""
+        with self._cond:
+            return len(self._entries)
+
+    @property
+    def running(self) -> bool:
+        with self._cond:
+            return self._thread is not None
+
+    def _next_batch(self) -> Optional[List[Callable[[], None]]]:
+        """Block until at least one beat is due; None means no registrations remain."""
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][1] not in self._entries:
+                    heapq.heappop(self._heap)
+                if not self._entries:
+                    self._heap.clear()
+                    self._thread = None
+                    return None
+                now = time.monotonic()
+                due = self._heap[0][0]
+                if due <= now:
+                    break
+                self._cond.wait(timeout=due - now)
+            batch: List[Callable[[], None]] = []
+            horizon = now + self.batch_window
+            while self._heap and self._heap[0][0] <= horizon:
+                due, token = heapq.heappop(self._heap)
+                entry = self._entries.get(token)
+                if entry is None:
+                    continue
+                ref, interval = entry
+                callback = ref()
+                if callback is None:
+                    del self._entries[token]
+                    continue
+                batch.append(callback)
+                # Keep each tracker's phase; after a stall, skip missed beats instead of bursting
+                next_due = due + interval
+                if next_due <= now:
+                    next_due = now + interval
+                heapq.heappush(self._heap, (next_due, token))
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            for callback in batch:
+                try:
+                    callback()
+                except Exception:
+                    pass
+            self.ticks += len(batch)
+
+
+_scheduler = HeartbeatScheduler()
+
+
+def shared_scheduler() -> HeartbeatScheduler:
+    """The process-wide scheduler used by ProgressTracker."""
+    return _scheduler
@@ -0,0 +1,110 @@
+"""Opt-in, level-gated instrumentation for the tracker, reset and server modules.
+
+Call sites emit structured events with trace("progress_write", story=..., duration_us=...).
+While tracing is disabled (the default) trace() returns after a single flag check, and hot
+paths guard any timing work with trace_enabled(). enable_trace() routes events through a
+queue to a background listener, so the caller never blocks on the sink's I/O; the default
+sink writes one JSON object per line to a file.
+
+Set MP_STORY_MONITOR_TRACE=/path/to/trace.jsonl (and optionally
+MP_STORY_MONITOR_TRACE_LEVEL=INFO) to enable tracing at import time.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+TRACE_LOGGER_NAME = "mp_story_monitor.trace"
+
+_trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+_trace_logger.propagate = False
+_trace_logger.setLevel(logging.DEBUG)
+
+# Lowest level currently traced; above CRITICAL means disabled
+_DISABLED = logging.CRITICAL + 1
+_threshold = _DISABLED
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format trace records as {"ts", "level", "event", **fields} JSON lines."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+def trace_enabled(level: int = logging.DEBUG) -> bool:
+    """True if events at level would be recorded. Use to skip timing work when disabled."""
+    return level >= _threshold
+
+
+def trace(event: str, level: int = logging.DEBUG, **fields: Any) -> None:
+    """Record a structured event; a no-op unless tracing is enabled at this level."""
+    if level < _threshold:
+        return
+    _trace_logger.log(level, event, extra={"fields": fields})
+
+
+def enable_trace(
+    path: Optional[Path] = None,
+    *,
+    handler: Optional[logging.Handler] = None,
+    level: int = logging.DEBUG,
+) -> None:
+    """Start recording events at or above level.
+
+    Events go to handler if given, otherwise appended as JSON lines to path. Either way they
+    pass through an in-memory queue drained by a listener thread.
+    """
+    global _threshold, _listener, _queue_handler
+    if handler is None and path is None:
+        raise ValueError("enable_trace needs a path or a handler")
+    disable_trace()
+    if handler is None:
+        handler = logging.FileHandler(str(path), encoding="utf-8")
+        handler.setFormatter(JsonLinesFormatter())
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(q)
+    _trace_logger.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+    _listener.start()
+    _threshold = level
+
+
+def disable_trace() -> None:
+    """Stop recording; events already queued are written out before this returns."""
+    global _threshold, _listener, _queue_handler
+    _threshold = _DISABLED
+    if _queue_handler is not None:
+        _trace_logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
+
+
+def _enable_from_env() -> None:
+    path = os.environ.get("MP_STORY_MONITOR_TRACE")
+    if not path:
+        return
+    level_name = os.environ.get("MP_STORY_MONITOR_TRACE_LEVEL", "DEBUG").upper()
+    level = logging.getLevelName(level_name)
+    enable_trace(Path(path), level=level if isinstance(level, int) else logging.DEBUG)
+
+
+_enable_from_env()
@@ -0,0 +1,202 @@
+"""Background execution of reset commands.
+
+serve_progress records the command, submits the reset here and answers 202 right away.
+Jobs run on a small thread pool, one at a time per story (so two resets never walk and
+delete in the same tree concurrently); when a job finishes its command is marked done via
+mark_command_done and recorded in the command journal. Job state is kept in memory for the
+most recent jobs so clients can poll it. submit_batch runs one reset (e.g. reset_batch) for
+several commands, giving each its own job.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from mp_story_monitor.commands import Command, mark_command_done, update_command
+from mp_story_monitor.metrics import default_registry
+
+logger = logging.getLogger(__name__)
+
+RESET_JOB_WORKERS = 2
+JOB_HISTORY_LIMIT = 500
+
+
+@dataclass
+class ResetJob:
+    command_id: str
+    story_path: str
+    action: str
+    target: str
+    status: str = "pending"  # pending / running / done / error
+    files_deleted: Optional[int] = None
+    error: Optional[str] = None
+    submitted_ts: float = 0.0
+    started_ts: Optional[float] = None
+    finished_ts: Optional[float] = None
+
+    @property
+    def duration_sec(self) -> Optional[float]:
+        if self.started_ts is None or self.finished_ts is None:
+            return None
+        return self.finished_ts - self.started_ts
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "duration_sec": self.duration_sec}
+
+
+class ResetJobQueue:
+    """Runs reset functions in the background and tracks their status by command id."""
+
+    def __init__(self, workers: int = RESET_JOB_WORKERS, history: int = JOB_HISTORY_LIMIT):
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mp-story-reset")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, ResetJob]" = OrderedDict()
+        # story path -> [lock, holders]; dropped when no job or story_lock() user holds it
+        self._story_locks: Dict[str, list] = {}
+
+    def submit(self, story_path: Path, cmd: Command, func: Callable[[], int]) -> ResetJob:
+        """Run func (returning the number of files deleted) for cmd in the background."""
+        return self.submit_batch(story_path, [cmd], lambda: [func()])[0]
+
+    def submit_batch(
+        self, story_path: Path, cmds: Sequence[Command], func: Callable[[], Sequence[int]]
+    ) -> List[ResetJob]:
+        """Run func once for several commands; it returns files deleted per command, in order.
+
+        Each command gets its own job (pollable by its command id); they share timings.
+        """
+        now = time.time()
+        jobs = [
+            ResetJob(
+                command_id=cmd.id,
+                story_path=str(story_path),
+                action=str(getattr(cmd.action, "value", cmd.action)),
+                target=cmd.target,
+                submitted_ts=now,
+            )
+            for cmd in cmds
+        ]
+        with self._lock:
+            for job in jobs:
+                self._jobs[job.command_id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in ("pending", "running"):
+                    break
+                self._jobs.popitem(last=False)
+        story_lock = self._hold_story_lock(story_path)
+        self._executor.submit(self._run, jobs, story_lock, Path(story_path), list(cmds), func)
+        return jobs
+
+    def _run(
+        self,
+        jobs: List[ResetJob],
+        story_lock: threading.Lock,
+        story_path: Path,
+        cmds: List[Command],
+        func: Callable[[], Sequence[int]],
+    ) -> None:
+        try:
+            with story_lock:
+                self._run_locked(jobs, story_path, cmds, func)
+        finally:
+            self._release_story_lock(story_path)
+
+    def _run_locked(
+        self,
+        jobs: List[ResetJob],
+        story_path: Path,
+        cmds: List[Command],
+        func: Callable[[], Sequence[int]],
+    ) -> None:
+        started = time.time()
+        for job in jobs:
+            job.started_ts = started
+            job.status = "running"
+        error = None
+        try:
+            counts = list(func())
+        except Exception as e:
+            logger.warning(f"Reset {', '.join(f'{j.action} {j.target!r}' for j in jobs)} failed: {e}")
+            error = str(e)
+        finished = time.time()
+        metrics = default_registry()
+        for i, (job, cmd) in enumerate(zip(jobs, cmds)):
+            if error is None:
+                job.files_deleted = counts[i]
+                mark_command_done(cmd, result=f"{counts[i]} files deleted")
+                status = "done"
+            else:
+                mark_command_done(cmd, result=f"error: {error}")
+                cmd.status = status = "error"
+                job.error = error
+            job.finished_ts = finished
+            try:
+                update_command(story_path, cmd)
+            except Exception as e:
+                logger.warning(f"Failed to record result of {cmd.id}: {e}")
+            metrics.inc("reset_jobs_total", action=job.action, status=status)
+            metrics.observe("reset_job_duration_seconds", job.duration_sec, action=job.action)
+            if job.files_deleted:
+                metrics.inc("reset_files_deleted_total", job.files_deleted, action=job.action)
+            # Last, so a client that sees the final status also sees the updated command
+            job.status = status
+
+    def _hold_story_lock(self, story_path: Path) -> threading.Lock:
+        """story_path's lock, kept in the table until the matching _release_story_lock()."""
+        with self._lock:
+            entry = self._story_locks.setdefault(str(story_path), [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _release_story_lock(self, story_path: Path) -> None:
+        with self._lock:
+            entry = self._story_locks[str(story_path)]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._story_locks[str(story_path)]
+
+    @contextmanager
+    def story_lock(self, story_path: Path) -> Iterator[None]:
+        """Hold the lock jobs for story_path run under, to change the story between jobs.
+
+        A story's lock exists only while a job is pending or running or someone holds it.
+        """
+        lock = self._hold_story_lock(story_path)
+        try:
+            with lock:
+                yield
+        finally:
+            self._release_story_lock(story_path)
+
+    def get(self, command_id: str) -> Optional[ResetJob]:
+        with self._lock:
+            return self._jobs.get(command_id)
+
+    def jobs(self, story_path: Optional[Path] = None) -> List[ResetJob]:
+        """Known jobs, oldest first, optionally only those for story_path."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if story_path is None:
+            return jobs
+        return [j for j in jobs if j.story_path == str(story_path)]
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is pending or running; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while any(j.status in ("pending", "running") for j in self.jobs()):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,219 @@
+"""In-process metrics for the progress server, reset jobs and trackers.
+
+Counters and histograms are kept in a MetricsRegistry and rendered on demand as
+Prometheus text exposition format or JSON (serve_progress exposes both at /api/metrics).
+Everything in one process shares default_registry(), so a ProgressTracker running next to
+the server shows up in the same scrape. Values that already exist elsewhere (cache hit
+counts, in-flight requests) are read at scrape time through collectors instead of being
+mirrored on every update.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+METRIC_PREFIX = "mp_story_monitor_"
+# Seconds; covers sub-millisecond cached polls up to multi-second story resets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# A collector returns (name, type, help, [(labels, value), ...]) tuples at scrape time
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile.
+
+        None if there are no observations or the quantile lies above the largest bucket
+        (no finite bound to report, and JSON has no Infinity; the "+Inf" bucket count shows it).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms with labels."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Declare a metric's type ("counter", "gauge" or "histogram") and help text."""
+        with self._lock:
+            self._meta[name] = (kind, help_text)
+            if kind == "histogram":
+                self._buckets[name] = tuple(buckets)
+
+    def inc(self, name: str, value: float = 1, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: object) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            hist.observe(value)
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Add a callable producing samples at scrape time (e.g. cache hit counts)."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collected(self) -> List[Sample]:
+        with self._lock:
+            collectors = list(self._collectors)
+        samples: List[Sample] = []
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                continue
+        return samples
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly view; histograms include count, sum and bucket-based p50/p95/p99.
+
+        A percentile above the largest bucket is reported as None.
+        """
+        collected = self._collected()
+        with self._lock:
+            result: Dict[str, Dict] = {}
+            for name, series in list(self._counters.items()) + list(self._gauges.items()):
+                result[name] = {
+                    "type": self._meta.get(name, ("counter" if name in self._counters else "gauge", ""))[0],
+                    "series": [{"labels": dict(key), "value": value} for key, value in series.items()],
+                }
+            for name, series in self._histograms.items():
+                result[name] = {
+                    "type": "histogram",
+                    "series": [
+                        {
+                            "labels": dict(key),
+                            "count": h.count,
+                            "sum": h.total,
+                            "p50": h.quantile(0.5),
+                            "p95": h.quantile(0.95),
+                            "p99": h.quantile(0.99),
+                            "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts)),
+                        }
+                        for key, h in series.items()
+                    ],
+                }
+        for name, kind, _, values in collected:
+            result[name] = {"type": kind, "series": [{"labels": labels, "value": v} for labels, v in values]}
+        return result
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        collected = self._collected()
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            full = METRIC_PREFIX + name
+            if help_text:
+                lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in store.items():
+                    header(name, kind, self._meta.get(name, (kind, ""))[1])
+                    for key, value in series.items():
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+            for name, series in self._histograms.items():
+                header(name, "histogram", self._meta.get(name, ("histogram", ""))[1])
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, n in zip(h.buckets + (math.inf,), h.counts):
+                        cumulative += n
+                        labels = key + (("le", _format_value(bound)),)
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels)} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(key)} {_format_value(h.total)}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(key)} {h.count}")
+        for name, kind, help_text, values in collected:
+            header(name, kind, help_text)
+            for labels, value in values:
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop recorded values (metadata and collectors are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+_registry = MetricsRegistry()
+_registry.describe("http_requests_total", "counter", "HTTP requests by endpoint, method and status.")
+_registry.describe("http_request_duration_seconds", "histogram", "HTTP request handling time by endpoint.")
+_registry.describe("http_response_bytes_total", "counter", "Response body bytes by endpoint.")
+_registry.describe("reset_jobs_total", "counter", "Finished reset jobs by action and status.")
+_registry.describe("reset_job_duration_seconds", "histogram", "Reset job run time by action.")
+_registry.describe("reset_files_deleted_total", "counter", "Files deleted by reset jobs, by action.")
+_registry.describe("progress_writes_total", "counter", "Progress snapshots written by trackers in this process.")
+_registry.describe("progress_write_duration_seconds", "histogram", "Time to write one progress snapshot.")
+_registry.describe("progress_write_bytes_total", "counter", "Bytes of progress snapshots written.")
+_registry.describe("heartbeat_beats_total", "counter", "Tracker heartbeats delivered by the shared scheduler.")
+
+
+def default_registry() -> MetricsRegistry:
+    """The process-wide registry used by the server, reset jobs and trackers."""
+    return _registry
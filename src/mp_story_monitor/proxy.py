@@ -0,0 +1,279 @@
+"""Report progress from worker processes to the ProgressTracker that owns the story.
+
+The parent calls tracker.proxy() and hands the returned TrackerProxy to workers (it is
+picklable, e.g. as a ProcessPoolExecutor task argument). Workers call advance() /
+add_total() / set_phase_progress() on it; only the parent touches _progress.json, so pid and
+check_stale stay correct.
+
+Transport is a UNIX datagram socket. Each worker process aggregates updates locally and
+sends at most one small datagram per flush_interval (plus explicit flush()), with
+non-blocking sends, so workers are never blocked by the parent and a burst of tens of
+thousands of increments costs a handful of datagrams. A flush touching many phases is split
+into datagrams the parent can receive whole.
+"""
+from __future__ import annotations
+
+import errno
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from multiprocessing import util as mp_util
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from mp_story_monitor.tracker import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+PROXY_FLUSH_INTERVAL_SEC = 0.05
+_RECV_BUFSIZE = 1 << 16
+# Datagrams are split by phase to stay well below what the parent reads per recv()
+_MAX_DATAGRAM_BYTES = _RECV_BUFSIZE // 2
+# Send errors meaning the tracker closed its socket (completed or errored)
+_TRACKER_GONE_ERRNOS = frozenset({errno.ENOENT, errno.ECONNREFUSED})
+_RECV_TIMEOUT_SEC = 0.2
+_SOCKET_BUFSIZE = 1 << 20
+
+
+class _Sender:
+    """Per-process, per-address aggregation buffer and socket."""
+
+    def __init__(self, address: str, flush_interval: float):
+        self.address = address
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._adds: Dict[str, List[int]] = {}
+        self._sets: Dict[str, Tuple[int, int]] = {}
+        self._sock: Optional[socket.socket] = None
+        self._closed = False
+        self._warned = False
+        self._wake = threading.Event()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        # multiprocessing children skip atexit; its finalizers still run on normal exit
+        mp_util.Finalize(None, self.flush, exitpriority=10)
+
+    def add(self, phase: str, complete: int, total: int) -> None:
+        with self._lock:
+            cell = self._adds.get(phase)
+            if cell is None:
+                cell = self._adds[phase] = [0, 0]
+            cell[0] += complete
+            cell[1] += total
+        self._wake.set()
+
+    def set(self, phase: str, complete: int, total: int) -> None:
+        with self._lock:
+            # An absolute value supersedes increments buffered before it
+            self._adds.pop(phase, None)
+            self._sets[phase] = (complete, total)
+        self._wake.set()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            if self._closed:
+                return
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _socket(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCKET_BUFSIZE)
+            except OSError:
+                pass
+            sock.connect(self.address)
+            sock.setblocking(False)
+            self._sock = sock
+        return self._sock
+
+    def _encode(self, phases: List[str], sets: Dict, adds: Dict, limit: int) -> Tuple[int, bytes]:
+        """One datagram for a prefix of phases of at most ~limit bytes (at least one phase)."""
+        size = count = 0
+        for phase in phases:
+            size += len(json.dumps([phase, sets.get(phase), adds.get(phase)])) + 8
+            if count and size > limit:
+                break
+            count += 1
+        chunk = phases[:count]
+        message = {
+            "pid": os.getpid(),
+            "set": {p: sets[p] for p in chunk if p in sets},
+            "add": {p: adds[p] for p in chunk if p in adds},
+        }
+        return count, json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+    def flush(self) -> None:
+        """Send everything buffered so far; what could not be sent is kept for the next flush."""
+        with self._lock:
+            if self._closed or not (self._adds or self._sets):
+                return
+            adds, sets = self._adds, self._sets
+            self._adds, self._sets = {}, {}
+            # Each phase's set and adds travel together, so the parent applies them in order
+            phases = list(dict.fromkeys([*sets, *adds]))
+            limit = _MAX_DATAGRAM_BYTES
+            while phases:
+                count, data = self._encode(phases, sets, adds, limit)
+                try:
+                    self._socket().send(data)
+                except (BlockingIOError, InterruptedError):
+                    break  # parent is behind: keep the rest, later updates fold into it
+                except OSError as e:
+                    if e.errno in _TRACKER_GONE_ERRNOS:
+                        # Tracker completed and removed its socket; nothing left to report to
+                        self._closed = True
+                        return
+                    if e.errno == errno.EMSGSIZE and count > 1:
+                        limit = max(limit // 2, 1)
+                        continue
+                    self._warn(e)
+                    if e.errno != errno.EMSGSIZE:
+                        break  # e.g. ENOBUFS: retry on the next flush
+                    # A single phase too large to send at all (absurd phase name): drop it
+                phases = phases[count:]
+            # Nothing can have been buffered meanwhile: add() / set() wait for the lock
+            self._sets = {p: sets[p] for p in phases if p in sets}
+            self._adds = {p: adds[p] for p in phases if p in adds}
+        if phases:
+            self._wake.set()  # the flush loop retries after flush_interval
+
+    def _warn(self, error: OSError) -> None:
+        if not self._warned:
+            self._warned = True
+            logger.warning(f"Progress proxy send to {self.address} failed ({error}); retrying on later flushes")
+
+
+_senders: Dict[str, _Sender] = {}
+_senders_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    global _senders_lock
+    _senders.clear()
+    _senders_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _sender_for(address: str, flush_interval: float) -> _Sender:
+    sender = _senders.get(address)
+    if sender is None:
+        with _senders_lock:
+            sender = _senders.get(address)
+            if sender is None:
+                sender = _senders[address] = _Sender(address, flush_interval)
+    return sender
+
+
+class TrackerProxy:
+    """Picklable progress reporter bound to a parent tracker's socket address."""
+
+    def __init__(self, address: str, flush_interval: float = PROXY_FLUSH_INTERVAL_SEC):
+        self.address = address
+        self.flush_interval = flush_interval
+
+    def __reduce__(self):
+        return (TrackerProxy, (self.address, self.flush_interval))
+
+    def _sender(self) -> _Sender:
+        return _sender_for(self.address, self.flush_interval)
+
+    def advance(self, phase: str, n: int = 1) -> None:
+        """Add n completed items to a phase (see ProgressTracker.advance)."""
+        self._sender().add(phase, n, 0)
+
+    def add_total(self, phase: str, n: int) -> None:
+        """Add n expected items to a phase's total (see ProgressTracker.add_total)."""
+        self._sender().add(phase, 0, n)
+
+    def set_phase_progress(self, phase: str, complete: int, total: int) -> None:
+        """Set absolute counts for a phase (see ProgressTracker.set_phase_progress)."""
+        if total < 0 or complete < 0:
+            return
+        self._sender().set(phase, complete, total)
+
+    def flush(self) -> None:
+        """Send buffered updates now. Call at the end of a worker task for prompt delivery."""
+        self._sender().flush()
+
+    def __enter__(self) -> "TrackerProxy":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.flush()
+
+
+class ProxyServer:
+    """Parent side: receives worker datagrams and applies them to the owning tracker."""
+
+    def __init__(self, tracker: "ProgressTracker"):
+        self.tracker = tracker
+        # Short path: AF_UNIX addresses are limited to ~104 bytes on macOS
+        self._dir = tempfile.mkdtemp(prefix="mpsm-")
+        self.address = str(Path(self._dir) / "tracker.sock")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCKET_BUFSIZE)
+        except OSError:
+            pass
+        self._sock.bind(self.address)
+        self._sock.settimeout(_RECV_TIMEOUT_SEC)
+        self._stopped = threading.Event()
+        self.messages_received = 0
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def proxy(self) -> TrackerProxy:
+        return TrackerProxy(self.address)
+
+    def _serve(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                data = self._sock.recv(_RECV_BUFSIZE)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self._handle(data)
+
+    def _handle(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        self.messages_received += 1
+        self._apply(message)
+
+    def _apply(self, message: Dict[str, Any]) -> None:
+        for phase, (complete, total) in (message.get("set") or {}).items():
+            self.tracker.set_phase_progress(phase, complete, total)
+        for phase, (complete, total) in (message.get("add") or {}).items():
+            if total:
+                self.tracker.add_total(phase, total)
+            if complete:
+                self.tracker.advance(phase, complete)
+
+    def close(self) -> None:
+        """Stop receiving and remove the socket. Messages already queued are applied first."""
+        self._stopped.set()
+        self._thread.join()
+        self._sock.setblocking(False)
+        while True:
+            try:
+                data = self._sock.recv(_RECV_BUFSIZE)
+            except OSError:
+                break
+            self._handle(data)
+        self._sock.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
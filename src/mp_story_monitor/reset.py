@@ -1,29 +1,204 @@
-"""Reset logic: find and delete asset output files with cascade support."""
+"""Reset logic: find and delete asset output files with cascade support.
+
+Each reset first collects its deletion plan, then delete_files unlinks it on a bounded
+thread pool (RESET_DELETE_WORKERS, default 8), so on network mounts the per-file round
+trips overlap instead of running one at a time.
+
+With trash_id (soft reset) nothing is deleted: files, or whole directories when every entry
+in one is being reset, are renamed into .trash/<trash_id>/ (see trash), where they can be
+restored with trash.undo_trash until the reaper purges them.
+"""
 from __future__ import annotations
 
+import fnmatch
+import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional, Set
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 from mp_logger import get_logger
 
+from mp_story_monitor.asset_index import ASSET_EXTENSIONS, asset_slug, index_for, is_pruned_dir
+from mp_story_monitor.instrumentation import trace
+from mp_story_monitor.trash import TrashBatch
+
 logger = get_logger("story_monitor", tag="RESET")
 
-# Extensions by asset type
-_EXT_MAP = {
-    "image": {".png", ".jpg", ".jpeg", ".webp"},
-    "audio": {".wav", ".mp3", ".flac"},
-    "video": {".mp4", ".webm", ".mov"},
-    "text": {".txt"},
-}
+_EXT_MAP = ASSET_EXTENSIONS
 _ALL_EXTS: Set[str] = set()
 for _exts in _EXT_MAP.values():
     _ALL_EXTS |= _exts
+_slug = asset_slug
+
+DEFAULT_DELETE_WORKERS = 8
+
+# One planned deletion: path, log prefix (None: not logged), skip the file if it is empty
+Deletion = Tuple[Path, Optional[str], bool]
+
+
+def _is_output_name(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in _ALL_EXTS
+
+
+def iter_output_files(
+    root: Path,
+    match: Callable[[str], bool] = _is_output_name,
+    *,
+    hints: Sequence[str] = (),
+    min_size: int = 0,
+) -> Iterator[Path]:
+    """Yield files under root whose name passes match, in one os.scandir traversal.
+
+    Hidden and tool directories are pruned. match sees only the file name, so nothing is
+    stat'ed unless min_size is set, and then only matching files. Directories whose name
+    contains one of hints (and everything below them) are visited as soon as they are
+    found, ahead of other pending directories. Each directory is listed completely before
+    its files are yielded, so callers may delete them while iterating.
+    """
+    hinted: List[Tuple[str, bool]] = []
+    pending: List[Tuple[str, bool]] = [(str(root), False)]
+    while hinted or pending:
+        path, in_hint = hinted.pop() if hinted else pending.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if is_pruned_dir(entry.name):
+                    continue
+                is_hint = in_hint or any(h in entry.name for h in hints)
+                (hinted if is_hint else pending).append((entry.path, is_hint))
+            elif match(entry.name) and entry.is_file():
+                if min_size:
+                    try:
+                        if entry.stat().st_size < min_size:
+                            continue
+                    except OSError:
+                        continue
+                yield Path(entry.path)
+
+
+def _delete_workers() -> int:
+    try:
+        return max(1, int(os.environ.get("RESET_DELETE_WORKERS", DEFAULT_DELETE_WORKERS)))
+    except ValueError:
+        return DEFAULT_DELETE_WORKERS
+
+
+def _delete_one(item: Deletion, trash: Optional[TrashBatch] = None) -> bool:
+    path, log_prefix, nonempty_only = item
+    if nonempty_only and path.stat().st_size == 0:
+        return False
+    if log_prefix is not None:
+        logger.info(f"{log_prefix}{path}")
+    if trash is not None:
+        trash.move_file(path)
+    else:
+        path.unlink()
+    return True
 
 
-def _slug(name: str) -> str:
-    """Normalize asset name to match production's slug logic."""
-    return name.lower().replace("_", "-").replace(" ", "-")
+def _covers_dir(directory: str, items: List[Deletion]) -> bool:
+    """True if items are exactly the (non-empty where required) files of directory."""
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+        if len(entries) != len(items) or any(e.is_dir(follow_symlinks=False) for e in entries):
+            return False
+        if {e.name for e in entries} != {path.name for path, _, _ in items}:
+            return False
+        return all(path.stat().st_size > 0 for path, _, nonempty_only in items if nonempty_only)
+    except OSError:
+        return False
+
+
+def _trash_whole_dirs(plan: Sequence[Deletion], trash: TrashBatch, results: List[bool]) -> List[int]:
+    """Move directories the plan empties completely in one rename; return the other plan indexes."""
+    by_dir: Dict[str, List[int]] = {}
+    for i, (path, _, _) in enumerate(plan):
+        by_dir.setdefault(str(path.parent), []).append(i)
+    remaining: List[int] = []
+    for directory, indexes in by_dir.items():
+        items = [plan[i] for i in indexes]
+        if len(indexes) < 2 or Path(directory) == trash.story_path or not _covers_dir(directory, items):
+            remaining.extend(indexes)
+            continue
+        log_prefix = items[0][1]
+        if log_prefix is not None:
+            logger.info(f"{log_prefix}{directory} ({len(items)} files, moved to trash)")
+        trash.move_dir(Path(directory), [path.name for path, _, _ in items])
+        for i in indexes:
+            results[i] = True
+    return sorted(remaining)
+
+
+def _run_deletions(
+    plan: Sequence[Deletion], workers: Optional[int], trash: Optional[TrashBatch] = None
+) -> List[bool]:
+    results = [False] * len(plan)
+    pending = list(range(len(plan))) if trash is None else _trash_whole_dirs(plan, trash, results)
+    if workers is None:
+        workers = _delete_workers()
+    if workers <= 1 or len(pending) <= 1:
+        for i in pending:
+            results[i] = _delete_one(plan[i], trash)
+        return results
+    error: Optional[BaseException] = None
+    with ThreadPoolExecutor(max_workers=min(workers, len(pending)), thread_name_prefix="mp-story-unlink") as pool:
+        futures = {pool.submit(_delete_one, plan[i], trash): i for i in pending}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+                    for other in futures:
+                        other.cancel()
+    if error is not None:
+        raise error
+    return results
+
+
+def delete_files(plan: Sequence[Deletion], workers: Optional[int] = None, trash: Optional[TrashBatch] = None) -> int:
+    """Carry out a deletion plan; returns the number of files deleted (or trashed).
+
+    Up to workers (default: RESET_DELETE_WORKERS env var, else 8) files are stat'ed and
+    unlinked at once. On the first failure, deletions not yet started are cancelled; once
+    those already in progress have finished, that failure is raised. With trash the files
+    are moved into its tombstone instead, whole directories at a time where the plan
+    covers all of one.
+    """
+    return sum(_run_deletions(plan, workers, trash))
+
+
+def _carry_out(
+    story_path: Path, plan: Sequence[Deletion], trash_id: Optional[str], command_ids: Sequence[str] = ()
+) -> List[bool]:
+    """Delete plan, or move it into the trash_id tombstone; returns per-item results."""
+    if not trash_id:
+        return _run_deletions(plan, None)
+    trash = TrashBatch(story_path, trash_id, command_ids)
+    try:
+        return _run_deletions(plan, None, trash)
+    finally:
+        trash.commit()
+
+
+def _trace_reset(kind: str, story_path: Path, target: str, files: int, started: float) -> None:
+    trace(
+        "reset",
+        kind=kind,
+        story=str(story_path),
+        target=target,
+        files=files,
+        duration_us=int((time.perf_counter() - started) * 1_000_000),
+    )
 
 
 def find_asset_output_files(
@@ -31,7 +206,12 @@ def find_asset_output_files(
     asset_name: str,
     asset_types: Optional[List[str]] = None,
 ) -> List[Path]:
-    """Find all output files matching an asset name slug anywhere under story_path."""
+    """Find all output files matching an asset name slug anywhere under story_path.
+
+    Answered from the story's asset index (see asset_index), which only re-lists
+    directories that changed since the previous lookup.
+    """
+    started = time.perf_counter()
     slug = _slug(asset_name)
     exts: Set[str] = set()
     if asset_types:
@@ -40,14 +220,9 @@ def find_asset_output_files(
     if not exts:
         exts = _ALL_EXTS
 
-    found = []
-    for f in story_path.rglob("*"):
-        if not f.is_file() or f.stat().st_size == 0:
-            continue
-        if f.suffix.lower() not in exts:
-            continue
-        if slug in _slug(f.stem):
-            found.append(f)
+    index = index_for(story_path)
+    found = [story_path / f.path.relative_to(index.story_path) for f in index.lookup(slug, exts)]
+    _trace_reset("find_asset", story_path, asset_name, len(found), started)
     return found
 
 
@@ -55,48 +230,42 @@ def delete_asset_outputs(
     story_path: Path,
     asset_name: str,
     scene_hint: Optional[str] = None,
+    *,
+    trash_id: Optional[str] = None,
 ) -> int:
-    """Delete output files for an asset. Returns count of files deleted."""
-    slug = _slug(asset_name)
-    deleted = 0
+    """Delete output files for an asset. Returns count of files deleted.
 
-    # Search in scene_hint dir first, then all
-    search_paths: List[Path] = []
+    Matches (muxed variants and empty files included) come from the story's asset index,
+    so only directories changed since the previous lookup are re-listed; files under
+    scene_hint directories are deleted first.
+    With trash_id the files are moved into .trash/<trash_id>/ instead (soft reset).
+    """
+    started = time.perf_counter()
+    index = index_for(story_path)
+    found = [
+        story_path / f.path.relative_to(index.story_path)
+        for f in index.lookup(_slug(asset_name), include_empty=True)
+    ]
     if scene_hint:
-        for d in story_path.rglob(f"*{scene_hint}*"):
-            if d.is_dir():
-                search_paths.append(d)
-    search_paths.append(story_path)
-
-    seen: Set[Path] = set()
-    for base in search_paths:
-        for f in base.rglob("*"):
-            if f in seen or not f.is_file():
-                continue
-            seen.add(f)
-            if f.suffix.lower() in _ALL_EXTS and slug in _slug(f.stem):
-                logger.info(f"Deleting: {f}")
-                f.unlink()
-                deleted += 1
-            # Also delete muxed variants
-            elif "_muxed" in f.name and slug in _slug(f.stem):
-                logger.info(f"Deleting muxed: {f}")
-                f.unlink()
-                deleted += 1
-
-    # Delete final_stitched files (downstream of any video reset)
-    for stitched in story_path.glob("final_stitched_*.mp4"):
-        if stitched not in seen:
-            logger.info(f"Deleting stitched: {stitched}")
-            stitched.unlink()
-            deleted += 1
+        found.sort(key=lambda f: not any(scene_hint in part for part in f.relative_to(story_path).parts[:-1]))
+    plan: List[Deletion] = [
+        # Also delete muxed variants
+        (f, "Deleting: " if f.suffix.lower() in _ALL_EXTS else "Deleting muxed: ", False)
+        for f in found
+    ]
+    deleted = sum(_carry_out(story_path, plan, trash_id))
 
+    _trace_reset("asset", story_path, asset_name, deleted, started)
     return deleted
 
 
-def reset_scene(story_path: Path, scene_id: str) -> int:
-    """Delete all generated output files in a scene directory. scene_id like 'C01_S00'."""
-    deleted = 0
+def reset_scene(story_path: Path, scene_id: str, *, trash_id: Optional[str] = None) -> int:
+    """Delete all generated output files in a scene directory. scene_id like 'C01_S00'.
+
+    With trash_id the files are moved into .trash/<trash_id>/ instead (soft reset).
+    """
+    started = time.perf_counter()
+    plan: List[Deletion] = []
     # Extract numeric parts: C01_S00 -> chapter_num="1", scene_num="0"
     match = re.match(r"C(\d+)_S(\d+)", scene_id, re.IGNORECASE)
     if not match:
@@ -120,22 +289,25 @@ def reset_scene(story_path: Path, scene_id: str) -> int:
             dir_num = dir_match.group(1).lstrip("0") or "0"
             if dir_num != scene_num:
                 continue
-            for f in scene_dir.iterdir():
-                if f.is_file() and f.suffix.lower() in _ALL_EXTS and f.stat().st_size > 0:
-                    logger.info(f"Reset scene: deleting {f}")
-                    f.unlink()
-                    deleted += 1
+            with os.scandir(scene_dir) as it:
+                for entry in it:
+                    if _is_output_name(entry.name) and entry.is_file():
+                        plan.append((Path(entry.path), "Reset scene: deleting ", True))
     # Also delete final stitched
     for stitched in story_path.glob("final_stitched_*.mp4"):
-        logger.info(f"Reset scene: deleting stitched {stitched}")
-        stitched.unlink()
-        deleted += 1
+        plan.append((stitched, "Reset scene: deleting stitched ", False))
+    deleted = sum(_carry_out(story_path, plan, trash_id))
+    _trace_reset("scene", story_path, scene_id, deleted, started)
     return deleted
 
 
-def reset_chapter(story_path: Path, chapter_id: str) -> int:
-    """Delete all generated output files in a chapter (all scenes). chapter_id like 'C01'."""
-    deleted = 0
+def reset_chapter(story_path: Path, chapter_id: str, *, trash_id: Optional[str] = None) -> int:
+    """Delete all generated output files in a chapter (all scenes). chapter_id like 'C01'.
+
+    With trash_id the files are moved into .trash/<trash_id>/ instead (soft reset).
+    """
+    started = time.perf_counter()
+    plan: List[Deletion] = []
     match = re.match(r"C(\d+)", chapter_id, re.IGNORECASE)
     if not match:
         logger.warning(f"Invalid chapter_id format: {chapter_id}")
@@ -151,35 +323,138 @@ def reset_chapter(story_path: Path, chapter_id: str) -> int:
         dir_num = str(int(dir_match.group(1)))
         if dir_num != chapter_num:
             continue
-        for f in chapter_dir.rglob("*"):
-            if f.is_file() and f.suffix.lower() in _ALL_EXTS and f.stat().st_size > 0:
-                logger.info(f"Reset chapter: deleting {f}")
-                f.unlink()
-                deleted += 1
+        plan.extend((f, "Reset chapter: deleting ", True) for f in iter_output_files(chapter_dir))
     # Also delete final stitched
     for stitched in story_path.glob("final_stitched_*.mp4"):
-        logger.info(f"Reset chapter: deleting stitched {stitched}")
-        stitched.unlink()
-        deleted += 1
+        plan.append((stitched, "Reset chapter: deleting stitched ", False))
+    deleted = sum(_carry_out(story_path, plan, trash_id))
+    _trace_reset("chapter", story_path, chapter_id, deleted, started)
     return deleted
 
 
-def reset_story(story_path: Path) -> int:
-    """Delete story.json and all generated outputs to force full regeneration."""
-    deleted = 0
+def reset_story(story_path: Path, *, trash_id: Optional[str] = None) -> int:
+    """Delete story.json and all generated outputs to force full regeneration.
+
+    With trash_id the files are moved into .trash/<trash_id>/ instead (soft reset).
+    """
+    started = time.perf_counter()
+    plan: List[Deletion] = []
     story_json = story_path / "story.json"
     if story_json.exists():
-        story_json.unlink()
+        plan.append((story_json, None, False))
         logger.info("Reset story: deleted story.json")
-        deleted += 1
-    for f in story_path.rglob("*"):
-        if f.is_file() and f.suffix.lower() in _ALL_EXTS:
-            f.unlink()
-            deleted += 1
-    for pattern in ["final_stitched_*.mp4", "remotion_input.json"]:
-        for f in story_path.glob(pattern):
-            if f.exists():
-                f.unlink()
-                deleted += 1
+    # Includes final_stitched_*.mp4 at the top level
+    plan.extend((f, None, False) for f in iter_output_files(story_path))
+    remotion_input = story_path / "remotion_input.json"
+    if remotion_input.exists():
+        plan.append((remotion_input, None, False))
+    deleted = sum(_carry_out(story_path, plan, trash_id))
     logger.info(f"Reset story: deleted {deleted} files total")
+    _trace_reset("story", story_path, "*", deleted, started)
     return deleted
+
+
+def _scene_key(scene_id: str) -> Optional[Tuple[str, str]]:
+    match = re.match(r"C(\d+)_S(\d+)", scene_id, re.IGNORECASE)
+    if not match:
+        return None
+    return str(int(match.group(1))), match.group(2).lstrip("0") or "0"
+
+
+def _chapter_num(dir_name: str) -> Optional[str]:
+    if not dir_name.startswith("Chapter"):
+        return None
+    match = re.match(r"Chapter(\d+)", dir_name)
+    return str(int(match.group(1))) if match else None
+
+
+def _scene_num(dir_name: str) -> Optional[str]:
+    match = re.match(r"scene_(\d+)", dir_name)
+    return (match.group(1).lstrip("0") or "0") if match else None
+
+
+def reset_batch(
+    story_path: Path,
+    targets: Sequence[Tuple[str, str]],
+    *,
+    trash_id: Optional[str] = None,
+    command_ids: Sequence[str] = (),
+) -> List[int]:
+    """Reset many targets in one walk of the story. Returns files deleted per target.
+
+    targets are (kind, target) pairs with kind "asset" (asset name), "scene" (like
+    'C01_S00') or "chapter" (like 'C01'). Each target selects the same files as
+    delete_asset_outputs / reset_scene / reset_chapter, and a file selected by several
+    targets is counted for the first of them, so the counts match running the resets one
+    after another in order. The final_stitched_*.mp4 cascade of scene and chapter resets
+    happens once, counted for the first scene or chapter target.
+
+    With trash_id all targets' files go into one tombstone, .trash/<trash_id>/, whose
+    manifest lists command_ids so undoing any of them restores the whole batch.
+    """
+    started = time.perf_counter()
+    counts = [0] * len(targets)
+    # Per target: predicate on (path parts relative to story_path), and whether empty files are kept
+    rules: List[Optional[Tuple[Callable[[Tuple[str, ...]], bool], bool]]] = []
+    cascade_owner: Optional[int] = None
+    for i, (kind, target) in enumerate(targets):
+        if kind == "asset":
+            slug = _slug(target)
+            rules.append((lambda parts, slug=slug: slug in _slug(os.path.splitext(parts[-1])[0]), False))
+            continue
+        if kind == "scene":
+            key = _scene_key(target)
+            if key is None:
+                logger.warning(f"Invalid scene_id format: {target}")
+                rules.append(None)
+                continue
+            rules.append((
+                lambda parts, key=key: len(parts) == 3 and _is_output_name(parts[2])
+                and (_chapter_num(parts[0]), _scene_num(parts[1])) == key,
+                True,
+            ))
+        elif kind == "chapter":
+            match = re.match(r"C(\d+)", target, re.IGNORECASE)
+            if not match:
+                logger.warning(f"Invalid chapter_id format: {target}")
+                rules.append(None)
+                continue
+            num = str(int(match.group(1)))
+            rules.append((
+                lambda parts, num=num: len(parts) > 1 and _is_output_name(parts[-1]) and _chapter_num(parts[0]) == num,
+                True,
+            ))
+        else:
+            raise ValueError(f"Unknown reset target kind: {kind!r}")
+        if cascade_owner is None:
+            cascade_owner = i
+
+    def owner_of(f: Path, parts: Tuple[str, ...]) -> Optional[int]:
+        for i, rule in enumerate(rules):
+            if i == cascade_owner and len(parts) == 1 and fnmatch.fnmatchcase(parts[0], "final_stitched_*.mp4"):
+                return i
+            if rule is None or not rule[0](parts):
+                continue
+            if rule[1]:
+                try:
+                    if f.stat().st_size == 0:
+                        continue
+                except OSError:
+                    continue
+            return i
+        return None
+
+    root = str(story_path)
+    plan: List[Deletion] = []
+    owners: List[int] = []
+    for f in iter_output_files(story_path, lambda name: _is_output_name(name) or "_muxed" in name):
+        owner = owner_of(f, Path(os.path.relpath(f, root)).parts)
+        if owner is None:
+            continue
+        kind, target = targets[owner]
+        plan.append((f, f"Reset batch ({kind} {target}): deleting ", False))
+        owners.append(owner)
+    for owner, deleted in zip(owners, _carry_out(story_path, plan, trash_id, command_ids)):
+        counts[owner] += deleted
+    _trace_reset("batch", story_path, ",".join(t for _, t in targets), sum(counts), started)
+    return counts
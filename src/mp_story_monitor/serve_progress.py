@@ -2,26 +2,102 @@
 Serve the progress viewer and story JSON from a story folder.
 
 Use this so the browser can open progress_viewer.html and poll _progress.json /
-_director_progress.json with no-cache. Caller is responsible for resolving the
+_director_progress.json with no-cache. GET api/stream is a Server-Sent Events stream that
+announces changes to those files (inotify on Linux, mtime polling elsewhere), so the viewer
+only fetches when something changed. Caller is responsible for resolving the
 story path (e.g. from config + job in mp-auto-generate).
 
 Usage:
   python -m mp_story_monitor.serve_progress --port 8081 /path/to/story
+  # one server for every story folder under a root, at /stories/<story_id>/:
+  python -m mp_story_monitor.serve_progress --port 8081 --root /path/to/stories
   # or from code:
-  from mp_story_monitor.serve_progress import serve
+  from mp_story_monitor.serve_progress import serve, serve_root
   serve(Path("/path/to/story"), port=8081)
 """
+import email.utils
+import errno
+import functools
+import gzip
+import html
+import http.server
 import json
 import logging
+import mimetypes
 import os
+import queue
+import re
 import socketserver
+import stat
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 
+from mp_story_monitor.asset_index import ASSET_EXTENSIONS
+from mp_story_monitor.atomic import atomic_write_text
+from mp_story_monitor.commands import COMMANDS_JOURNAL_FILENAME, CommandAction, journal_for
+from mp_story_monitor.instrumentation import trace, trace_enabled
+from mp_story_monitor.jobs import ResetJobQueue
+from mp_story_monitor.metrics import default_registry
+from mp_story_monitor.storage import FileProgressStore
 from mp_story_monitor.tracker import ProgressTracker, VIEWER_HTML_FILENAME
+from mp_story_monitor.trash import TRASH_RETENTION_SEC, TrashReaper, find_tombstone, list_trash, undo_trash
+from mp_story_monitor.watch import FileWatcher
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_PORT = 8081
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_IN_FLIGHT = 64
+# Open api/stream connections (they do not count against max_in_flight); more get 503
+DEFAULT_MAX_STREAMS = 256
+_STORY_ID_RE = re.compile(r"^[A-Za-z0-9._-]+$")
+# Files whose changes are pushed to api/stream subscribers
+STREAM_WATCHED_FILES = ("_progress.json", "_director_progress.json", COMMANDS_JOURNAL_FILENAME)
+STREAM_KEEPALIVE_SEC = 15.0
+STREAM_SEND_TIMEOUT_SEC = 5.0
+# Served with ETag/Last-Modified from an in-memory cache
+STATE_FILES = ("_progress.json", "_director_progress.json")
+STATE_CACHE_MAX_ENTRIES = 256
+# Other story text files are served from memory too, with validators and cached gzip bodies;
+# larger ones are streamed from disk uncompressed
+TEXT_CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json",
+}
+TEXT_CACHE_MAX_ENTRIES = 128
+TEXT_CACHE_MAX_FILE_BYTES = 512 * 1024
+# Story folders with a live FileWatcher (one thread and inotify instance each); the least
+# recently used one without stream subscribers is closed beyond this. Kept well below the
+# default fs.inotify.max_user_instances (128).
+WATCHED_STORIES_MAX = 64
+_MEDIA_CONTENT_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".flac": "audio/flac",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".mov": "video/quicktime",
+}
+# api/snapshot section -> story file (commands come from the command journal)
+SNAPSHOT_SECTIONS = {
+    "progress": "_progress.json",
+    "director": "_director_progress.json",
+    "commands": COMMANDS_JOURNAL_FILENAME,
+}
+# Dynamic responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
 
 
 def _ensure_story_folder(story_path: Path) -> None:
@@ -31,183 +107,1235 @@ def _ensure_story_folder(story_path: Path) -> None:
         story_path.mkdir(parents=True, exist_ok=True)
         try:
             ProgressTracker(story_path, job_id="", workflow="").ensure_viewer()
-            (story_path / "_progress.json").write_text(
+            atomic_write_text(
+                story_path / "_progress.json",
                 '{"phases":{},"phase_order":["reddit","director","production","assembly"],"updated_ts":""}',
-                encoding="utf-8",
             )
         except Exception as e:
             logger.warning(f"Failed to ensure story folder setup: {e}")
 
 
-def serve(story_path: Path, port: int = DEFAULT_PORT) -> None:
-    """Run HTTP server for the given story folder until interrupted."""
-    import http.server
+def _gzip(data: bytes, level: int = GZIP_LEVEL) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
 
-    story_path = Path(story_path).resolve()
-    _ensure_story_folder(story_path)
-    if not (story_path / "_progress.json").exists():
-        print("No _progress.json yet. Start the pipeline; the viewer will update when it runs.")
 
-    print(f"Serving: {story_path}")
-    print(f"Open: http://localhost:{port}/progress_viewer.html")
-    print("Press Ctrl+C to stop.")
+class _StaticAsset:
+    """A package file loaded and gzip-compressed once, when the server starts."""
 
-    package_dir = Path(__file__).resolve().parent
-    viewer_file = package_dir / "progress_viewer.html"
-    viewer_path_for_handler = viewer_file if viewer_file.exists() else None
-    if viewer_path_for_handler:
-        print(f"Viewer served from package: {viewer_path_for_handler}")
+    __slots__ = ("body", "gzip_body", "content_type")
 
-    os.chdir(story_path)
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.gzip_body = _gzip(body, 9)
+        self.content_type = content_type
 
-    class _ProgressHandler(http.server.SimpleHTTPRequestHandler):
-        viewer_path = viewer_path_for_handler
-        _story_path = story_path
+    @classmethod
+    def load(cls, path: Optional[Path], content_type: str) -> Optional["_StaticAsset"]:
+        if path is None:
+            return None
+        try:
+            return cls(path.read_bytes(), content_type)
+        except OSError as e:
+            logger.warning(f"Failed to load static asset {path}: {e}")
+            return None
 
-        def _send_no_cache_headers(self) -> None:
-            self.send_header("Cache-Control", "no-store, no-cache, must-revalidate")
-            self.send_header("Pragma", "no-cache")
 
-        def do_GET(self) -> None:
-            path_clean = (self.path or "").split("?")[0].strip("/")
-            if self.viewer_path and (
-                path_clean == VIEWER_HTML_FILENAME
-                or (self.path or "").rstrip("/").endswith(VIEWER_HTML_FILENAME)
-            ):
-                try:
-                    content = self.viewer_path.read_bytes()
-                    self.send_response(200)
-                    self.send_header("Content-type", "text/html; charset=utf-8")
-                    self.send_header("Content-Length", str(len(content)))
-                    self._send_no_cache_headers()
-                    self.end_headers()
-                    self.wfile.write(content)
+@functools.lru_cache(maxsize=None)
+def media_extensions() -> frozenset:
+    """Extensions served with Range support and sendfile: the reset module's image/audio/video sets."""
+    return frozenset(ASSET_EXTENSIONS["image"] | ASSET_EXTENSIONS["audio"] | ASSET_EXTENSIONS["video"])
+
+
+def _is_media(path_clean: str) -> bool:
+    return os.path.splitext(path_clean)[1].lower() in media_extensions()
+
+
+def _is_text_file(path_clean: str) -> bool:
+    return os.path.splitext(path_clean)[1].lower() in TEXT_CONTENT_TYPES
+
+
+def _media_content_type(path: str) -> str:
+    ext = os.path.splitext(path.split("?", 1)[0])[1].lower()
+    return _MEDIA_CONTENT_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single "bytes=" range, or None to ignore the header.
+
+    Multiple ranges are ignored (the whole file is sent). Raises ValueError if the range
+    cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if first and start >= size:
+        raise ValueError(f"range {header!r} outside {size} bytes")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+# Body keys of api/reset-batch targets -> reset_batch kind
+_BATCH_TARGET_KEYS = (("asset_name", "asset"), ("scene_id", "scene"), ("chapter_id", "chapter"))
+_BATCH_ACTIONS = {
+    "asset": CommandAction.RESET_ASSET,
+    "scene": CommandAction.RESET_SCENE,
+    "chapter": CommandAction.RESET_CHAPTER,
+}
+
+
+def _batch_targets(raw) -> Union[List[Tuple[str, str]], str]:
+    """(kind, target) pairs from an api/reset-batch body's targets, or an error message."""
+    if not isinstance(raw, list) or not raw:
+        return "Missing targets"
+    targets = []
+    for item in raw:
+        found = [(kind, item[key]) for key, kind in _BATCH_TARGET_KEYS if isinstance(item, dict) and item.get(key)]
+        if len(found) != 1 or not isinstance(found[0][1], str):
+            return "Each target needs one of asset_name, scene_id or chapter_id"
+        targets.append(found[0])
+    return targets
+
+
+# Endpoints reported under their own name in metrics; anything else is grouped
+_METRIC_ENDPOINTS = frozenset({
+    "", VIEWER_HTML_FILENAME, "_progress.json", "_director_progress.json",
+    "api/progress-events", "api/stream", "api/snapshot", "api/commands", "api/jobs", "api/metrics",
+    "api/reset-asset", "api/reset-scene", "api/reset-chapter", "api/reset-story", "api/reset-batch",
+    "api/undo-reset", "api/trash",
+})
+
+
+def _endpoint_label(path_clean: str) -> str:
+    """Bounded-cardinality metrics label for an in-story path."""
+    if path_clean in _METRIC_ENDPOINTS:
+        return path_clean or "index"
+    if path_clean.startswith("api/jobs/"):
+        return "api/jobs/:id"
+    if path_clean.startswith("api/"):
+        return "api/other"
+    if path_clean.endswith(VIEWER_HTML_FILENAME):
+        return VIEWER_HTML_FILENAME
+    return "media" if _is_media(path_clean) else "static"
+
+
+def _is_story_id(name: str) -> bool:
+    return bool(_STORY_ID_RE.match(name)) and not name.startswith(".")
+
+
+def _viewer_file() -> Optional[Path]:
+    viewer_file = Path(__file__).resolve().parent / VIEWER_HTML_FILENAME
+    return viewer_file if viewer_file.exists() else None
+
+
+_watchers: "OrderedDict[Path, FileWatcher]" = OrderedDict()
+_stream_hubs: Dict[Path, "_StreamHub"] = {}
+_registry_lock = threading.Lock()
+
+
+class _CachedFile:
+    __slots__ = ("body", "etag", "last_modified", "mtime", "stat_key", "generation", "_gzip_body", "_valid_json")
+
+    def __init__(self, body: bytes, st: os.stat_result, generation: int):
+        self.body = body
+        self.stat_key = _stat_key(st)
+        self.etag = f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+        self.last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+        self.mtime = st.st_mtime
+        self.generation = generation
+        self._gzip_body: Optional[bytes] = None
+        self._valid_json: Optional[bool] = None
+
+    def gzip_body(self) -> bytes:
+        """Compressed body, computed at most once per file version."""
+        if self._gzip_body is None:
+            self._gzip_body = _gzip(self.body)
+        return self._gzip_body
+
+    @property
+    def version(self) -> str:
+        return self.etag.strip('"')
+
+    def valid_json(self) -> bool:
+        """Whether body parses as JSON, checked at most once per file version."""
+        if self._valid_json is None:
+            try:
+                json.loads(self.body)
+                self._valid_json = True
+            except ValueError:
+                self._valid_json = False
+        return self._valid_json
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class _StateFileCache:
+    """In-memory copies of story state files, keyed by path and validated by the story watcher.
+
+    While the watcher reports no change to a file and its (inode, mtime, size) is unchanged,
+    requests are answered from memory with one stat and no read. The stat catches writes
+    the watcher cannot see, e.g. from another host on NFS, where inotify is silent.
+    Entries are evicted least-recently-used beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = STATE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Path, _CachedFile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def forget(self, story_path: Path) -> None:
+        """Drop the entries of one story folder (its watcher was closed)."""
+        with self._lock:
+            for path in [p for p in self._entries if p.parent == story_path]:
+                del self._entries[path]
+
+    def get(self, story_path: Path, name: str) -> Optional[_CachedFile]:
+        """Current contents of story_path/name, or None if the file does not exist."""
+        path = story_path / name
+        generation = _story_watcher(story_path).file_generation(name)
+        try:
+            key = _stat_key(os.stat(path))
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.generation == generation and entry.stat_key == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # Generation was taken before the read, so a change racing with it is re-read next time
+        try:
+            with open(path, "rb") as f:
+                entry = _CachedFile(f.read(), os.fstat(f.fileno()), generation)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+class _TextFileCache:
+    """In-memory copies of static text files, keyed by path and validated by (inode, mtime, size).
+
+    Each request costs one stat; a file is re-read only when it changed. Files larger than
+    max_file_bytes are not cached. Entries are evicted least-recently-used beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = TEXT_CACHE_MAX_ENTRIES, max_file_bytes: int = TEXT_CACHE_MAX_FILE_BYTES):
+        self.max_entries = max_entries
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Path, _CachedFile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path) -> Optional[_CachedFile]:
+        """Current contents of path, or None if it is not a regular file of at most max_file_bytes."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode) or st.st_size > self.max_file_bytes:
+            with self._lock:
+                self._entries.pop(path, None)
+            return None
+        key = _stat_key(st)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stat_key == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        try:
+            with open(path, "rb") as f:
+                entry = _CachedFile(f.read(), os.fstat(f.fileno()), 0)
+        except OSError:
+            return None
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def _story_watcher(story_path: Path) -> FileWatcher:
+    """Shared watcher for a story folder's state files, created on first use.
+
+    At most WATCHED_STORIES_MAX watchers are kept: creating one closes the least recently
+    used watchers whose story has no stream subscribers, and drops their cached files.
+    """
+    evicted: List[Tuple[Path, FileWatcher]] = []
+    with _registry_lock:
+        watcher = _watchers.get(story_path)
+        if watcher is not None:
+            _watchers.move_to_end(story_path)
+            return watcher
+        watcher = _watchers[story_path] = FileWatcher(story_path, STREAM_WATCHED_FILES)
+        for path in list(_watchers)[:-1]:
+            if len(_watchers) <= WATCHED_STORIES_MAX:
+                break
+            hub = _stream_hubs.get(path)
+            if hub is not None and hub.busy:
+                continue
+            _stream_hubs.pop(path, None)
+            evicted.append((path, _watchers.pop(path)))
+    # Closing joins the watcher thread, so it happens outside the registry lock
+    for path, old in evicted:
+        old.close()
+        _state_file_cache.forget(path)
+    return watcher
+
+
+class _StreamHub:
+    """Pushes a story's change notifications to its api/stream (SSE) subscribers.
+
+    One thread per story with subscribers writes to every subscribed socket, so an open
+    stream holds no request worker. Subscribers that fail or time out are dropped; the
+    thread exits when none remain.
+    """
+
+    def __init__(self, watcher: FileWatcher):
+        self.watcher = watcher
+        self._lock = threading.Lock()
+        self._clients: List = []
+        self._reserved = 0  # streams being opened, not yet subscribed
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    @property
+    def streams(self) -> int:
+        """Subscribers plus streams being opened."""
+        with self._lock:
+            return len(self._clients) + self._reserved
+
+    @property
+    def busy(self) -> bool:
+        """True while the hub has (or is about to get) subscribers or its thread runs."""
+        with self._lock:
+            return bool(self._clients or self._reserved or self._thread is not None)
+
+    def reserve(self) -> None:
+        with self._lock:
+            self._reserved += 1
+
+    def release(self) -> None:
+        """Give back a reservation whose stream was never subscribed."""
+        with self._lock:
+            self._reserved -= 1
+
+    def subscribe(self, sock) -> None:
+        sock.settimeout(STREAM_SEND_TIMEOUT_SEC)
+        with self._lock:
+            self._reserved -= 1
+            self._clients.append(sock)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="serve-progress-stream", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _send(sock, message: bytes) -> bool:
+        try:
+            sock.sendall(message)
+            return True
+        except OSError:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            return False
+
+    def _run(self) -> None:
+        generation = self.watcher.generation
+        while True:
+            current = self.watcher.wait(generation, timeout=STREAM_KEEPALIVE_SEC)
+            if current != generation:
+                data = {"generation": current, "files": self.watcher.changed_since(generation)}
+                message = f"event: change\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+                generation = current
+            else:
+                message = b": keepalive\n\n"
+            with self._lock:
+                clients = list(self._clients)
+            dead = [sock for sock in clients if not self._send(sock, message)]
+            with self._lock:
+                for sock in dead:
+                    self._clients.remove(sock)
+                if not self._clients:
+                    self._thread = None
                     return
-                except Exception as e:
-                    logger.warning(f"Failed to serve viewer HTML: {e}")
-            if path_clean == "_progress.json":
+
+
+_state_file_cache = _StateFileCache()
+_text_file_cache = _TextFileCache()
+_reset_jobs = ResetJobQueue()
+_metrics = default_registry()
+_servers: "weakref.WeakSet[_PooledHTTPServer]" = weakref.WeakSet()
+
+
+def _server_metrics():
+    """Scrape-time samples: state cache, request pool, open streams, queued reset jobs."""
+    lookups = _state_file_cache.hits + _state_file_cache.misses
+    yield ("state_cache_hits_total", "counter", "State file requests answered from memory.",
+           [({}, _state_file_cache.hits)])
+    yield ("state_cache_misses_total", "counter", "State file requests that read the file.",
+           [({}, _state_file_cache.misses)])
+    yield ("state_cache_hit_ratio", "gauge", "Share of state file requests answered from memory.",
+           [({}, _state_file_cache.hits / lookups if lookups else 0.0)])
+    servers = list(_servers)
+    yield ("http_in_flight_requests", "gauge", "Requests running or queued for a worker.",
+           [({"port": str(srv.server_address[1])}, srv.in_flight) for srv in servers])
+    with _registry_lock:
+        hubs = list(_stream_hubs.values())
+    yield ("stream_subscribers", "gauge", "Open api/stream connections.",
+           [({}, sum(hub.subscribers for hub in hubs))])
+    jobs = _reset_jobs.jobs()
+    yield ("reset_jobs_queued", "gauge", "Reset jobs pending or running.",
+           [({}, sum(1 for j in jobs if j.status in ("pending", "running")))])
+
+
+_metrics.register_collector(_server_metrics)
+
+
+def _stream_hub(story_path: Path, max_streams: int = DEFAULT_MAX_STREAMS) -> Optional[_StreamHub]:
+    """The story's stream hub with one subscription reserved (subscribe() or release() it).
+
+    The reservation keeps the story's watcher from being evicted while the stream opens.
+    Returns None if max_streams streams (over all stories) are already open.
+    """
+    while True:
+        watcher = _story_watcher(story_path)
+        with _registry_lock:
+            if _watchers.get(story_path) is not watcher:
+                continue  # evicted in between
+            if sum(hub.streams for hub in _stream_hubs.values()) >= max_streams:
+                return None
+            hub = _stream_hubs.get(story_path)
+            if hub is None:
+                hub = _stream_hubs[story_path] = _StreamHub(watcher)
+            hub.reserve()
+            return hub
+
+
+class _ProgressHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves one story folder, or every story folder under story_root at /stories/<story_id>/.
+
+    Static files are served from the resolved story folder via self.directory; the process
+    working directory is never changed.
+    """
+
+    viewer_path: Optional[Path] = None
+    viewer_asset: Optional[_StaticAsset] = None  # viewer_path, precompressed at startup
+    story_root: Optional[Path] = None  # multi-story mode
+    soft_reset = False  # default for resets whose body has no "soft"
+    trash_retention = TRASH_RETENTION_SEC
+    _story_path: Optional[Path] = None  # single-story mode; set per request in multi-story mode
+    _response_status = 0
+    _response_bytes = 0
+    _endpoint = "other"  # metrics label, set by _route
+
+    def _route(self) -> Optional[str]:
+        """Resolve the request to a story folder and return the path within it.
+
+        In multi-story mode the index pages and unknown stories are answered here and None is
+        returned; otherwise self._story_path, self.directory and self.path are set so the rest
+        of the handler (including SimpleHTTPRequestHandler's file serving) is story-relative.
+        """
+        raw_path, _, query = (self.path or "").partition("?")
+        path_clean = raw_path.strip("/")
+        if self.story_root is None:
+            self.directory = str(self._story_path)
+            self._endpoint = _endpoint_label(path_clean)
+            return path_clean
+        if path_clean in ("", "stories", "api/stories") and self.command in ("GET", "HEAD"):
+            self._endpoint = "api/stories" if path_clean == "api/stories" else "index"
+            self._send_story_index(as_json=path_clean == "api/stories")
+            return None
+        if path_clean == "api/metrics" and self.command in ("GET", "HEAD"):
+            self._endpoint = "api/metrics"
+            self._send_metrics()
+            return None
+        parts = path_clean.split("/", 2)
+        story_id = parts[1] if len(parts) > 1 else ""
+        if parts[0] != "stories" or not _is_story_id(story_id) or not (self.story_root / story_id).is_dir():
+            self.send_error(404, "Unknown story")
+            return None
+        if len(parts) == 2:
+            self.send_response(302)
+            self.send_header("Location", f"/stories/{story_id}/{VIEWER_HTML_FILENAME}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        self._story_path = self.story_root / story_id
+        self.directory = str(self._story_path)
+        self.path = "/" + parts[2] + ("?" + query if query else "")
+        path_clean = parts[2].strip("/")
+        self._endpoint = _endpoint_label(path_clean)
+        return path_clean
+
+    def _send_story_index(self, as_json: bool) -> None:
+        """List story folders under story_root that have a _progress.json and a routable name."""
+        stories = []
+        for s in sorted(FileProgressStore(self.story_root).list_stories(), key=lambda s: -s.updated_ts):
+            story_id = Path(s.story_path).name
+            if not _is_story_id(story_id):
+                continue
+            stories.append({
+                "id": story_id,
+                "status": s.status,
+                "updated_ts": s.updated_ts,
+                "version": s.version,
+                "viewer": f"/stories/{story_id}/{VIEWER_HTML_FILENAME}",
+            })
+        if as_json:
+            body = json.dumps({"root": str(self.story_root), "stories": stories}).encode("utf-8")
+            content_type = "application/json"
+        else:
+            rows = "".join(
+                f'<li><a href="{html.escape(s["viewer"])}">{html.escape(s["id"])}</a> ({html.escape(s["status"])})</li>'
+                for s in stories
+            )
+            body = f"<!doctype html><title>Stories</title><h1>Stories</h1><ul>{rows}</ul>".encode("utf-8")
+            content_type = "text/html; charset=utf-8"
+        self._send_body(body, content_type)
+
+    def do_HEAD(self) -> None:
+        path_clean = self._route()
+        if path_clean is None:
+            return
+        if _is_media(path_clean):
+            self._send_media()
+            return
+        if _is_text_file(path_clean) and self._send_text_file(path_clean):
+            return
+        super().do_HEAD()
+
+    def handle_one_request(self) -> None:
+        started = time.perf_counter_ns()
+        self._response_status = 0
+        self._response_bytes = 0
+        self._endpoint = "other"
+        super().handle_one_request()
+        if not getattr(self, "command", None):
+            return
+        duration_ns = time.perf_counter_ns() - started
+        _metrics.inc("http_requests_total", endpoint=self._endpoint, method=self.command, status=self._response_status)
+        _metrics.observe("http_request_duration_seconds", duration_ns / 1e9, endpoint=self._endpoint)
+        if self._response_bytes:
+            _metrics.inc("http_response_bytes_total", self._response_bytes, endpoint=self._endpoint)
+        if trace_enabled():
+            trace(
+                "http_request",
+                story=str(self._story_path),
+                method=self.command,
+                path=(self.path or "").split("?")[0],
+                status=self._response_status,
+                bytes=self._response_bytes,
+                duration_us=duration_ns // 1000,
+            )
+
+    def send_response(self, code, message=None) -> None:
+        self._response_status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value) -> None:
+        if keyword.lower() == "content-length":
+            try:
+                self._response_bytes = int(value)
+            except ValueError:
+                pass
+        super().send_header(keyword, value)
+
+    def _accepts_gzip(self) -> bool:
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = part.partition(";")
+            if coding.strip().lower() not in ("gzip", "*"):
+                continue
+            q = params.strip().replace(" ", "")
+            if q.startswith("q="):
                 try:
-                    p = self._story_path / "_progress.json"
-                    if p.exists():
-                        content = p.read_bytes()
-                        self.send_response(200)
-                        self.send_header("Content-type", "application/json")
-                        self.send_header("Content-Length", str(len(content)))
-                        self._send_no_cache_headers()
-                        self.end_headers()
-                        self.wfile.write(content)
-                        return
-                except Exception as e:
-                    logger.warning(f"Failed to serve _progress.json: {e}")
-            if path_clean == "_director_progress.json":
+                    return float(q[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+        return False
+
+    def _send_body(
+        self,
+        body: bytes,
+        content_type: str,
+        *,
+        gzip_body: Optional[bytes] = None,
+        etag: Optional[str] = None,
+        headers: tuple = (("Cache-Control", "no-store"),),
+    ) -> None:
+        """Send a 200 response, gzip-encoded when the client accepts it and body is big enough.
+
+        gzip_body is a precomputed encoding of body (static assets, cached state files). The
+        gzip variant gets its own ETag ("...-gz"); _not_modified accepts either.
+        """
+        compressible = len(body) >= GZIP_MIN_BYTES
+        if compressible and self._accepts_gzip():
+            body = gzip_body if gzip_body is not None else _gzip(body)
+            encoding = "gzip"
+            if etag is not None:
+                etag = etag[:-1] + '-gz"'
+        else:
+            encoding = None
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        for keyword, value in headers:
+            self.send_header(keyword, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        path_clean = self._route()
+        if path_clean is None:
+            return
+        if self.viewer_path and (
+            path_clean == VIEWER_HTML_FILENAME
+            or (self.path or "").rstrip("/").endswith(VIEWER_HTML_FILENAME)
+        ):
+            asset = self.viewer_asset or _StaticAsset.load(self.viewer_path, "text/html; charset=utf-8")
+            if asset is not None:
+                self._send_body(
+                    asset.body,
+                    asset.content_type,
+                    gzip_body=asset.gzip_body,
+                    headers=(("Cache-Control", "no-store, no-cache, must-revalidate"), ("Pragma", "no-cache")),
+                )
+                return
+        if path_clean in STATE_FILES and self._send_state_file(path_clean):
+            return
+        if path_clean == "api/progress-events":
+            from urllib.parse import parse_qs, urlsplit
+            from mp_story_monitor.events import read_events
+            query = parse_qs(urlsplit(self.path or "").query)
+            try:
+                offset = int(query.get("offset", ["0"])[0])
+                epoch = int(query["epoch"][0]) if query.get("epoch") else None
+            except ValueError:
+                offset, epoch = 0, None
+            body = json.dumps(read_events(self._story_path, offset, epoch)).encode("utf-8")
+            self._send_body(body, "application/json")
+            return
+        if path_clean == "api/stream":
+            self._start_stream()
+            return
+        if path_clean == "api/snapshot":
+            self._send_snapshot()
+            return
+        if path_clean == "api/metrics":
+            self._send_metrics()
+            return
+        if path_clean == "api/jobs" or path_clean.startswith("api/jobs/"):
+            self._send_jobs(path_clean[len("api/jobs/"):])
+            return
+        if path_clean == "api/trash":
+            trash = list_trash(self._story_path, self.trash_retention)
+            self._send_body(json.dumps({"trash": trash}).encode("utf-8"), "application/json")
+            return
+        if path_clean == "api/commands":
+            from urllib.parse import parse_qs, urlsplit
+            query = parse_qs(urlsplit(self.path or "").query)
+            try:
+                since = int(query["since"][0]) if query.get("since") else None
+            except ValueError:
+                since = None
+            journal = journal_for(self._story_path)
+            seq = journal.seq
+            cmds = journal.commands(since)
+            payload = {"seq": seq, "commands": [asdict(c) for c in cmds]}
+            body = json.dumps(payload).encode("utf-8")
+            self._send_body(body, "application/json")
+            return
+        if _is_media(path_clean):
+            self._send_media()
+            return
+        if _is_text_file(path_clean) and self._send_text_file(path_clean):
+            return
+        super().do_GET()
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        """True if the request's validators (If-None-Match, else If-Modified-Since) match."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {t.strip() for t in if_none_match.split(",")}
+            variants = {etag, etag[:-1] + '-gz"'}
+            return "*" in tags or any(v in tags or f"W/{v}" in tags for v in variants)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _send_state_file(self, name: str) -> bool:
+        """Serve a story state file from the snapshot cache, with 304 when validators match."""
+        try:
+            entry = _state_file_cache.get(self._story_path, name)
+        except Exception as e:
+            logger.warning(f"Failed to serve {name}: {e}")
+            return False
+        if entry is None:
+            return False
+        self._send_cached_file(entry, "application/json")
+        return True
+
+    def _send_text_file(self, path_clean: str) -> bool:
+        """Serve a story text file (.html/.js/.css/.json) from memory; False to fall back to disk."""
+        entry = _text_file_cache.get(Path(self.translate_path(self.path)))
+        if entry is None:
+            return False
+        self._send_cached_file(entry, TEXT_CONTENT_TYPES[os.path.splitext(path_clean)[1].lower()])
+        return True
+
+    def _send_cached_file(self, entry: _CachedFile, content_type: str) -> None:
+        """Send a cached file with validators: 304 when they match, else a (possibly gzip) 200."""
+        validators = (("Last-Modified", entry.last_modified), ("Cache-Control", "no-cache"))
+        compressible = len(entry.body) >= GZIP_MIN_BYTES
+        if self._not_modified(entry.etag, entry.mtime):
+            self.send_response(304)
+            self.send_header("ETag", entry.etag)
+            if compressible:
+                self.send_header("Vary", "Accept-Encoding")
+            for keyword, value in validators:
+                self.send_header(keyword, value)
+            self.end_headers()
+            return
+        gzip_body = entry.gzip_body() if compressible and self._accepts_gzip() else None
+        self._send_body(entry.body, content_type, gzip_body=gzip_body, etag=entry.etag, headers=validators)
+
+    def _send_media(self) -> None:
+        """Serve a story media file with validators, single byte ranges and sendfile."""
+        try:
+            f = open(self.translate_path(self.path), "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                self.send_error(404, "File not found")
+                return
+            size = st.st_size
+            etag = f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{size:x}"'
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+            validators = (
+                ("ETag", etag),
+                ("Last-Modified", last_modified),
+                ("Cache-Control", "no-cache"),
+                ("Accept-Ranges", "bytes"),
+            )
+            if self._not_modified(etag, st.st_mtime):
+                self.send_response(304)
+                for keyword, value in validators:
+                    self.send_header(keyword, value)
+                self.end_headers()
+                return
+            start, end = 0, size - 1
+            range_header = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            byte_range = None
+            if range_header and (if_range is None or if_range.strip() in (etag, last_modified)):
                 try:
-                    p = self._story_path / "_director_progress.json"
-                    if p.exists():
-                        content = p.read_bytes()
-                        self.send_response(200)
-                        self.send_header("Content-type", "application/json")
-                        self.send_header("Content-Length", str(len(content)))
-                        self._send_no_cache_headers()
-                        self.end_headers()
-                        self.wfile.write(content)
-                        return
-                except Exception as e:
-                    logger.warning(f"Failed to serve _director_progress.json: {e}")
-            if path_clean == "api/commands":
-                from mp_story_monitor.commands import read_commands
-                from dataclasses import asdict
-                cmds = read_commands(self._story_path)
-                payload = {"commands": [asdict(c) for c in cmds]}
-                body = json.dumps(payload).encode("utf-8")
+                    byte_range = _parse_byte_range(range_header, size)
+                except ValueError:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    for keyword, value in validators:
+                        self.send_header(keyword, value)
+                    self.end_headers()
+                    return
+            if byte_range is not None:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
                 self.send_response(200)
-                self.send_header("Content-Type", "application/json")
-                self.send_header("Content-Length", str(len(body)))
-                self.send_header("Cache-Control", "no-store")
-                self.end_headers()
-                self.wfile.write(body)
+            self.send_header("Content-Type", _media_content_type(self.path))
+            self.send_header("Content-Length", str(end - start + 1))
+            for keyword, value in validators:
+                self.send_header(keyword, value)
+            self.end_headers()
+            if self.command == "HEAD" or end < start:
                 return
-            super().do_GET()
+            try:
+                # socket.sendfile uses os.sendfile (zero-copy) where available
+                self.connection.sendfile(f, start, end - start + 1)
+            except (BrokenPipeError, ConnectionResetError):
+                # Players abort range requests when seeking
+                self.close_connection = True
 
-        def do_POST(self) -> None:
-            """Handle POST requests for control actions."""
-            from mp_story_monitor.commands import (
-                CommandAction, create_command, read_commands, write_commands,
-            )
-            from mp_story_monitor.reset import (
-                delete_asset_outputs, reset_scene, reset_chapter, reset_story,
+    def _send_metrics(self) -> None:
+        """Process metrics: Prometheus text by default, JSON with ?format=json or Accept: application/json."""
+        from urllib.parse import parse_qs, urlsplit
+        fmt = parse_qs(urlsplit(self.path or "").query).get("format", [""])[0]
+        if fmt == "json" or (not fmt and "application/json" in self.headers.get("Accept", "")):
+            self._send_body(json.dumps(_metrics.to_dict()).encode("utf-8"), "application/json")
+        else:
+            self._send_body(_metrics.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+
+    def _undo_reset(self, command_id: str) -> Dict:
+        """Restore a soft reset's files from .trash and mark its command(s) undone."""
+        from mp_story_monitor.commands import update_command
+
+        if not command_id:
+            return {"ok": False, "error": "Missing command_id"}
+        job = _reset_jobs.get(command_id)
+        if job is not None and job.status in ("pending", "running"):
+            return {"ok": False, "error": "Reset still running"}
+        story_path = self._story_path
+        with _reset_jobs.story_lock(story_path):
+            tombstone = find_tombstone(story_path, command_id)
+            command_ids = next(
+                (t["command_ids"] for t in list_trash(story_path) if tombstone and t["trash_id"] == tombstone.name),
+                [command_id],
             )
+            undone = undo_trash(story_path, command_id)
+        if undone is None:
+            return {"ok": False, "error": "Nothing to undo (not a soft reset, or already purged)"}
+        restored, conflicts = undone
+        journal = journal_for(story_path)
+        for cid in command_ids:
+            cmd = journal.get(cid)
+            if cmd is not None:
+                cmd.status = "undone"
+                cmd.result = f"undone: {restored} files restored"
+                update_command(story_path, cmd)
+        return {"ok": True, "command_ids": command_ids, "files_restored": restored, "conflicts": conflicts}
+
+    def _send_jobs(self, command_id: str) -> None:
+        """api/jobs lists this story's recent reset jobs; api/jobs/<command_id> returns one.
+
+        A job no longer (or never) in memory is answered from the command journal when the
+        command is there, so status survives a server restart.
+        """
+        if not command_id:
+            jobs = [j.to_dict() for j in _reset_jobs.jobs(self._story_path)]
+            self._send_body(json.dumps({"jobs": jobs}).encode("utf-8"), "application/json")
+            return
+        job = _reset_jobs.get(command_id)
+        if job is not None and job.story_path == str(self._story_path):
+            self._send_body(json.dumps(job.to_dict()).encode("utf-8"), "application/json")
+            return
+        cmd = journal_for(self._story_path).get(command_id)
+        if cmd is not None:
+            payload = {
+                "command_id": cmd.id,
+                "status": cmd.status,
+                "result": cmd.result,
+                "processed_at": cmd.processed_at,
+            }
+            self._send_body(json.dumps(payload).encode("utf-8"), "application/json")
+            return
+        self.send_error(404, "Unknown job")
+
+    def _send_snapshot(self) -> None:
+        """Progress, director skeleton and commands in one response.
+
+        Query: progress=, director=, commands= carry the section versions the client already
+        has; those sections are omitted when unchanged. sections=progress,director limits
+        which sections are considered. Versions are opaque tokens (file identity); a missing
+        or partially written file has version null.
+        """
+        from urllib.parse import parse_qs, urlsplit
+        query = parse_qs(urlsplit(self.path or "").query)
+        wanted = query.get("sections", [",".join(SNAPSHOT_SECTIONS)])[0].split(",")
+        versions = {}
+        parts = []
+        for section, filename in SNAPSHOT_SECTIONS.items():
+            if section not in wanted:
+                continue
+            if section == "commands":
+                journal = journal_for(self._story_path)
+                version = str(journal.seq)
+                versions[section] = version
+                if query.get(section, [None])[0] != version:
+                    commands = [asdict(c) for c in journal.commands()]
+                    parts.append(b'"commands": ' + json.dumps(commands).encode("utf-8"))
+                continue
+            entry = _state_file_cache.get(self._story_path, filename)
+            if entry is not None and not entry.valid_json():
+                entry = None
+            version = entry.version if entry is not None else None
+            versions[section] = version
+            if query.get(section, [None])[0] == version:
+                continue
+            if entry is None:
+                raw = b"null"
+            else:
+                # Already-valid JSON from the cache: embedded without re-serializing
+                raw = entry.body
+            parts.append(f'"{section}": '.encode("utf-8") + raw)
+        body = b"{" + b", ".join([b'"versions": ' + json.dumps(versions).encode("utf-8")] + parts) + b"}"
+        self._send_body(body, "application/json")
 
-            path_clean = (self.path or "").split("?")[0].strip("/")
-            content_len = int(self.headers.get("Content-Length", 0))
-            body = json.loads(self.rfile.read(content_len)) if content_len > 0 else {}
-
-            result = {"ok": False, "error": "Unknown endpoint"}
-
-            if path_clean == "api/reset-asset":
-                asset_name = body.get("asset_name", "")
-                if not asset_name:
-                    result = {"ok": False, "error": "Missing asset_name"}
-                else:
-                    cmd = create_command(CommandAction.RESET_ASSET, asset_name)
-                    deleted = delete_asset_outputs(self._story_path, asset_name)
-                    cmds = read_commands(self._story_path)
-                    cmds.append(cmd)
-                    write_commands(self._story_path, cmds)
-                    result = {"ok": True, "command_id": cmd.id, "files_deleted": deleted}
-
-            elif path_clean == "api/reset-scene":
-                scene_id = body.get("scene_id", "")
-                if not scene_id:
-                    result = {"ok": False, "error": "Missing scene_id"}
-                else:
-                    cmd = create_command(CommandAction.RESET_SCENE, scene_id)
-                    deleted = reset_scene(self._story_path, scene_id)
-                    cmds = read_commands(self._story_path)
-                    cmds.append(cmd)
-                    write_commands(self._story_path, cmds)
-                    result = {"ok": True, "command_id": cmd.id, "files_deleted": deleted}
-
-            elif path_clean == "api/reset-chapter":
-                chapter_id = body.get("chapter_id", "")
-                if not chapter_id:
-                    result = {"ok": False, "error": "Missing chapter_id"}
-                else:
-                    cmd = create_command(CommandAction.RESET_CHAPTER, chapter_id)
-                    deleted = reset_chapter(self._story_path, chapter_id)
-                    cmds = read_commands(self._story_path)
-                    cmds.append(cmd)
-                    write_commands(self._story_path, cmds)
-                    result = {"ok": True, "command_id": cmd.id, "files_deleted": deleted}
-
-            elif path_clean == "api/reset-story":
-                cmd = create_command(CommandAction.RESET_STORY, "*")
-                deleted = reset_story(self._story_path)
-                cmds = read_commands(self._story_path)
-                cmds.append(cmd)
-                write_commands(self._story_path, cmds)
-                result = {"ok": True, "command_id": cmd.id, "files_deleted": deleted}
-
-            response_body = json.dumps(result).encode("utf-8")
+    def _start_stream(self) -> None:
+        """Open a text/event-stream and hand the connection to the story's stream hub.
+
+        Clients get "event: change" with {"generation", "files"} whenever a watched file
+        changes, and a comment line every STREAM_KEEPALIVE_SEC otherwise. Beyond the
+        server's max_streams open streams the request gets 503 with Retry-After, and the
+        viewer falls back to polling.
+        """
+        hub = _stream_hub(self._story_path, getattr(self.server, "max_streams", DEFAULT_MAX_STREAMS))
+        if hub is None:
+            self.send_response(503)
+            self.send_header("Retry-After", "5")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
             self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Content-Length", str(len(response_body)))
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
             self.send_header("Access-Control-Allow-Origin", "*")
             self.end_headers()
-            self.wfile.write(response_body)
+            self.wfile.write(b"retry: 2000\n\n")
+            self.wfile.flush()
+        except OSError:
+            hub.release()
+            raise
+        self.close_connection = True
+        self.server.detach(self.connection)
+        hub.subscribe(self.connection)
+
+    def do_POST(self) -> None:
+        """Handle POST requests for control actions.
+
+        Reset endpoints record the command, queue the reset and answer 202 with its
+        command_id; poll api/jobs/<command_id> for status and files_deleted.
+        api/reset-batch records one command per target and resolves them all in one walk.
+        Soft resets (body "soft": true, or the server's soft_reset default) move files into
+        .trash/<command_id>/; api/undo-reset puts them back.
+        """
+        from mp_story_monitor.commands import append_command, create_command
+        from mp_story_monitor.reset import (
+            delete_asset_outputs, reset_batch, reset_scene, reset_chapter, reset_story,
+        )
+
+        path_clean = self._route()
+        if path_clean is None:
+            return
+        content_len = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(content_len)) if content_len > 0 else {}
+        story_path = self._story_path
+
+        result = {"ok": False, "error": "Unknown endpoint"}
+        status = 200
+        job = None
+        soft = bool(body.get("soft", self.soft_reset))
+
+        def trash_id(cmd) -> Optional[str]:
+            return cmd.id if soft else None
+
+        if path_clean == "api/reset-asset":
+            asset_name = body.get("asset_name", "")
+            if not asset_name:
+                result = {"ok": False, "error": "Missing asset_name"}
+            else:
+                cmd = create_command(CommandAction.RESET_ASSET, asset_name)
+                job = (cmd, lambda: delete_asset_outputs(story_path, asset_name, trash_id=trash_id(cmd)))
+
+        elif path_clean == "api/reset-scene":
+            scene_id = body.get("scene_id", "")
+            if not scene_id:
+                result = {"ok": False, "error": "Missing scene_id"}
+            else:
+                cmd = create_command(CommandAction.RESET_SCENE, scene_id)
+                job = (cmd, lambda: reset_scene(story_path, scene_id, trash_id=trash_id(cmd)))
+
+        elif path_clean == "api/reset-chapter":
+            chapter_id = body.get("chapter_id", "")
+            if not chapter_id:
+                result = {"ok": False, "error": "Missing chapter_id"}
+            else:
+                cmd = create_command(CommandAction.RESET_CHAPTER, chapter_id)
+                job = (cmd, lambda: reset_chapter(story_path, chapter_id, trash_id=trash_id(cmd)))
+
+        elif path_clean == "api/reset-story":
+            cmd = create_command(CommandAction.RESET_STORY, "*")
+            job = (cmd, lambda: reset_story(story_path, trash_id=trash_id(cmd)))
+
+        elif path_clean == "api/reset-batch":
+            targets = _batch_targets(body.get("targets"))
+            if isinstance(targets, str):
+                result = {"ok": False, "error": targets}
+            else:
+                cmds = [create_command(_BATCH_ACTIONS[kind], target) for kind, target in targets]
+                for cmd in cmds:
+                    append_command(story_path, cmd)
+                _reset_jobs.submit_batch(story_path, cmds, lambda: reset_batch(
+                    story_path, targets, trash_id=trash_id(cmds[0]), command_ids=[c.id for c in cmds],
+                ))
+                status = 202
+                result = {
+                    "ok": True,
+                    "status": "pending",
+                    "soft": soft,
+                    "commands": [
+                        {"command_id": cmd.id, "action": cmd.action.value, "target": cmd.target,
+                         "job": f"api/jobs/{cmd.id}"}
+                        for cmd in cmds
+                    ],
+                }
+
+        elif path_clean == "api/undo-reset":
+            result = self._undo_reset(str(body.get("command_id", "")))
+
+        if job is not None:
+            cmd, func = job
+            append_command(story_path, cmd)
+            _reset_jobs.submit(story_path, cmd, func)
+            status = 202
+            result = {
+                "ok": True, "command_id": cmd.id, "status": "pending", "job": f"api/jobs/{cmd.id}", "soft": soft,
+            }
+
+        response_body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response_body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(response_body)
+
+
+class _PooledHTTPServer(socketserver.TCPServer):
+    """TCP server that hands connections to a fixed pool of worker threads.
 
-    socketserver.TCPServer.allow_reuse_address = True
+    A slow request (a large reset, a big media download) only occupies one worker, so the
+    viewers' polls keep being answered. At most max_in_flight connections are accepted
+    (running or queued for a worker); beyond that the server answers 503 with Retry-After
+    instead of letting the backlog grow without bound. Long-lived connections (api/stream)
+    are detached from the pool once their headers are sent; max_streams caps those.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(
+        self, server_address, handler, *, workers: int, max_in_flight: int, max_streams: int = DEFAULT_MAX_STREAMS
+    ):
+        self.workers = max(1, workers)
+        self.max_in_flight = max(max_in_flight, self.workers)
+        self.max_streams = max_streams
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._detached = set()
+        super().__init__(server_address, handler)
+        _servers.add(self)
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"serve-progress-{i}", daemon=True).start()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def process_request(self, request, client_address) -> None:
+        with self._in_flight_lock:
+            busy = self._in_flight >= self.max_in_flight
+            if not busy:
+                self._in_flight += 1
+        if busy:
+            self._reject_busy(request)
+            return
+        self._queue.put((request, client_address))
+
+    def detach(self, request) -> None:
+        """Keep request open after its handler returns; the caller now owns the socket."""
+        with self._in_flight_lock:
+            self._detached.add(request)
+
+    def _reject_busy(self, request) -> None:
+        try:
+            request.sendall(
+                b"HTTP/1.0 503 Service Unavailable\r\nRetry-After: 1\r\n"
+                b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                with self._in_flight_lock:
+                    self._in_flight -= 1
+                    detached = request in self._detached
+                    self._detached.discard(request)
+                if not detached:
+                    self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        for _ in range(self.workers):
+            self._queue.put(None)
+
+
+def _run_server(
+    handler: type,
+    port: int,
+    usage_hint: str,
+    workers: int = DEFAULT_WORKERS,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    reaper: Optional[TrashReaper] = None,
+    max_streams: int = DEFAULT_MAX_STREAMS,
+) -> None:
     try:
-        with socketserver.TCPServer(("", port), _ProgressHandler) as httpd:
+        server = _PooledHTTPServer(
+            ("", port), handler, workers=workers, max_in_flight=max_in_flight, max_streams=max_streams
+        )
+        with server as httpd:
+            if reaper is not None:
+                reaper.start()
             try:
                 httpd.serve_forever()
             except KeyboardInterrupt:
                 pass
+            finally:
+                if reaper is not None:
+                    reaper.stop()
     except OSError as e:
-        if e.errno == 48:  # Address already in use
-            print(f"Port {port} in use. Try: python -m mp_story_monitor.serve_progress --port {port + 1} <story_path>")
+        if e.errno in (errno.EADDRINUSE, 48):  # 48: EADDRINUSE on macOS
+            print(f"Port {port} in use. Try: python -m mp_story_monitor.serve_progress --port {port + 1} {usage_hint}")
         raise
 
 
+def _story_dirs(root: Path) -> List[Path]:
+    try:
+        return [Path(e.path) for e in os.scandir(root) if e.is_dir() and _is_story_id(e.name)]
+    except OSError:
+        return []
+
+
+def serve(
+    story_path: Path,
+    port: int = DEFAULT_PORT,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    max_streams: int = DEFAULT_MAX_STREAMS,
+    soft_reset: bool = False,
+    trash_retention: float = TRASH_RETENTION_SEC,
+) -> None:
+    """Run HTTP server for the given story folder until interrupted.
+
+    Requests are handled by a pool of `workers` threads; connections beyond max_in_flight
+    (running + queued), and api/stream requests beyond max_streams open streams, get 503.
+    With soft_reset, resets move files to .trash unless the request says "soft": false;
+    tombstones are purged after trash_retention seconds.
+    """
+    story_path = Path(story_path).resolve()
+    _ensure_story_folder(story_path)
+    if not (story_path / "_progress.json").exists():
+        print("No _progress.json yet. Start the pipeline; the viewer will update when it runs.")
+
+    print(f"Serving: {story_path}")
+    print(f"Open: http://localhost:{port}/progress_viewer.html")
+    print("Press Ctrl+C to stop.")
+
+    viewer_path = _viewer_file()
+    if viewer_path:
+        print(f"Viewer served from package: {viewer_path}")
+
+    handler = type("_StoryHandler", (_ProgressHandler,), {
+        "viewer_path": viewer_path,
+        "viewer_asset": _StaticAsset.load(viewer_path, "text/html; charset=utf-8"),
+        "_story_path": story_path,
+        "soft_reset": soft_reset,
+        "trash_retention": trash_retention,
+    })
+    reaper = TrashReaper(lambda: [story_path], trash_retention)
+    _run_server(handler, port, "<story_path>", workers, max_in_flight, reaper, max_streams)
+
+
+def serve_root(
+    root: Path,
+    port: int = DEFAULT_PORT,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    max_streams: int = DEFAULT_MAX_STREAMS,
+    soft_reset: bool = False,
+    trash_retention: float = TRASH_RETENTION_SEC,
+) -> None:
+    """Run one HTTP server for every story folder under root until interrupted.
+
+    Each immediate subfolder is a story served at /stories/<folder name>/ (viewer, JSON,
+    api/commands and reset endpoints); /api/stories lists them. max_streams, soft_reset
+    and trash_retention are as for serve().
+    """
+    root = Path(root).resolve()
+    root.mkdir(parents=True, exist_ok=True)
+    print(f"Serving stories under: {root}")
+    print(f"Open: http://localhost:{port}/")
+    print("Press Ctrl+C to stop.")
+    viewer_path = _viewer_file()
+    handler = type("_RootHandler", (_ProgressHandler,), {
+        "viewer_path": viewer_path,
+        "viewer_asset": _StaticAsset.load(viewer_path, "text/html; charset=utf-8"),
+        "story_root": root,
+        "soft_reset": soft_reset,
+        "trash_retention": trash_retention,
+    })
+    reaper = TrashReaper(lambda: _story_dirs(root), trash_retention)
+    _run_server(handler, port, "--root <root>", workers, max_in_flight, reaper, max_streams)
+
+
 def main() -> None:
     import argparse
 
@@ -217,16 +1345,63 @@ def main() -> None:
     parser.add_argument(
         "story_path",
         type=Path,
+        nargs="?",
         help="Path to the story folder (created if missing)",
     )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        help="Serve every story folder under this directory at /stories/<story_id>/",
+    )
     parser.add_argument(
         "--port",
         type=int,
         default=DEFAULT_PORT,
         help=f"Port to bind (default {DEFAULT_PORT})",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Request handler threads (default {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT,
+        help=f"Requests accepted at once, running or queued; more get 503 (default {DEFAULT_MAX_IN_FLIGHT})",
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=DEFAULT_MAX_STREAMS,
+        help=f"Open api/stream connections allowed; more get 503 (default {DEFAULT_MAX_STREAMS})",
+    )
+    parser.add_argument(
+        "--soft-reset",
+        action="store_true",
+        help="Move reset files to .trash/<command_id>/ (undo with api/undo-reset) unless a request sends \"soft\": false",
+    )
+    parser.add_argument(
+        "--trash-retention-sec",
+        type=float,
+        default=TRASH_RETENTION_SEC,
+        help=f"Purge soft-reset tombstones after this many seconds (default {TRASH_RETENTION_SEC})",
+    )
     args = parser.parse_args()
-    serve(args.story_path, port=args.port)
+    options = {
+        "workers": args.workers,
+        "max_in_flight": args.max_in_flight,
+        "max_streams": args.max_streams,
+        "soft_reset": args.soft_reset,
+        "trash_retention": args.trash_retention_sec,
+    }
+    if args.root is not None:
+        serve_root(args.root, port=args.port, **options)
+    elif args.story_path is not None:
+        serve(args.story_path, port=args.port, **options)
+    else:
+        parser.error("story_path or --root is required")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,277 @@
+"""Progress storage backends.
+
+ProgressTracker, check_stale and write_progress_error read and write progress snapshots
+through a ProgressStore. FileProgressStore is the default and keeps the existing contract
+(one _progress.json per story folder). MemoryProgressStore is for tests. SQLiteProgressStore
+keeps every story's snapshot in one WAL-mode database with indexed status/updated_ts columns,
+so fleet queries ("all running stories", "stale for 10 minutes") are a single indexed query
+instead of a directory crawl.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mp_story_monitor.atomic import VERSION_KEY, atomic_write_bytes
+
+PROGRESS_JSON_FILENAME = "_progress.json"
+
+
+@dataclass
+class StoryStatus:
+    story_path: str
+    status: str
+    updated_ts: float  # epoch seconds
+    pid: Optional[int] = None
+    version: int = 0
+
+
+def progress_status(payload: Dict) -> str:
+    """Summarize a snapshot as error / running / complete / pending."""
+    phases = payload.get("phases") or {}
+    states = [str(s).lower() for s in phases.values()]
+    if payload.get("error") or any(s in ("error", "failed") for s in states):
+        return "error"
+    if "running" in states:
+        return "running"
+    if states and all(s in ("done", "skipped") for s in states):
+        return "complete"
+    return "pending"
+
+
+def _updated_epoch(payload: Dict) -> float:
+    ts = payload.get("updated_ts")
+    if isinstance(ts, str) and ts:
+        try:
+            return datetime.fromisoformat(ts).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+def _summarize(story_path: str, payload: Dict) -> StoryStatus:
+    pid = payload.get("pid")
+    version = payload.get(VERSION_KEY)
+    return StoryStatus(
+        story_path=story_path,
+        status=progress_status(payload),
+        updated_ts=_updated_epoch(payload),
+        pid=pid if isinstance(pid, int) else None,
+        version=version if isinstance(version, int) else 0,
+    )
+
+
+def _story_key(story_path: Path) -> str:
+    return str(Path(story_path).resolve())
+
+
+class ProgressStore(ABC):
+    """Interface for progress snapshot storage. Implementations must be thread-safe."""
+
+    @abstractmethod
+    def read(self, story_path: Path) -> Optional[Dict]:
+        """Return the story's snapshot, or None if there is none (or it is unreadable)."""
+
+    @abstractmethod
+    def write(self, story_path: Path, payload: Dict) -> int:
+        """Store the story's snapshot, replacing any previous one. Returns bytes written."""
+
+    @abstractmethod
+    def list_stories(self, status: Optional[str] = None) -> List[StoryStatus]:
+        """All stories known to the store, optionally filtered by progress_status()."""
+
+    def stale_stories(self, older_than_sec: float, status: str = "running") -> List[StoryStatus]:
+        """Stories in status whose snapshot has not been updated for older_than_sec."""
+        cutoff = time.time() - older_than_sec
+        return [s for s in self.list_stories(status) if s.updated_ts < cutoff]
+
+    def close(self) -> None:
+        """Release resources held by the store (nothing by default)."""
+
+
+class FileProgressStore(ProgressStore):
+    """One _progress.json per story folder (the original layout).
+
+    Fleet queries need root: the directory whose immediate subfolders are stories. They
+    have to open every story's file, which is what the SQLite store avoids.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root is not None else None
+
+    def read(self, story_path: Path) -> Optional[Dict]:
+        path = Path(story_path) / PROGRESS_JSON_FILENAME
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def write(self, story_path: Path, payload: Dict) -> int:
+        data = json.dumps(payload, indent=2).encode("utf-8")
+        atomic_write_bytes(Path(story_path) / PROGRESS_JSON_FILENAME, data)
+        return len(data)
+
+    def _iter_story_dirs(self) -> Iterator[Path]:
+        if self.root is None:
+            raise ValueError("FileProgressStore needs root= for fleet queries")
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, PROGRESS_JSON_FILENAME)):
+                    yield Path(entry.path)
+
+    def list_stories(self, status: Optional[str] = None) -> List[StoryStatus]:
+        result = []
+        for story_dir in self._iter_story_dirs():
+            payload = self.read(story_dir)
+            if payload is None:
+                continue
+            summary = _summarize(_story_key(story_dir), payload)
+            if status is None or summary.status == status:
+                result.append(summary)
+        return result
+
+
+class MemoryProgressStore(ProgressStore):
+    """In-process store for tests; snapshots are copied in and out."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: Dict[str, str] = {}
+
+    def read(self, story_path: Path) -> Optional[Dict]:
+        with self._lock:
+            raw = self._data.get(_story_key(story_path))
+        return json.loads(raw) if raw is not None else None
+
+    def write(self, story_path: Path, payload: Dict) -> int:
+        raw = json.dumps(payload)
+        with self._lock:
+            self._data[_story_key(story_path)] = raw
+        return len(raw)
+
+    def list_stories(self, status: Optional[str] = None) -> List[StoryStatus]:
+        with self._lock:
+            items = list(self._data.items())
+        result = [_summarize(key, json.loads(raw)) for key, raw in items]
+        return [s for s in result if status is None or s.status == status]
+
+
+class SQLiteProgressStore(ProgressStore):
+    """All stories' snapshots in one SQLite database (WAL mode, one connection per thread).
+
+    A thread's connection is closed once the thread has exited (checked whenever another
+    thread opens one) or by close(); the store reconnects if used after close().
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS progress (
+            story_path TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            updated_ts REAL NOT NULL,
+            pid INTEGER,
+            version INTEGER NOT NULL DEFAULT 0,
+            payload TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_progress_status_updated ON progress (status, updated_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_progress_updated ON progress (updated_ts)",
+    )
+
+    def __init__(self, db_path: Path, *, busy_timeout_ms: int = 5000):
+        self.db_path = Path(db_path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._conns_lock = threading.Lock()
+        self._conns: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._generation = 0  # bumped by close(), so threads reconnect afterwards
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self._SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        thread = threading.current_thread()
+        with self._conns_lock:
+            for ident, (owner, old) in list(self._conns.items()):
+                if not owner.is_alive():
+                    old.close()
+                    del self._conns[ident]
+            self._conns[thread.ident] = (thread, conn)
+            self._local.generation = self._generation
+        self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close every thread's connection."""
+        with self._conns_lock:
+            conns = [conn for _, conn in self._conns.values()]
+            self._conns.clear()
+            self._generation += 1
+        for conn in conns:
+            conn.close()
+
+    def read(self, story_path: Path) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT payload FROM progress WHERE story_path = ?", (_story_key(story_path),)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def write(self, story_path: Path, payload: Dict) -> int:
+        key = _story_key(story_path)
+        summary = _summarize(key, payload)
+        raw = json.dumps(payload)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO progress (story_path, status, updated_ts, pid, version, payload)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, summary.status, summary.updated_ts, summary.pid, summary.version, raw),
+        )
+        return len(raw)
+
+    @staticmethod
+    def _rows(rows: List[Tuple]) -> List[StoryStatus]:
+        return [StoryStatus(story_path=r[0], status=r[1], updated_ts=r[2], pid=r[3], version=r[4]) for r in rows]
+
+    def list_stories(self, status: Optional[str] = None) -> List[StoryStatus]:
+        columns = "SELECT story_path, status, updated_ts, pid, version FROM progress"
+        if status is None:
+            rows = self._conn().execute(f"{columns} ORDER BY updated_ts DESC").fetchall()
+        else:
+            rows = self._conn().execute(
+                f"{columns} WHERE status = ? ORDER BY updated_ts DESC", (status,)
+            ).fetchall()
+        return self._rows(rows)
+
+    def stale_stories(self, older_than_sec: float, status: str = "running") -> List[StoryStatus]:
+        rows = self._conn().execute(
+            "SELECT story_path, status, updated_ts, pid, version FROM progress"
+            " WHERE status = ? AND updated_ts < ? ORDER BY updated_ts",
+            (status, time.time() - older_than_sec),
+        ).fetchall()
+        return self._rows(rows)
+
+
+_default_store = FileProgressStore()
+
+
+def default_store() -> ProgressStore:
+    """The store used when none is passed: the per-folder _progress.json layout."""
+    return _default_store
@@ -1,28 +1,33 @@
 """Progress tracker: writes _progress.json, optional viewer HTML, optional sound."""
 
 import json
+import logging
 import os
 import shutil
 import subprocess
 import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Sequence, Optional
 
-# #region agent log
-DEBUG_LOG = Path("/Users/senzhang/mp-llp/.cursor/debug.log")
-def _agent_log(location: str, message: str, data: dict, hypothesis_id: str) -> None:
-    try:
-        with open(DEBUG_LOG, "a", encoding="utf-8") as f:
-            f.write(json.dumps({"location": location, "message": message, "data": data, "hypothesisId": hypothesis_id, "timestamp": int(datetime.now(timezone.utc).timestamp() * 1000)}) + "\n")
-    except Exception:
-        pass
-# #endregion
+from mp_story_monitor.atomic import VERSION_KEY, atomic_write_text
+from mp_story_monitor.counters import ShardedCounters
+from mp_story_monitor.events import EVENT_LOG_COMPACT_EVERY, ProgressEventLog
+from mp_story_monitor.heartbeat import shared_scheduler
+from mp_story_monitor.instrumentation import trace, trace_enabled
+from mp_story_monitor.metrics import default_registry
+from mp_story_monitor.proxy import ProxyServer, TrackerProxy
+from mp_story_monitor.storage import PROGRESS_JSON_FILENAME, ProgressStore, default_store
+
+logger = logging.getLogger(__name__)
+_metrics = default_registry()
 
 HEARTBEAT_INTERVAL_SEC = 30
+# Coalescing mode: max time a progress update may sit in memory before it is persisted
+COALESCE_MAX_LATENCY_SEC = 0.25
 
 # Contract: filenames written under story_path (consumers may read these)
-PROGRESS_JSON_FILENAME = "_progress.json"
 PHASE_STATUS_FILENAME = "_phase_status.txt"
 VIEWER_HTML_FILENAME = "progress_viewer.html"
 NOTIFICATION_STORY_PROGRESS_FILENAME = "notification-story-progress.mp3"
@@ -44,6 +49,22 @@ class ProgressTracker:
         tracker.start("director")
         # ...
         tracker.complete()
+
+    With coalesce_writes=True, set_phase_progress() only updates in-memory state; a background
+    flusher persists the latest snapshot at most max_write_latency seconds later. Phase
+    transitions (start/finish/error/skip/complete) and flush() always write immediately.
+
+    With event_log=True, phase transitions, progress ticks and current_step changes are also
+    appended to _progress.jsonl (see mp_story_monitor.events), compacted every
+    event_log_compact_every events.
+
+    Snapshots go to store (default: _progress.json in story_path; see mp_story_monitor.storage
+    for the in-memory and shared SQLite backends). _phase_status.txt, the event log and the
+    viewer files always live in story_path.
+
+    Worker threads can report relative progress with advance(phase) / add_total(phase, n).
+    These go to per-thread counter shards (no shared lock) and are merged into phase_progress
+    by the background flusher, never triggering a write per increment.
     """
 
     def __init__(
@@ -53,6 +74,11 @@ class ProgressTracker:
         job_id: str = "",
         workflow: str = "",
         phase_names: Sequence[str] = (),
+        coalesce_writes: bool = False,
+        max_write_latency: float = COALESCE_MAX_LATENCY_SEC,
+        event_log: bool = False,
+        event_log_compact_every: int = EVENT_LOG_COMPACT_EVERY,
+        store: Optional[ProgressStore] = None,
     ):
         self.story_path = Path(story_path)
         self.job_id = job_id
@@ -60,20 +86,51 @@ class ProgressTracker:
         self._phase_names: tuple = tuple(phase_names) if phase_names else DEFAULT_PHASE_ORDER
         self._phases: Dict[str, str] = {p: "pending" for p in self._phase_names}
         self._phase_progress: Dict[str, Dict[str, int]] = {}  # e.g. {"production": {"complete": 12, "total": 35}}
-        self._heartbeat_stop = threading.Event()
-        self._heartbeat_thread: threading.Thread | None = None
+        self._heartbeat_token: Optional[int] = None
+        # Guards in-memory state and serializes writes so an older snapshot never overwrites a newer one
+        self._lock = threading.RLock()
+        self.coalesce_writes = coalesce_writes
+        self.max_write_latency = max_write_latency
+        self._dirty = False
+        self._flush_requested = threading.Event()
+        self._flusher_stop = threading.Event()
+        self._flusher_thread: threading.Thread | None = None
+        self._flusher_lock = threading.Lock()
+        # Relative progress from advance()/add_total(); offsets record counter totals at the last set_phase_progress()
+        self._counters = ShardedCounters()
+        self._counter_offsets: Dict[str, tuple] = {}
+        self._logged_counter_progress: Dict[str, Dict[str, int]] = {}
+        self._proxy_server: Optional[ProxyServer] = None
+        # Counters: progress updates received vs. _progress.json writes actually performed
+        self._updates_set = 0
+        self.writes_performed = 0
+        # Snapshot version continues from any previous run so readers see it only increase
+        self._store = store if store is not None else default_store()
+        self._version = _stored_version(self._store, self.story_path)
+        self._events: Optional[ProgressEventLog] = None
+        self._last_step = ""
+        if event_log:
+            try:
+                self._events = ProgressEventLog(self.story_path, compact_every=event_log_compact_every)
+            except Exception as e:
+                logger.warning(f"Failed to open event log: {e}")
 
     def _write_phase_status(self, phase: str) -> None:
         try:
-            (self.story_path / PHASE_STATUS_FILENAME).write_text(
-                f"phase={phase}\n", encoding="utf-8"
-            )
+            atomic_write_text(self.story_path / PHASE_STATUS_FILENAME, f"phase={phase}\n")
         except Exception as e:
-            _agent_log("tracker.py:_write_phase_status", f"Failed to write phase status: {e}", {"phase": phase, "story_path": str(self.story_path)}, "error")
+            logger.warning(f"Failed to write phase status for {self.story_path}: {e}")
 
     def _write_progress(self, current_step: str = "") -> None:
+        with self._lock:
+            self._dirty = False
+            self._write_progress_locked(current_step)
+
+    def _write_progress_locked(self, current_step: str) -> None:
         try:
+            self._version += 1
             payload = {
+                VERSION_KEY: self._version,
                 "job_id": self.job_id,
                 "workflow": self.workflow,
                 "updated_ts": datetime.now(timezone.utc).isoformat(),
@@ -83,16 +140,120 @@ class ProgressTracker:
                 "story_path": str(self.story_path.resolve()),
                 "pid": os.getpid(),
             }
-            if self._phase_progress:
-                payload["phase_progress"] = dict(self._phase_progress)
-            # #region agent log
-            _agent_log("tracker.py:_write_progress", "Writing _progress.json", {"story_path": str(self.story_path.resolve()), "updated_ts": payload["updated_ts"], "phases": payload["phases"]}, "H1,H3")
-            # #endregion
-            (self.story_path / PROGRESS_JSON_FILENAME).write_text(
-                json.dumps(payload, indent=2), encoding="utf-8"
-            )
+            phase_progress = self._merged_phase_progress()
+            if phase_progress:
+                payload["phase_progress"] = phase_progress
+            if self._events is not None:
+                for phase, counts in phase_progress.items():
+                    if phase in self._counter_offsets and self._logged_counter_progress.get(phase) != counts:
+                        self._events.append("progress", phase=phase, **counts)
+                        self._logged_counter_progress[phase] = counts
+                if current_step and current_step != self._last_step:
+                    self._events.append("step", current_step=current_step)
+                self._events.flush()
+                payload["event_log"] = {"epoch": self._events.epoch, "offset": self._events.offset}
+            started_ns = time.perf_counter_ns()
+            written = self._store.write(self.story_path, payload)
+            duration_ns = time.perf_counter_ns() - started_ns
+            self.writes_performed += 1
+            _metrics.inc("progress_writes_total")
+            _metrics.observe("progress_write_duration_seconds", duration_ns / 1e9)
+            _metrics.inc("progress_write_bytes_total", written or 0)
+            if trace_enabled():
+                trace(
+                    "progress_write",
+                    story=str(self.story_path),
+                    phase=next((p for p, st in self._phases.items() if st == "running"), ""),
+                    version=self._version,
+                    duration_us=duration_ns // 1000,
+                    bytes=written,
+                )
+            if current_step:
+                self._last_step = current_step
+            if self._events is not None and self._events.needs_compaction():
+                self._events.compact({
+                    "phases": payload["phases"],
+                    "phase_progress": payload.get("phase_progress", {}),
+                    "current_step": self._last_step,
+                })
         except Exception as e:
-            _agent_log("tracker.py:_write_progress", f"Failed to write progress: {e}", {"story_path": str(self.story_path)}, "error")
+            logger.warning(f"Failed to write progress for {self.story_path}: {e}")
+
+    def _merged_phase_progress(self) -> Dict[str, Dict[str, int]]:
+        """Absolute counts from set_phase_progress() plus counter increments made since."""
+        merged = {phase: dict(counts) for phase, counts in self._phase_progress.items()}
+        for phase, (done, total) in self._counters.totals().items():
+            self._counter_offsets.setdefault(phase, (0, 0))
+            offset_done, offset_total = self._counter_offsets[phase]
+            entry = merged.setdefault(phase, {"complete": 0, "total": 0})
+            entry["complete"] += done - offset_done
+            entry["total"] += total - offset_total
+        return merged
+
+    @property
+    def updates_received(self) -> int:
+        """Number of progress updates (set_phase_progress, advance, add_total) received."""
+        return self._updates_set + self._counters.operations()
+
+    def _log_event(self, event_type: str, **fields) -> None:
+        """Append to the event log, if enabled. Made visible by the next _write_progress()."""
+        if self._events is None:
+            return
+        with self._lock:
+            try:
+                self._events.append(event_type, **fields)
+            except Exception as e:
+                logger.warning(f"Failed to append event: {e}")
+
+    def _flusher_loop(self, stop: threading.Event) -> None:
+        """Persist pending progress at most max_write_latency after the first unflushed update."""
+        while True:
+            self._flush_requested.wait()
+            if stop.wait(timeout=self.max_write_latency):
+                with self._flusher_lock:
+                    # Unless a newer flusher took over, leave no stale request behind for the fast path
+                    if self._flusher_thread is threading.current_thread():
+                        self._flusher_thread = None
+                        self._flush_requested.clear()
+                return
+            self._flush_requested.clear()
+            self.flush()
+
+    def _schedule_flush(self) -> None:
+        """Mark state dirty and make sure the background flusher will persist it.
+
+        Lock-free while a flush is already pending, so hot-path callers don't contend.
+        """
+        self._dirty = True
+        if self._flush_requested.is_set() and not self._flusher_stop.is_set():
+            return
+        with self._flusher_lock:
+            if (self._flusher_thread is None or not self._flusher_thread.is_alive()
+                    or self._flusher_stop.is_set()):
+                # A stopped flusher may still be exiting; the new one gets its own stop event
+                self._flusher_stop = threading.Event()
+                self._flusher_thread = threading.Thread(
+                    target=self._flusher_loop, args=(self._flusher_stop,), daemon=True)
+                self._flusher_thread.start()
+            self._flush_requested.set()
+
+    def _close_proxy(self) -> None:
+        """Stop the worker proxy server (if any) and remove its socket directory."""
+        with self._lock:
+            proxy_server, self._proxy_server = self._proxy_server, None
+        if proxy_server is not None:
+            proxy_server.close()
+
+    def _stop_flusher(self) -> None:
+        with self._flusher_lock:
+            self._flusher_stop.set()
+            self._flush_requested.set()
+
+    def flush(self) -> None:
+        """Write _progress.json now if there are progress updates not yet persisted."""
+        with self._lock:
+            if self._dirty:
+                self._write_progress()
 
     def _play_sound(self, phase: str = "") -> None:
         if not os.environ.get("PROGRESS_SOUND"):
@@ -114,7 +275,7 @@ class ProgressTracker:
                     timeout=5,
                 )
         except Exception as e:
-            _agent_log("tracker.py:_play_sound", f"Failed to play sound: {e}", {"phase": phase}, "error")
+            logger.warning(f"Failed to play sound: {e}")
 
     def ensure_viewer(self) -> None:
         """Copy progress_viewer.html and notification sound into story folder (idempotent)."""
@@ -128,123 +289,212 @@ class ProgressTracker:
                 if sound_src.exists():
                     shutil.copy(sound_src, self.story_path / name)
         except Exception as e:
-            _agent_log("tracker.py:ensure_viewer", f"Failed to ensure viewer: {e}", {"story_path": str(self.story_path)}, "error")
+            logger.warning(f"Failed to ensure viewer: {e}")
+
+    def ensure_server(self, port: int = 8081, root: Optional[Path] = None) -> None:
+        """Make sure a monitor server is serving this story on port, then open browser.
 
-    def ensure_server(self, port: int = 8081) -> None:
-        """Kill any existing monitor server on port and start a fresh one for this story, then open browser."""
+        Without root: kill any existing monitor server on port and start a fresh one for this
+        story. With root (a directory whose immediate subfolders are stories, including this
+        one): reuse a multi-story server already listening on port, or start one for root.
+        """
         import signal
+        viewer_url = f"http://localhost:{port}/{VIEWER_HTML_FILENAME}"
+        server_args = [str(self.story_path.resolve())]
+        if root is not None:
+            root = Path(root).resolve()
+            if self.story_path.resolve().parent != root:
+                logger.warning(f"{self.story_path} is not directly under {root}; starting a single-story server")
+                root = None
+            else:
+                viewer_url = f"http://localhost:{port}/stories/{self.story_path.resolve().name}/{VIEWER_HTML_FILENAME}"
+                server_args = ["--root", str(root)]
         try:
-            # Kill existing server on the port
-            result = subprocess.run(
-                ["lsof", "-ti", f":{port}"],
-                capture_output=True, text=True, timeout=5,
-            )
-            for pid_str in result.stdout.strip().split("\n"):
-                pid_str = pid_str.strip()
-                if pid_str and pid_str.isdigit():
-                    pid = int(pid_str)
-                    if pid != os.getpid():
-                        os.kill(pid, signal.SIGTERM)
-
-            # Start new server in background
-            import sys
-            subprocess.Popen(
-                [
-                    sys.executable,
-                    "-m", "mp_story_monitor.serve_progress",
-                    "--port", str(port),
-                    str(self.story_path.resolve()),
-                ],
-                cwd=str(self.story_path.resolve()),
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                start_new_session=True,
-            )
+            if root is None or not _multi_story_server_running(port, root):
+                # Kill existing server on the port
+                result = subprocess.run(
+                    ["lsof", "-ti", f":{port}"],
+                    capture_output=True, text=True, timeout=5,
+                )
+                for pid_str in result.stdout.strip().split("\n"):
+                    pid_str = pid_str.strip()
+                    if pid_str and pid_str.isdigit():
+                        pid = int(pid_str)
+                        if pid != os.getpid():
+                            os.kill(pid, signal.SIGTERM)
+
+                # Start new server in background
+                import sys
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        "-m", "mp_story_monitor.serve_progress",
+                        "--port", str(port),
+                        *server_args,
+                    ],
+                    cwd=str(self.story_path.resolve()),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,
+                )
 
             # Open browser
             subprocess.Popen(
-                ["open", f"http://localhost:{port}/progress_viewer.html"],
+                ["open", viewer_url],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
             )
         except Exception as e:
-            _agent_log("tracker.py:ensure_server", f"Failed to ensure server: {e}",
-                       {"story_path": str(self.story_path), "port": port}, "error")
-
-    def _heartbeat_loop(self) -> None:
-        """Refresh _progress.json every HEARTBEAT_INTERVAL_SEC so 'Last updated' shows process is alive."""
-        # #region agent log
-        _agent_log("tracker.py:_heartbeat_loop", "Heartbeat loop started", {"story_path": str(self.story_path.resolve())}, "H3")
-        # #endregion
-        while not self._heartbeat_stop.wait(timeout=HEARTBEAT_INTERVAL_SEC):
-            self._write_progress()
+            logger.warning(f"Failed to ensure server on port {port}: {e}")
+
+    def _heartbeat(self) -> None:
+        """Refresh _progress.json so 'Last updated' shows the process is alive (called by the shared scheduler)."""
+        trace("heartbeat", story=str(self.story_path))
+        _metrics.inc("heartbeat_beats_total")
+        self._write_progress()
+
+    def _start_heartbeat(self) -> None:
+        """Register with the process-wide scheduler to refresh every HEARTBEAT_INTERVAL_SEC (idempotent)."""
+        with self._lock:
+            if self._heartbeat_token is None:
+                self._heartbeat_token = shared_scheduler().register(self._heartbeat, HEARTBEAT_INTERVAL_SEC)
+
+    def _stop_heartbeat(self) -> None:
+        with self._lock:
+            shared_scheduler().unregister(self._heartbeat_token)
+            self._heartbeat_token = None
 
     def start(self, phase: str, current_step: str = "") -> None:
         """Mark phase as running and persist. Start heartbeat so 'Last updated' refreshes during long phases."""
         # Detect stale state from a previous dead process before starting
-        check_stale(self.story_path)
+        if check_stale(self.story_path, store=self._store):
+            # The error snapshot took the next version; ours must come after it
+            with self._lock:
+                self._version = max(self._version, _stored_version(self._store, self.story_path))
         if phase not in self._phases:
             self._phases[phase] = "pending"
         self._phases[phase] = "running"
+        self._log_event("phase", phase=phase, status="running")
         self._write_phase_status(phase)
         self._write_progress(current_step=current_step)
-        self._heartbeat_stop.clear()
-        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
-        self._heartbeat_thread.start()
+        self._start_heartbeat()
 
     def set_phase_progress(self, phase: str, complete: int, total: int) -> None:
         """Set progress counts for a phase (e.g. production: 12/35). Written to _progress.json and shown in viewer."""
         if total < 0 or complete < 0:
             return
-        self._phase_progress[phase] = {"complete": complete, "total": total}
-        self._write_progress()
+        with self._lock:
+            self._phase_progress[phase] = {"complete": complete, "total": total}
+            self._counter_offsets[phase] = self._counters.totals().get(phase, (0, 0))
+            self._logged_counter_progress[phase] = {"complete": complete, "total": total}
+            self._updates_set += 1
+            self._log_event("progress", phase=phase, complete=complete, total=total)
+            if self.coalesce_writes:
+                self._schedule_flush()
+                return
+            self._write_progress()
+
+    def advance(self, phase: str, n: int = 1) -> None:
+        """Add n completed items to a phase. Thread-safe and lock-free; persisted by the flusher."""
+        self._counters.add(phase, complete=n)
+        self._schedule_flush()
+
+    def add_total(self, phase: str, n: int) -> None:
+        """Add n expected items to a phase's total. Thread-safe and lock-free; persisted by the flusher."""
+        self._counters.add(phase, total=n)
+        self._schedule_flush()
+
+    def proxy(self) -> TrackerProxy:
+        """Return a picklable proxy that worker processes use to report progress to this tracker.
+
+        Updates sent through the proxy are applied here and persisted by this process, like
+        advance()/add_total(). The listening socket is closed by complete() or error().
+        """
+        with self._lock:
+            if self._proxy_server is None:
+                self._proxy_server = ProxyServer(self)
+            return self._proxy_server.proxy()
 
     def finish(self, phase: str, play_sound: bool = True, current_step: str = "") -> None:
         """Mark phase as done, optionally play sound, persist. Stop heartbeat."""
-        self._heartbeat_stop.set()
+        self._stop_heartbeat()
         self._phases[phase] = "done"
+        self._log_event("phase", phase=phase, status="done")
         self._write_progress(current_step=current_step)
         if play_sound:
             self._play_sound(phase)
 
     def error(self, phase: str, error_msg: str, traceback_str: str = "") -> None:
-        """Mark phase as error and record error details. Stop heartbeat."""
-        self._heartbeat_stop.set()
+        """Mark phase as error and record error details. Stop heartbeat, flusher and worker proxy."""
+        self._stop_heartbeat()
         self._phases[phase] = "error"
+        self._log_event("phase", phase=phase, status="error", error=error_msg)
         self._write_progress()
         # Also write error details using the standalone function
-        write_progress_error(self.story_path, error_msg, traceback_str)
+        with self._lock:
+            write_progress_error(self.story_path, error_msg, traceback_str, store=self._store)
+            self._version = max(self._version, _stored_version(self._store, self.story_path))
+        # The write above persisted any pending updates
+        self._stop_flusher()
+        self._close_proxy()
 
     def skip(self, phase: str, reason: str = "") -> None:
         """Mark phase as skipped. Stop heartbeat."""
-        self._heartbeat_stop.set()
+        self._stop_heartbeat()
         self._phases[phase] = "skipped"
+        self._log_event("phase", phase=phase, status="skipped", reason=reason)
         self._write_progress()
 
     def complete(self) -> None:
-        """Mark all phases done and set status to complete. Stop heartbeat."""
-        self._heartbeat_stop.set()
+        """Mark all phases done and set status to complete. Stop heartbeat and flusher."""
+        self._stop_heartbeat()
+        self._stop_flusher()
+        self._close_proxy()
         for p in self._phase_names:
             self._phases[p] = "done"
+        self._log_event("complete")
         self._write_phase_status("complete")
         self._write_progress()
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+
+
+def _multi_story_server_running(port: int, root: Path) -> bool:
+    """True if a multi-story monitor server for root is already answering on port."""
+    import urllib.request
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/stories", timeout=1) as resp:
+            data = json.loads(resp.read())
+    except Exception:
+        return False
+    return isinstance(data, dict) and data.get("root") == str(root)
+
+
+def _stored_version(store: ProgressStore, story_path: Path) -> int:
+    data = store.read(story_path) or {}
+    version = data.get(VERSION_KEY)
+    return version if isinstance(version, int) else 0
+
 
+def _next_version(data: Dict) -> int:
+    version = data.get(VERSION_KEY)
+    return (version if isinstance(version, int) else 0) + 1
 
-def check_stale(story_path: Path) -> bool:
+
+def check_stale(story_path: Path, store: Optional[ProgressStore] = None) -> bool:
     """Check if the pipeline process for this story has died while phases are still 'running'.
 
-    Reads _progress.json, verifies the PID is alive via os.kill(pid, 0).
-    If the process is dead and any phase shows 'running', marks it as 'error'
-    with a descriptive message.
+    Reads the progress snapshot (_progress.json unless another store is given), verifies
+    the PID is alive via os.kill(pid, 0). If the process is dead and any phase shows
+    'running', marks it as 'error' with a descriptive message.
 
     Returns True if a stale process was detected and marked as error.
     """
-    path = Path(story_path) / PROGRESS_JSON_FILENAME
-    if not path.exists():
-        return False
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
+    store = store if store is not None else default_store()
+    data = store.read(story_path)
+    if data is None:
         return False
 
     pid = data.get("pid")
@@ -272,30 +522,30 @@ def check_stale(story_path: Path) -> bool:
     data["phases"] = phases
     data["error"] = f"Process (PID {pid}) died unexpectedly while phases {running_phases} were running"
     data["updated_ts"] = datetime.now(timezone.utc).isoformat()
+    data[VERSION_KEY] = _next_version(data)
     try:
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        store.write(story_path, data)
     except Exception:
         pass
     return True
 
 
-def write_progress_error(story_path: Path, error: str, traceback_str: str = "") -> None:
+def write_progress_error(
+    story_path: Path, error: str, traceback_str: str = "", store: Optional[ProgressStore] = None
+) -> None:
     """Write final error and traceback into _progress.json so the monitor can display it.
 
     Call this from the pipeline's top-level exception handler (e.g. in generator) before
     re-raising. Merges into existing _progress.json if present so phases/updated_ts are preserved.
+    Pass store= when the tracker uses a non-default progress store.
     """
-    path = Path(story_path) / PROGRESS_JSON_FILENAME
-    data: Dict = {}
-    if path.exists():
-        try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-        except Exception as e:
-            _agent_log("tracker.py:write_progress_error", f"Failed to read existing progress: {e}", {"path": str(path)}, "error")
+    store = store if store is not None else default_store()
+    data: Dict = store.read(story_path) or {}
     data["error"] = error
     data["traceback"] = traceback_str
     data["updated_ts"] = datetime.now(timezone.utc).isoformat()
+    data[VERSION_KEY] = _next_version(data)
     try:
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        store.write(story_path, data)
     except Exception as e:
-        _agent_log("tracker.py:write_progress_error", f"Failed to write error progress: {e}", {"path": str(path), "error": error}, "error")
+        logger.warning(f"Failed to write error progress for {story_path}: {e}")
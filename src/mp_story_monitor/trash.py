@@ -0,0 +1,306 @@
+"""Tombstones for soft resets: move outputs aside, undo, purge later.
+
+A soft reset renames the files it would delete (or whole directories, when every entry in
+one is being reset) into .trash/<command_id>/ inside the story folder, keeping their
+relative paths, and records what it moved in a manifest. Renames stay on the same
+filesystem, so a reset costs one rename per directory or file instead of an unlink per
+file, and undo_trash() can put everything back. TrashReaper purges tombstones older than
+the retention window in the background. Story walks (reset, asset index) skip .trash.
+"""
+from __future__ import annotations
+
+import errno
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+from mp_story_monitor.atomic import atomic_write_bytes
+from mp_story_monitor.heartbeat import shared_scheduler
+
+logger = logging.getLogger(__name__)
+
+TRASH_DIRNAME = ".trash"
+TRASH_MANIFEST_FILENAME = "_manifest.json"
+TRASH_RETENTION_SEC = 24 * 3600
+TRASH_REAP_INTERVAL_SEC = 300
+# Tombstone names are command ids (cmd_<ts>_<hex>): one path component, never hidden
+_TRASH_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+
+
+def trash_root(story_path: Path) -> Path:
+    return Path(story_path) / TRASH_DIRNAME
+
+
+def is_trash_id(name: str) -> bool:
+    """True if name can be a tombstone (no separators, no "..", no leading dot)."""
+    return bool(_TRASH_ID_RE.match(name))
+
+
+def _tombstone_path(story_path: Path, trash_id: str) -> Optional[Path]:
+    """.trash/<trash_id> if trash_id is well-formed and resolves directly under .trash."""
+    if not is_trash_id(trash_id):
+        return None
+    root = trash_root(story_path)
+    path = root / trash_id
+    if path.resolve().parent != root.resolve():
+        return None
+    return path
+
+
+class TrashBatch:
+    """One tombstone, .trash/<trash_id>/, filled by a single soft reset.
+
+    move_file / move_dir may be called from several threads; commit() writes the manifest.
+    """
+
+    def __init__(self, story_path: Path, trash_id: str, command_ids: Iterable[str] = ()):
+        if not is_trash_id(trash_id):
+            raise ValueError(f"Invalid trash id {trash_id!r}")
+        self.story_path = Path(story_path)
+        self.trash_id = trash_id
+        self.command_ids = list(command_ids) or [trash_id]
+        self.path = trash_root(story_path) / trash_id
+        self.created_ts = time.time()
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+
+    def _target(self, path: Path) -> Tuple[str, Path]:
+        rel = os.path.relpath(path, self.story_path)
+        if rel.startswith(os.pardir) or rel.split(os.sep)[0] == TRASH_DIRNAME:
+            raise ValueError(f"{path} is not a story output")
+        target = self.path / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return rel, target
+
+    def move_file(self, path: Path) -> None:
+        """Move one file into the tombstone (deleted outright if it is on another filesystem)."""
+        rel, target = self._target(path)
+        try:
+            os.rename(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            logger.warning(f"{path} is on another filesystem than {self.path}; deleting it instead")
+            os.unlink(path)
+            return
+        with self._lock:
+            self._entries.append({"path": rel, "kind": "file", "files": 1})
+
+    def move_dir(self, path: Path, names: Collection[str]) -> None:
+        """Move a whole directory into the tombstone and leave an empty one in its place.
+
+        names are the files the reset covers. Anything else found in the moved directory
+        (written into it after the caller listed it) is moved back out, so only planned
+        files end up in the tombstone.
+        """
+        rel, target = self._target(path)
+        os.rename(path, target)
+        os.mkdir(path)
+        planned = set(names)
+        with os.scandir(target) as it:
+            extras = [entry.name for entry in it if entry.name not in planned]
+        for name in extras:
+            if os.path.lexists(path / name):
+                logger.warning(f"{path / name} was rewritten during the reset; previous copy left in {target}")
+                continue
+            os.rename(target / name, path / name)
+        with self._lock:
+            self._entries.append({"path": rel, "kind": "dir", "files": len(planned)})
+
+    def commit(self) -> None:
+        with self._lock:
+            if not self._entries:
+                return
+            manifest = {
+                "trash_id": self.trash_id,
+                "command_ids": self.command_ids,
+                "created_ts": self.created_ts,
+                "files": sum(e["files"] for e in self._entries),
+                "entries": list(self._entries),
+            }
+        self.path.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self.path / TRASH_MANIFEST_FILENAME, json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+def _read_manifest(tombstone: Path) -> Optional[Dict]:
+    try:
+        data = json.loads((tombstone / TRASH_MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def list_trash(story_path: Path, retention_sec: float = TRASH_RETENTION_SEC) -> List[Dict]:
+    """Tombstones in the story, oldest first: trash_id, command_ids, created_ts, expires_ts, files."""
+    root = trash_root(story_path)
+    result = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        manifest = _read_manifest(Path(entry.path)) or {}
+        created = manifest.get("created_ts")
+        if not isinstance(created, (int, float)):
+            created = entry.stat().st_mtime
+        result.append({
+            "trash_id": entry.name,
+            "command_ids": manifest.get("command_ids", [entry.name]),
+            "created_ts": created,
+            "expires_ts": created + retention_sec,
+            "files": manifest.get("files"),
+        })
+    return sorted(result, key=lambda t: t["created_ts"])
+
+
+def find_tombstone(story_path: Path, command_id: str) -> Optional[Path]:
+    """The tombstone holding command_id's files (a batch reset shares one), or None.
+
+    Only well-formed ids are looked up, and only directories directly under .trash are
+    returned, so a command_id from a request can never point outside the story's trash.
+    """
+    if not is_trash_id(command_id):
+        return None
+    direct = _tombstone_path(story_path, command_id)
+    if direct is not None and direct.is_dir():
+        return direct
+    for info in list_trash(story_path):
+        if command_id in info["command_ids"]:
+            return _tombstone_path(story_path, info["trash_id"])
+    return None
+
+
+def _restore_tree(source: Path, dest: Path, conflicts: List[str], story_path: Path) -> int:
+    """Move files from source back under dest one by one, keeping anything already at dest."""
+    restored = 0
+    for dirpath, _, filenames in os.walk(source):
+        for name in filenames:
+            src = Path(dirpath) / name
+            target = dest / os.path.relpath(src, source)
+            if target.exists():
+                conflicts.append(os.path.relpath(target, story_path))
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(src, target)
+            restored += 1
+    return restored
+
+
+def undo_trash(story_path: Path, command_id: str) -> Optional[Tuple[int, List[str]]]:
+    """Put a soft reset's files back. Returns (files restored, conflicting paths), None if unknown.
+
+    A file that has been regenerated since the reset is kept, its trashed copy reported as
+    a conflict and left in the tombstone until it is purged. Otherwise the tombstone is
+    removed.
+    """
+    story_path = Path(story_path)
+    tombstone = find_tombstone(story_path, command_id)
+    if tombstone is None:
+        return None
+    manifest = _read_manifest(tombstone)
+    restored = 0
+    conflicts: List[str] = []
+    if manifest is None:
+        # Interrupted before the manifest was written: everything in it is a plain file
+        entries = [{"path": ".", "kind": "tree"}]
+    else:
+        entries = list(reversed(manifest.get("entries", [])))
+    for entry in entries:
+        rel = os.path.normpath(str(entry.get("path", "")))
+        if os.path.isabs(rel) or rel.split(os.sep)[0] in (os.pardir, TRASH_DIRNAME):
+            logger.warning(f"Undo {command_id}: ignoring manifest entry outside the story: {rel}")
+            continue
+        source = tombstone / rel
+        dest = story_path / rel
+        if not source.exists():
+            continue
+        if entry["kind"] == "file":
+            if dest.exists():
+                conflicts.append(rel)
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(source, dest)
+            restored += 1
+        elif entry["kind"] == "dir" and (not dest.exists() or (dest.is_dir() and not any(dest.iterdir()))):
+            if dest.exists():
+                dest.rmdir()
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(source, dest)
+            restored += entry.get("files", 0)
+        else:
+            restored += _restore_tree(source, dest, conflicts, story_path)
+    if conflicts:
+        logger.warning(f"Undo {command_id}: kept {len(conflicts)} regenerated files, trashed copies left in {tombstone}")
+    else:
+        shutil.rmtree(tombstone, ignore_errors=True)
+    return restored, conflicts
+
+
+def purge_trash(story_path: Path, retention_sec: float = TRASH_RETENTION_SEC, now: Optional[float] = None) -> int:
+    """Delete tombstones older than retention_sec; returns how many were removed."""
+    now = time.time() if now is None else now
+    purged = 0
+    for info in list_trash(story_path, retention_sec):
+        tombstone = _tombstone_path(story_path, info["trash_id"])
+        if tombstone is not None and info["expires_ts"] <= now:
+            shutil.rmtree(tombstone, ignore_errors=True)
+            purged += 1
+    return purged
+
+
+class TrashReaper:
+    """Purges expired tombstones of stories() every interval seconds.
+
+    The shared heartbeat scheduler provides the tick; the purge itself runs on its own
+    thread so removing a large tombstone never delays tracker heartbeats.
+    """
+
+    def __init__(
+        self,
+        stories: Callable[[], Iterable[Path]],
+        retention_sec: float = TRASH_RETENTION_SEC,
+        interval: float = TRASH_REAP_INTERVAL_SEC,
+    ):
+        self.stories = stories
+        self.retention_sec = retention_sec
+        self.interval = interval
+        self._token: Optional[int] = None
+        self._running = threading.Lock()
+
+    def start(self) -> "TrashReaper":
+        if self._token is None:
+            self._token = shared_scheduler().register(self._tick, self.interval)
+        return self
+
+    def stop(self) -> None:
+        shared_scheduler().unregister(self._token)
+        self._token = None
+
+    def _tick(self) -> None:
+        if self._running.acquire(blocking=False):
+            threading.Thread(target=self._purge, name="mp-story-trash-reaper", daemon=True).start()
+
+    def _purge(self) -> None:
+        try:
+            self.reap()
+        finally:
+            self._running.release()
+
+    def reap(self) -> int:
+        """Purge expired tombstones now; returns how many were removed."""
+        purged = 0
+        for story_path in self.stories():
+            if trash_root(story_path).is_dir():
+                try:
+                    purged += purge_trash(story_path, self.retention_sec)
+                except OSError as e:
+                    logger.warning(f"Failed to purge trash in {story_path}: {e}")
+        return purged
@@ -0,0 +1,181 @@
+"""Change notification for a story folder's state files.
+
+FileWatcher counts changes to a fixed set of filenames in one directory. On Linux it uses
+inotify (through ctypes, no extra dependency), so a change is seen as soon as the writer
+renames the new file into place; elsewhere, or if inotify is unavailable, it compares
+(mtime, size, inode) of each file every poll_interval seconds. Consumers block in wait()
+until the generation moves past the one they last saw.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WATCH_POLL_INTERVAL_SEC = 0.5
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+_SELECT_TIMEOUT_SEC = 0.5
+
+
+def _libc_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileWatcher:
+    """Generation counter bumped whenever one of filenames in directory changes.
+
+    use_inotify=None picks inotify when available; False forces mtime polling.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        filenames: Iterable[str],
+        *,
+        poll_interval: float = WATCH_POLL_INTERVAL_SEC,
+        use_inotify: Optional[bool] = None,
+    ):
+        self.directory = Path(directory)
+        self.filenames = frozenset(filenames)
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition(threading.Lock())
+        self._generation = 0
+        self._file_generation: Dict[str, int] = {}
+        self._stopped = threading.Event()
+        self._fd: Optional[int] = None
+        if use_inotify is not False:
+            self._fd = self._open_inotify()
+        self.backend = "inotify" if self._fd is not None else "poll"
+        target = self._run_inotify if self._fd is not None else self._run_poll
+        self._thread = threading.Thread(target=target, name=f"mp-story-watch-{self.directory.name}", daemon=True)
+        self._thread.start()
+
+    def _open_inotify(self) -> Optional[int]:
+        libc = _libc_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(str(self.directory)), _WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            logger.warning(f"inotify unavailable for {self.directory} ({os.strerror(err)}); polling instead")
+            os.close(fd)
+            return None
+        return fd
+
+    @property
+    def generation(self) -> int:
+        with self._cond:
+            return self._generation
+
+    def changed_since(self, generation: int) -> List[str]:
+        """Watched filenames that changed after generation."""
+        with self._cond:
+            return sorted(name for name, gen in self._file_generation.items() if gen > generation)
+
+    def file_generation(self, name: str) -> int:
+        """Generation at which name last changed (0 if not since the watcher started)."""
+        with self._cond:
+            return self._file_generation.get(name, 0)
+
+    def wait(self, since: int, timeout: Optional[float] = None) -> int:
+        """Block until the generation differs from since (or timeout); return the current one."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._generation != since or self._stopped.is_set(), timeout)
+            return self._generation
+
+    def _bump(self, names: Iterable[str]) -> None:
+        with self._cond:
+            self._generation += 1
+            for name in names:
+                self._file_generation[name] = self._generation
+            self._cond.notify_all()
+
+    def _run_inotify(self) -> None:
+        fd = self._fd
+        try:
+            while not self._stopped.is_set():
+                ready, _, _ = select.select([fd], [], [], _SELECT_TIMEOUT_SEC)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(fd, _READ_SIZE)
+                except BlockingIOError:
+                    continue
+                changed = set()
+                lost_watch = False
+                pos = 0
+                while pos + _EVENT_HEADER.size <= len(data):
+                    _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+                    pos += _EVENT_HEADER.size
+                    name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+                    pos += length
+                    if mask & _IN_Q_OVERFLOW:
+                        changed.update(self.filenames)
+                    elif mask & _IN_IGNORED:
+                        lost_watch = True
+                    elif name in self.filenames:
+                        changed.add(name)
+                if changed:
+                    self._bump(changed)
+                if lost_watch:
+                    # Directory removed or unmounted; keep going by polling
+                    self.backend = "poll"
+                    break
+        finally:
+            os.close(fd)
+        if not self._stopped.is_set():
+            self._run_poll()
+
+    def _run_poll(self) -> None:
+        keys = {name: _stat_key(self.directory / name) for name in self.filenames}
+        while not self._stopped.wait(self.poll_interval):
+            changed = []
+            for name in self.filenames:
+                key = _stat_key(self.directory / name)
+                if key != keys[name]:
+                    keys[name] = key
+                    changed.append(name)
+            if changed:
+                self._bump(changed)
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join()
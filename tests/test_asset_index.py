@@ -0,0 +1,83 @@
+import json
+import tempfile
+from pathlib import Path
+
+from mp_story_monitor.asset_index import ASSET_INDEX_FILENAME, AssetIndex, asset_slug
+
+
+def _story(tmp: str) -> Path:
+    p = Path(tmp)
+    scene = p / "Chapter01" / "scene_00"
+    scene.mkdir(parents=True)
+    (scene / "scene_C01_S00_keyframe_hero-closeup.png").write_bytes(b"img")
+    (scene / "hero_closeup_narration.mp3").write_bytes(b"audio")
+    (scene / "notes.md").write_bytes(b"not an output")
+    (scene / "hero_closeup_empty.png").touch()
+    return p
+
+
+def test_lookup_matches_slug_substring_and_extension():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        index = AssetIndex(p)
+        found = index.lookup(asset_slug("hero_closeup"))
+        assert sorted(f.path.name for f in found) == [
+            "hero_closeup_narration.mp3", "scene_C01_S00_keyframe_hero-closeup.png",
+        ]
+        assert {f.type for f in found} == {"image", "audio"}
+        images = index.lookup(asset_slug("hero_closeup"), {".png"})
+        assert [f.path.name for f in images] == ["scene_C01_S00_keyframe_hero-closeup.png"]
+        assert images[0].size == 3
+        assert len(index) == 3  # the empty png is indexed but never returned
+
+
+def test_refresh_relists_only_changed_directories():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        index = AssetIndex(p, persist=False)
+        index.refresh()
+        assert index.dirs_scanned == 3
+        # Pretend every directory is old enough to trust its mtime
+        for rel, record in index._dirs.items():
+            record.mtime_ns = (p / rel).stat().st_mtime_ns
+        index.refresh()
+        assert index.dirs_scanned == 0
+        (p / "Chapter01" / "scene_01").mkdir()
+        (p / "Chapter01" / "scene_01" / "villain.png").write_bytes(b"x")
+        assert [f.path.name for f in index.lookup("villain")] == ["villain.png"]
+        assert index.dirs_scanned == 2  # Chapter01 and the new scene_01
+        (p / "Chapter01" / "scene_01" / "villain.png").unlink()
+        assert index.lookup("villain") == []
+
+
+def test_index_is_persisted_and_reloaded():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        AssetIndex(p).refresh()
+        data = json.loads((p / ASSET_INDEX_FILENAME).read_text())
+        assert "Chapter01/scene_00" in data["dirs"]
+        reloaded = AssetIndex(p)
+        reloaded.refresh()
+        assert len(reloaded) == 3
+        assert reloaded.lookup("hero-closeup", {".mp3"})[0].path.name == "hero_closeup_narration.mp3"
+
+
+def test_index_for_keeps_a_bounded_number_of_stories():
+    from mp_story_monitor import asset_index
+
+    old_max = asset_index.ASSET_INDEX_MAX_STORIES
+    asset_index.ASSET_INDEX_MAX_STORIES = 2
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            stories = [Path(tmp) / f"story{i}" for i in range(3)]
+            for p in stories:
+                p.mkdir()
+            first = asset_index.index_for(stories[0])
+            asset_index.index_for(stories[1])
+            assert asset_index.index_for(stories[0]) is first  # now most recently used
+            asset_index.index_for(stories[2])
+            keys = list(asset_index._indexes)
+            assert len(keys) == 2 and str(stories[1].resolve()) not in keys
+            assert asset_index.index_for(stories[0]) is first
+    finally:
+        asset_index.ASSET_INDEX_MAX_STORIES = old_max
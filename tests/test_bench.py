@@ -0,0 +1,34 @@
+import tempfile
+from pathlib import Path
+
+from mp_story_monitor.bench import make_synthetic_story, percentile, run_load
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) is None
+
+
+def test_synthetic_story_has_state_files_and_assets():
+    with tempfile.TemporaryDirectory() as tmp:
+        story = Path(tmp) / "s"
+        assets = make_synthetic_story(story, chapters=2, scenes=2, assets_per_scene=1)
+        assert len(assets) == 4
+        assert (story / "_progress.json").exists() and (story / "_director_progress.json").exists()
+        assert (story / "Chapter01" / "scene_00" / f"{assets[0]}.png").exists()
+
+
+def test_run_load_reports_polls_and_resets():
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_load(
+            root=Path(tmp), stories=1, viewers=4, duration=1.5, interval=0.3, reset_burst=2, reset_interval=0.6
+        )
+    kinds = report["kinds"]
+    polls = kinds["_progress.json"]
+    assert polls["requests"] >= 4 and polls["errors"] == 0 and polls["busy_503"] == 0
+    assert polls["p99_ms"] is not None and polls["p50_ms"] <= polls["p99_ms"]
+    assert kinds["reset_post"]["statuses"].get("202", 0) >= 2
+    assert kinds["reset_job"]["requests"] >= 2
+    assert "_progress.json" in report["server"]
@@ -1,4 +1,6 @@
+import json
 import tempfile
+from dataclasses import asdict
 from pathlib import Path
 from mp_story_monitor.commands import (
     CommandAction,
@@ -54,3 +56,157 @@ def test_append_command_preserves_existing():
         write_commands(path, existing)
         loaded = read_commands(path)
         assert len(loaded) == 2
+
+
+def test_write_commands_merges_with_concurrent_writers():
+    from mp_story_monitor.commands import append_command, journal_for, update_command
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        a = create_command(CommandAction.RESET_ASSET, "a")
+        b = create_command(CommandAction.RESET_ASSET, "b")
+        write_commands(path, [a, b])
+        first = journal_for(path).seq
+        stale = read_commands(path)
+        # Between this consumer's read and its write: a new command, and b marked done
+        late = create_command(CommandAction.RESET_ASSET, "late")
+        append_command(path, late)
+        mark_command_done(b, "by server")
+        update_command(path, b)
+        mark_command_done(stale[0], "by consumer")
+        write_commands(path, stale)
+        loaded = {c.id: c for c in read_commands(path)}
+        assert list(loaded) == [a.id, b.id, late.id]
+        assert loaded[a.id].result == "by consumer" and stale[0].seq == loaded[a.id].seq
+        assert loaded[b.id].result == "by server"
+        assert journal_for(path).seq > first
+        # Nothing changed, nothing written
+        seq = journal_for(path).seq
+        write_commands(path, read_commands(path))
+        write_commands(path, [])
+        assert journal_for(path).seq == seq
+
+
+def test_journal_appends_and_reads_since():
+    from mp_story_monitor.commands import append_command, update_command, COMMANDS_JOURNAL_FILENAME
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        a = create_command(CommandAction.RESET_ASSET, "a")
+        b = create_command(CommandAction.RESET_ASSET, "b")
+        append_command(path, a)
+        append_command(path, b)
+        assert [c.id for c in read_commands(path, since=a.seq)] == [b.id]
+        mark_command_done(a, result="ok")
+        update_command(path, a)
+        assert [c.id for c in read_commands(path, since=b.seq)] == [a.id]
+        assert [c.status for c in read_commands(path)] == ["done", "pending"]
+        # One line per record: appends never rewrite earlier entries
+        lines = (path / COMMANDS_JOURNAL_FILENAME).read_text().splitlines()
+        assert [json.loads(line)["op"] for line in lines] == ["add", "add", "update"]
+
+
+def test_journal_sees_appends_from_other_instances():
+    from mp_story_monitor.commands import CommandJournal
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        reader, writer = CommandJournal(path), CommandJournal(path)
+        assert reader.commands() == []
+        cmd = create_command(CommandAction.RESET_SCENE, "C01_S00")
+        writer.append(cmd)
+        assert [c.id for c in reader.commands()] == [cmd.id]
+        assert [c.id for c in reader.by_status("pending")] == [cmd.id]
+        writer.compact(keep_processed=0)
+        cmd2 = create_command(CommandAction.RESET_SCENE, "C01_S01")
+        writer.append(cmd2)
+        assert [c.id for c in reader.commands()] == [cmd.id, cmd2.id]
+
+
+def test_compaction_archives_processed_commands():
+    from mp_story_monitor.commands import CommandJournal, read_archived_commands
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        journal = CommandJournal(path)
+        cmds = [create_command(CommandAction.RESET_ASSET, f"a{i}") for i in range(5)]
+        for cmd in cmds:
+            journal.append(cmd)
+        for cmd in cmds[:3]:
+            journal.acknowledge(cmd, "done")
+        # Done by the server but not yet acknowledged by a consumer: stays in the journal
+        mark_command_done(cmds[3])
+        journal.update(cmds[3])
+        seq = journal.seq
+        journal.compact(keep_processed=1)
+        assert [c.target for c in journal.commands()] == ["a2", "a3", "a4"]
+        assert [c.target for c in read_archived_commands(path)] == ["a0", "a1"]
+        assert journal.seq == seq
+        assert CommandJournal(path).seq == seq
+
+
+def test_legacy_commands_file_is_imported():
+    from mp_story_monitor.commands import append_command
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        legacy = create_command(CommandAction.RESET_ASSET, "old")
+        (path / "_commands.json").write_text(json.dumps({"version": 3, "commands": [asdict(legacy)]}))
+        assert [c.id for c in read_commands(path)] == [legacy.id]
+        new = create_command(CommandAction.RESET_ASSET, "new")
+        append_command(path, new)
+        assert [c.id for c in read_commands(path)] == [legacy.id, new.id]
+        assert not (path / "_commands.json").exists()
+        assert (path / "_commands.json.imported").exists()
+        assert [c.id for c in read_commands(path)] == [legacy.id, new.id]
+
+
+def _check_watcher_delivers_new_commands(use_inotify):
+    import threading
+    import time
+    from mp_story_monitor.commands import CommandWatcher, append_command
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        old = create_command(CommandAction.RESET_ASSET, "old")
+        append_command(path, old)
+        with CommandWatcher(path, include_existing=False, poll_interval=0.05, use_inotify=use_inotify) as watcher:
+            assert watcher.get(timeout=0.1) is None
+            cmd = create_command(CommandAction.RESET_SCENE, "C01_S00")
+            threading.Timer(0.1, append_command, args=(path, cmd)).start()
+            started = time.monotonic()
+            got = watcher.get(timeout=5)
+            assert got is not None and got.id == cmd.id
+            assert time.monotonic() - started < 2
+            assert watcher.ack(got, "regenerated") is True
+            # A second acknowledgement (e.g. another consumer's copy) is refused
+            assert mark_command_done(cmd, "again", story_path=path) is False
+            assert watcher.get(timeout=0.2) is None
+        stored = {c.id: c for c in read_commands(path)}
+        assert stored[cmd.id].status == "done"
+        assert stored[cmd.id].result == "regenerated"
+        assert stored[cmd.id].acked_at
+
+
+def test_command_watcher_polling():
+    _check_watcher_delivers_new_commands(use_inotify=False)
+
+
+def test_command_watcher_default_backend():
+    _check_watcher_delivers_new_commands(use_inotify=None)
+
+
+def test_command_watcher_delivers_existing_pending_and_async():
+    import asyncio
+    from mp_story_monitor.commands import CommandWatcher, append_command
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        done = create_command(CommandAction.RESET_ASSET, "done")
+        mark_command_done(done)
+        pending = create_command(CommandAction.RESET_ASSET, "pending")
+        append_command(path, done)
+        append_command(path, pending)
+
+        async def consume():
+            with CommandWatcher(path, poll_interval=0.05) as watcher:
+                first = await watcher.aget(timeout=2)
+                second = await watcher.aget(timeout=0.3)
+                return first, second
+
+        first, second = asyncio.run(consume())
+        assert first.id == pending.id
+        assert second is None
@@ -0,0 +1,67 @@
+import json
+import tempfile
+from pathlib import Path
+
+from mp_story_monitor.events import PROGRESS_EVENTS_FILENAME, read_events
+from mp_story_monitor.tracker import ProgressTracker, PROGRESS_JSON_FILENAME
+
+
+def test_tracker_appends_events():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, event_log=True)
+        tracker.start("production", current_step="Rendering")
+        tracker.set_phase_progress("production", 1, 3)
+        tracker.finish("production", play_sound=False)
+        result = read_events(p)
+        types = [e["type"] for e in result["events"]]
+        assert types == ["log", "phase", "step", "progress", "phase"]
+        assert result["events"][-1]["status"] == "done"
+        snapshot = json.loads((p / PROGRESS_JSON_FILENAME).read_text())
+        assert snapshot["event_log"] == {"epoch": result["epoch"], "offset": result["offset"]}
+
+
+def test_read_events_from_offset_returns_only_new_events():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, event_log=True)
+        tracker.set_phase_progress("production", 1, 3)
+        first = read_events(p)
+        tracker.set_phase_progress("production", 2, 3)
+        second = read_events(p, first["offset"], first["epoch"])
+        assert second["reset"] is False
+        assert [e["complete"] for e in second["events"]] == [2]
+        assert read_events(p, second["offset"], second["epoch"])["events"] == []
+
+
+def test_compaction_starts_new_epoch_with_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, event_log=True, event_log_compact_every=5)
+        tracker.set_phase_progress("production", 1, 10)
+        before = read_events(p)
+        for i in range(2, 8):
+            tracker.set_phase_progress("production", i, 10)
+        after = read_events(p, before["offset"], before["epoch"])
+        assert after["reset"] is True
+        assert after["events"][0]["type"] == "snapshot"
+        assert after["events"][0]["state"]["phase_progress"]["production"]["complete"] == 5
+        assert (p / PROGRESS_EVENTS_FILENAME).stat().st_size < 2048
+
+
+def test_resume_after_torn_line_drops_the_partial_event():
+    from mp_story_monitor.events import ProgressEventLog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        log = ProgressEventLog(p)
+        log.append("progress", phase="production", complete=1)
+        log.close()
+        with open(p / PROGRESS_EVENTS_FILENAME, "ab") as f:
+            f.write(b'{"seq":2,"type":"progr')  # crashed mid-append
+        log = ProgressEventLog(p)
+        log.append("progress", phase="production", complete=2)
+        log.close()
+        events = read_events(p)["events"]
+        assert [e.get("complete") for e in events] == [None, 1, 2]
+        assert [e["seq"] for e in events] == [0, 1, 2]
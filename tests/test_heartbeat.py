@@ -0,0 +1,54 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from mp_story_monitor import tracker as tracker_module
+from mp_story_monitor.heartbeat import HeartbeatScheduler, shared_scheduler
+from mp_story_monitor.tracker import ProgressTracker
+
+
+def test_scheduler_runs_all_callbacks_on_one_thread():
+    scheduler = HeartbeatScheduler(batch_window=0)
+    seen = {}
+    lock = threading.Lock()
+
+    def make_callback(i):
+        def callback():
+            with lock:
+                seen.setdefault(i, set()).add(threading.get_ident())
+        return callback
+
+    callbacks = [make_callback(i) for i in range(50)]
+    tokens = [scheduler.register(cb, 0.05) for cb in callbacks]
+    time.sleep(0.3)
+    assert len(seen) == 50
+    assert len(set().union(*seen.values())) == 1
+    for token in tokens:
+        scheduler.unregister(token)
+    time.sleep(0.1)
+    assert scheduler.active == 0
+    assert not scheduler.running
+
+
+def test_trackers_share_scheduler_and_release_it_on_complete(monkeypatch):
+    monkeypatch.setattr(tracker_module, "HEARTBEAT_INTERVAL_SEC", 0.05)
+    before = threading.active_count()
+    with tempfile.TemporaryDirectory() as tmp:
+        trackers = []
+        for i in range(20):
+            story = Path(tmp) / f"story_{i}"
+            story.mkdir()
+            t = ProgressTracker(story)
+            t.start("production")
+            t.start("production")  # re-starting a phase does not add a second registration
+            trackers.append(t)
+        assert shared_scheduler().active == 20
+        assert threading.active_count() <= before + 1
+        time.sleep(0.3)
+        assert all(t.writes_performed > 2 for t in trackers)
+        for t in trackers:
+            t.complete()
+        time.sleep(0.1)
+        assert shared_scheduler().active == 0
+        assert not shared_scheduler().running
@@ -0,0 +1,35 @@
+import json
+import tempfile
+from pathlib import Path
+
+from mp_story_monitor.instrumentation import disable_trace, enable_trace, trace, trace_enabled
+from mp_story_monitor.tracker import ProgressTracker
+
+
+def test_trace_is_noop_when_disabled():
+    assert not trace_enabled()
+    trace("ignored", story="x")
+
+
+def test_progress_writes_are_traced_with_timing_and_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        trace_file = p / "trace.jsonl"
+        story = p / "story"
+        story.mkdir()
+        enable_trace(trace_file)
+        try:
+            assert trace_enabled()
+            tracker = ProgressTracker(story)
+            tracker.start("production")
+            tracker.set_phase_progress("production", 1, 2)
+            tracker.complete()
+        finally:
+            disable_trace()
+        events = [json.loads(line) for line in trace_file.read_text().splitlines()]
+        writes = [e for e in events if e["event"] == "progress_write"]
+        assert len(writes) == 3
+        assert writes[0]["story"] == str(story)
+        assert writes[0]["phase"] == "production"
+        assert writes[-1]["bytes"] == len((story / "_progress.json").read_bytes())
+        assert all(isinstance(e["duration_us"], int) for e in writes)
@@ -37,10 +37,21 @@ def test_full_reset_flow():
             method="POST",
         )
         with urllib.request.urlopen(req) as resp:
+            assert resp.status == 202
             result = json.loads(resp.read())
 
         assert result["ok"] is True
-        assert result["files_deleted"] >= 2
+        # Reset runs in the background; poll its job until finished
+        job_url = f"http://127.0.0.1:18099/{result['job']}"
+        deadline = time.time() + 10
+        while True:
+            with urllib.request.urlopen(job_url) as resp:
+                job = json.loads(resp.read())
+            if job["status"] in ("done", "error") or time.time() > deadline:
+                break
+            time.sleep(0.05)
+        assert job["status"] == "done"
+        assert job["files_deleted"] >= 2
 
         # Verify files deleted
         assert not keyframe.exists() or keyframe.stat().st_size == 0
@@ -48,8 +59,10 @@ def test_full_reset_flow():
         assert not stitched.exists()
 
         # Verify command written
-        cmd_file = p / "_commands.json"
-        assert cmd_file.exists()
-        cmds = json.loads(cmd_file.read_text())
-        assert len(cmds["commands"]) == 1
-        assert cmds["commands"][0]["action"] == "reset_scene"
+        from mp_story_monitor.commands import CommandJournal
+        assert (p / "_commands.jsonl").exists()
+        cmds = CommandJournal(p).commands()
+        assert len(cmds) == 1
+        assert cmds[0].action == "reset_scene"
+        assert cmds[0].status == "done"
+        assert cmds[0].processed_at
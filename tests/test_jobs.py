@@ -0,0 +1,110 @@
+"""Tests for the background reset job queue."""
+import tempfile
+import threading
+from pathlib import Path
+
+from mp_story_monitor.commands import CommandAction, append_command, create_command, read_commands
+from mp_story_monitor.jobs import ResetJobQueue
+
+
+def test_job_marks_command_done():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        queue = ResetJobQueue()
+        cmd = create_command(CommandAction.RESET_ASSET, "a")
+        append_command(p, cmd)
+        job = queue.submit(p, cmd, lambda: 3)
+        assert queue.wait_idle(5)
+        assert job.status == "done"
+        assert job.files_deleted == 3
+        assert job.duration_sec is not None
+        stored = read_commands(p)[0]
+        assert stored.status == "done"
+        assert stored.result == "3 files deleted"
+        queue.shutdown()
+
+
+def test_failed_job_is_reported():
+    def boom():
+        raise OSError("disk gone")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        queue = ResetJobQueue()
+        cmd = create_command(CommandAction.RESET_STORY, "*")
+        append_command(p, cmd)
+        job = queue.submit(p, cmd, boom)
+        assert queue.wait_idle(5)
+        assert job.status == "error"
+        assert "disk gone" in job.error
+        assert read_commands(p)[0].status == "error"
+        queue.shutdown()
+
+
+def test_jobs_for_one_story_run_one_at_a_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        queue = ResetJobQueue(workers=4)
+        running = []
+        overlap = []
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                running.append(1)
+                overlap.append(len(running))
+            threading.Event().wait(0.05)
+            with lock:
+                running.pop()
+            return 0
+
+        for i in range(4):
+            cmd = create_command(CommandAction.RESET_ASSET, f"a{i}")
+            append_command(p, cmd)
+            queue.submit(p, cmd, work)
+        assert queue.wait_idle(5)
+        assert max(overlap) == 1
+        assert len(queue.jobs(p)) == 4
+        assert all(c.status == "done" for c in read_commands(p))
+        queue.shutdown()
+
+
+def test_story_locks_are_dropped_when_idle():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = ResetJobQueue()
+        release = threading.Event()
+        stories = [Path(tmp) / f"story{i}" for i in range(3)]
+        for p in stories:
+            p.mkdir()
+            cmd = create_command(CommandAction.RESET_ASSET, "a")
+            append_command(p, cmd)
+            queue.submit(p, cmd, lambda: release.wait(5) and 0)
+        assert len(queue._story_locks) == 3
+        release.set()
+        queue.shutdown(wait=True)
+        assert queue._story_locks == {}
+        with queue.story_lock(stories[1]):
+            assert len(queue._story_locks) == 1
+        assert queue._story_locks == {}
+
+
+def test_server_processed_commands_keep_journal_bounded(monkeypatch):
+    from mp_story_monitor import commands as commands_module
+    from mp_story_monitor.commands import (
+        COMMAND_JOURNAL_COMPACT_EVERY, COMMAND_JOURNAL_KEEP_PROCESSED, COMMANDS_JOURNAL_FILENAME,
+        read_archived_commands,
+    )
+    monkeypatch.setattr(commands_module, "COMMAND_JOURNAL_UNACKED_RETENTION_SEC", 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        queue = ResetJobQueue()
+        total = COMMAND_JOURNAL_COMPACT_EVERY + 200
+        for i in range(total):
+            cmd = create_command(CommandAction.RESET_ASSET, f"a{i}")
+            append_command(p, cmd)
+            queue.submit(p, cmd, lambda: 0)
+        assert queue.wait_idle(60)
+        queue.shutdown()
+        lines = (p / COMMANDS_JOURNAL_FILENAME).read_text().splitlines()
+        assert len(lines) < COMMAND_JOURNAL_COMPACT_EVERY + COMMAND_JOURNAL_KEEP_PROCESSED
+        assert len(read_commands(p)) + len(read_archived_commands(p)) == total
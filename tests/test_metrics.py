@@ -0,0 +1,56 @@
+import tempfile
+from pathlib import Path
+
+from mp_story_monitor.metrics import MetricsRegistry, default_registry
+from mp_story_monitor.tracker import ProgressTracker
+
+
+def test_registry_renders_prometheus_text_and_json():
+    reg = MetricsRegistry()
+    reg.describe("requests_total", "counter", "Requests.")
+    reg.describe("latency_seconds", "histogram", "Latency.", buckets=(0.01, 0.1, 1.0))
+    reg.inc("requests_total", endpoint="_progress.json", status=200)
+    reg.inc("requests_total", 2, endpoint="_progress.json", status=200)
+    for value in (0.005, 0.05, 0.05, 0.5):
+        reg.observe("latency_seconds", value, endpoint="_progress.json")
+    reg.register_collector(lambda: [("cache_hit_ratio", "gauge", "Hits.", [({"cache": "state_file"}, 0.75)])])
+
+    text = reg.prometheus_text()
+    assert "# TYPE mp_story_monitor_requests_total counter" in text
+    assert 'mp_story_monitor_requests_total{endpoint="_progress.json",status="200"} 3' in text
+    assert 'mp_story_monitor_latency_seconds_bucket{endpoint="_progress.json",le="0.1"} 3' in text
+    assert 'mp_story_monitor_latency_seconds_bucket{endpoint="_progress.json",le="+Inf"} 4' in text
+    assert 'mp_story_monitor_latency_seconds_count{endpoint="_progress.json"} 4' in text
+    assert 'mp_story_monitor_cache_hit_ratio{cache="state_file"} 0.75' in text
+
+    data = reg.to_dict()
+    hist = data["latency_seconds"]["series"][0]
+    assert hist["count"] == 4
+    assert hist["p50"] == 0.1 and hist["p99"] == 1.0
+    assert data["requests_total"]["series"][0]["value"] == 3
+
+
+def test_percentiles_above_the_last_bucket_are_valid_json():
+    import json
+
+    reg = MetricsRegistry()
+    reg.describe("reset_seconds", "histogram", "Resets.", buckets=(1.0, 30.0))
+    reg.observe("reset_seconds", 45.0)
+    body = json.dumps(reg.to_dict(), allow_nan=False)
+    hist = json.loads(body)["reset_seconds"]["series"][0]
+    assert hist["p50"] is None and hist["buckets"]["+Inf"] == 1
+    reg.observe("reset_seconds", 0.5)
+    reg.observe("reset_seconds", 0.5)
+    assert reg.to_dict()["reset_seconds"]["series"][0]["p50"] == 1.0
+
+
+def test_tracker_writes_are_counted():
+    reg = default_registry()
+    before = reg.to_dict().get("progress_writes_total", {"series": [{"value": 0}]})["series"][0]["value"]
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = ProgressTracker(Path(tmp))
+        tracker.start("production")
+        tracker.complete()
+    data = reg.to_dict()
+    assert data["progress_writes_total"]["series"][0]["value"] >= before + 2
+    assert data["progress_write_duration_seconds"]["series"][0]["count"] >= 2
@@ -0,0 +1,123 @@
+import errno
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from mp_story_monitor.tracker import ProgressTracker, PROGRESS_JSON_FILENAME
+
+
+def _work(proxy, n):
+    with proxy:
+        for _ in range(n):
+            proxy.advance("production")
+    return n
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_proxy_is_picklable():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = ProgressTracker(Path(tmp))
+        proxy = tracker.proxy()
+        clone = pickle.loads(pickle.dumps(proxy))
+        assert clone.address == proxy.address
+        tracker.complete()
+
+
+def test_worker_processes_report_through_proxy():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, max_write_latency=0.02)
+        proxy = tracker.proxy()
+        proxy.set_phase_progress("production", 0, 40000)
+        proxy.flush()
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            assert sum(pool.map(_work, [proxy] * 8, [5000] * 8)) == 40000
+
+        def done():
+            tracker.flush()
+            data = json.loads((p / PROGRESS_JSON_FILENAME).read_text())
+            return data["phase_progress"]["production"] == {"complete": 40000, "total": 40000}
+
+        assert _wait_for(done)
+        tracker.complete()
+        assert not Path(proxy.address).exists()
+
+
+def test_large_flush_is_split_into_datagrams():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, coalesce_writes=True, max_write_latency=0.02)
+        proxy = tracker.proxy()
+        # ~150 KB of updates, more than the parent reads in one recv()
+        phases = [f"phase_{i:04d}_" + "x" * 60 for i in range(2000)]
+        for i, phase in enumerate(phases):
+            proxy.set_phase_progress(phase, i, 2000)
+        proxy.flush()
+
+        def done():
+            tracker.flush()
+            data = json.loads((p / PROGRESS_JSON_FILENAME).read_text())
+            return len(data["phase_progress"]) == 2000
+
+        assert _wait_for(done)
+        assert tracker._proxy_server.messages_received > 1
+        tracker.complete()
+
+
+class _FailOnce:
+    def __init__(self, sock, err):
+        self.sock = sock
+        self.err = err
+
+    def send(self, data):
+        if self.err is not None:
+            err, self.err = self.err, None
+            raise OSError(err, os.strerror(err))
+        return self.sock.send(data)
+
+
+def test_transient_send_error_keeps_updates():
+    from mp_story_monitor.proxy import _sender_for
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, max_write_latency=0.02)
+        proxy = tracker.proxy()
+        sender = _sender_for(proxy.address, proxy.flush_interval)
+        tracker.set_phase_progress("production", 0, 5)
+        sender._sock = _FailOnce(sender._socket(), errno.ENOBUFS)
+        proxy.advance("production", 3)
+        proxy.flush()
+        proxy.advance("production", 2)
+        proxy.flush()
+
+        def done():
+            tracker.flush()
+            data = json.loads((p / PROGRESS_JSON_FILENAME).read_text())
+            return data["phase_progress"].get("production", {}).get("complete") == 5
+
+        assert _wait_for(done)
+        tracker.complete()
+
+
+def test_error_closes_proxy_server():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = ProgressTracker(Path(tmp))
+        proxy = tracker.proxy()
+        tracker.error("production", "boom")
+        assert not Path(proxy.address).exists()
+        # Workers still holding the proxy stop quietly
+        proxy.advance("production")
+        proxy.flush()
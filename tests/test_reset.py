@@ -72,3 +72,111 @@ def test_reset_chapter_deletes_chapter_and_scenes():
         assert len(files_00) == 0
         assert len(files_01) == 0
         assert count > 0
+
+
+def test_iter_output_files_prunes_hidden_dirs_and_visits_hints_first():
+    from mp_story_monitor.reset import iter_output_files
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _make_story_dir(tmp)
+        trash = p / ".trash" / "cmd1"
+        trash.mkdir(parents=True)
+        (trash / "scene_00_nextscene.mp4").write_bytes(b"fake")
+        (p / "Chapter01_idle_hum" / "scene_00" / "notes.json").write_bytes(b"{}")
+        files = list(iter_output_files(p, hints=("scene_01",)))
+        assert all(".trash" not in f.parts and f.suffix != ".json" for f in files)
+        assert next(f for f in files if f.parent != p).parent.name == "scene_01"
+        assert len(files) == 10
+        assert len(list(iter_output_files(p, min_size=1))) == 9  # the concept sheet is empty
+
+
+def test_delete_asset_outputs_with_hint_deletes_muxed_variants_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _make_story_dir(tmp)
+        scene = p / "Chapter01_idle_hum" / "scene_00"
+        deleted = delete_asset_outputs(p, "nextscene", scene_hint="scene_00")
+        # scene_00 nextscene + muxed, scene_01 nextscene, final_stitched_nextscene
+        assert deleted == 4
+        assert not (scene / "scene_00_nextscene_muxed.mp4").exists()
+        assert (scene / "scene_00_wan.mp4").exists()
+
+
+def test_delete_asset_outputs_resolves_matches_through_the_index():
+    from mp_story_monitor.asset_index import index_for
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _make_story_dir(tmp)
+        index = index_for(p)
+        index.refresh()
+        # Pretend every directory is old enough to trust its mtime
+        for rel, record in index._dirs.items():
+            record.mtime_ns = (index.story_path / rel).stat().st_mtime_ns
+        scene = p / "Chapter01_idle_hum" / "scene_00"
+        (scene / "scene_00_nextscene_muxed.mkv").write_bytes(b"fake")
+        (scene / "scene_00_nextscene-2.png").touch()
+        # scene_00 nextscene + both muxed variants + the empty png, scene_01 nextscene, final_stitched
+        assert delete_asset_outputs(p, "nextscene") == 6
+        assert index.dirs_scanned == 1  # only scene_00 changed since the refresh
+        assert not (scene / "scene_00_nextscene_muxed.mkv").exists()
+        assert not (scene / "scene_00_nextscene-2.png").exists()
+
+
+def test_reset_batch_matches_sequential_resets():
+    from mp_story_monitor.reset import reset_batch
+
+    targets = [("asset", "nextscene"), ("scene", "C01_S00"), ("chapter", "C01"), ("scene", "bad")]
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _make_story_dir(tmp)
+        sequential = [
+            delete_asset_outputs(p, "nextscene"),
+            reset_scene(p, "C01_S00"),
+            reset_chapter(p, "C01"),
+            reset_scene(p, "bad"),
+        ]
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _make_story_dir(tmp)
+        counts = reset_batch(p, targets)
+        remaining = [f for f in p.rglob("*") if f.is_file() and f.stat().st_size > 0]
+    assert counts == sequential == [4, 4, 1, 0]
+    assert remaining == []
+
+
+def test_delete_files_in_parallel_skips_empty_files_when_asked():
+    from mp_story_monitor.reset import delete_files
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        full = [p / f"f{i}.png" for i in range(20)]
+        for f in full:
+            f.write_bytes(b"x")
+        empty = p / "empty.png"
+        empty.touch()
+        plan = [(f, "Deleting: ", True) for f in full] + [(empty, "Deleting: ", True)]
+        assert delete_files(plan, workers=4) == 20
+        assert not any(f.exists() for f in full) and empty.exists()
+        assert delete_files([(empty, None, False)], workers=4) == 1
+
+
+def test_delete_files_stops_at_the_first_failure():
+    import time
+
+    import pytest
+
+    from mp_story_monitor.reset import delete_files
+
+    class _SlowPath(type(Path())):
+        def unlink(self, missing_ok=False):
+            time.sleep(0.3)
+            super().unlink(missing_ok)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        files = []
+        for i in range(20):
+            (p / f"x{i}.png").write_bytes(b"img")
+            files.append(_SlowPath(p / f"x{i}.png"))
+        plan = [(p / "missing.png", None, False)] + [(f, None, False) for f in files]
+        with pytest.raises(FileNotFoundError):
+            delete_files(plan, workers=2)
+        # Only deletions already running when the failure was seen went ahead
+        assert sum(f.exists() for f in files) >= 18
@@ -1,5 +1,6 @@
 # mp-story-monitor/tests/test_serve_post.py
 import json
+import os
 import tempfile
 import threading
 import time
@@ -63,3 +64,482 @@ def test_get_commands():
             data = json.loads(resp.read())
         assert "commands" in data
         assert len(data["commands"]) >= 1
+
+
+def test_get_progress_events():
+    from mp_story_monitor.tracker import ProgressTracker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, event_log=True)
+        tracker.set_phase_progress("production", 1, 2)
+        _start_server(p, 18094)
+        with urllib.request.urlopen("http://127.0.0.1:18094/api/progress-events") as resp:
+            first = json.loads(resp.read())
+        assert first["events"][-1]["type"] == "progress"
+        tracker.set_phase_progress("production", 2, 2)
+        url = f"http://127.0.0.1:18094/api/progress-events?offset={first['offset']}&epoch={first['epoch']}"
+        with urllib.request.urlopen(url) as resp:
+            second = json.loads(resp.read())
+        assert [e["complete"] for e in second["events"]] == [2]
+
+
+def test_multi_story_server_routes_by_story_id():
+    import os
+    import urllib.error
+    from mp_story_monitor.serve_progress import serve_root
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        # "story c" has a progress file but a name /stories/<id>/ would reject: not listed
+        for name in ("story_a", "story_b", "story c"):
+            (root / name).mkdir()
+            (root / name / "_progress.json").write_text(json.dumps({"job_id": name, "phases": {"production": "running"}}))
+        cwd = os.getcwd()
+        threading.Thread(target=serve_root, args=(root, 18095), daemon=True).start()
+        time.sleep(0.5)
+        with urllib.request.urlopen("http://127.0.0.1:18095/api/stories") as resp:
+            index = json.loads(resp.read())
+        assert sorted(s["id"] for s in index["stories"]) == ["story_a", "story_b"]
+        with urllib.request.urlopen("http://127.0.0.1:18095/stories/story_b/_progress.json") as resp:
+            assert json.loads(resp.read())["job_id"] == "story_b"
+        resp = _post(18095, "/stories/story_a/api/reset-story", {})
+        assert resp["ok"] is True
+        assert (root / "story_a" / "_commands.jsonl").exists()
+        assert not (root / "story_b" / "_commands.jsonl").exists()
+        try:
+            urllib.request.urlopen("http://127.0.0.1:18095/stories/missing/_progress.json")
+            assert False, "expected 404"
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+        assert os.getcwd() == cwd
+
+
+def _start_pooled(port: int, workers: int, max_in_flight: int, release: threading.Event):
+    import http.server
+    from mp_story_monitor.serve_progress import _PooledHTTPServer
+
+    class _Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/slow":
+                release.wait(10)
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = _PooledHTTPServer(("127.0.0.1", port), _Handler, workers=workers, max_in_flight=max_in_flight)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def test_slow_request_does_not_block_polls():
+    release = threading.Event()
+    httpd = _start_pooled(18096, workers=2, max_in_flight=8, release=release)
+    try:
+        slow = threading.Thread(target=lambda: urllib.request.urlopen("http://127.0.0.1:18096/slow").read())
+        slow.start()
+        time.sleep(0.2)
+        start = time.monotonic()
+        with urllib.request.urlopen("http://127.0.0.1:18096/poll", timeout=5) as resp:
+            assert resp.read() == b"ok"
+        assert time.monotonic() - start < 2
+    finally:
+        release.set()
+        slow.join(5)
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_requests_beyond_max_in_flight_get_503():
+    import urllib.error
+    release = threading.Event()
+    httpd = _start_pooled(18097, workers=1, max_in_flight=1, release=release)
+    try:
+        slow = threading.Thread(target=lambda: urllib.request.urlopen("http://127.0.0.1:18097/slow").read())
+        slow.start()
+        time.sleep(0.2)
+        try:
+            urllib.request.urlopen("http://127.0.0.1:18097/poll", timeout=5)
+            assert False, "expected 503"
+        except urllib.error.HTTPError as e:
+            assert e.code == 503
+            assert e.headers["Retry-After"] == "1"
+    finally:
+        release.set()
+        slow.join(5)
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_stream_pushes_change_events():
+    from mp_story_monitor.atomic import atomic_write_text
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        atomic_write_text(p / "_progress.json", '{"phases": {}}')
+        _start_server(p, 18098)
+        resp = urllib.request.urlopen("http://127.0.0.1:18098/api/stream", timeout=10)
+        assert resp.headers["Content-Type"] == "text/event-stream"
+        assert resp.readline() == b"retry: 2000\n"
+        assert resp.readline() == b"\n"
+        time.sleep(0.2)
+        atomic_write_text(p / "_progress.json", '{"phases": {"director": "running"}}')
+        assert resp.readline() == b"event: change\n"
+        data = json.loads(resp.readline().decode("utf-8")[len("data: "):])
+        assert data["files"] == ["_progress.json"]
+        # The open stream does not hold a request worker
+        with urllib.request.urlopen("http://127.0.0.1:18098/_progress.json") as r:
+            assert json.loads(r.read())["phases"]["director"] == "running"
+        resp.close()
+
+
+def test_state_files_support_conditional_get():
+    import urllib.error
+    from mp_story_monitor.atomic import atomic_write_text
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        atomic_write_text(p / "_progress.json", '{"phases": {}}')
+        _start_server(p, 18100)
+        url = "http://127.0.0.1:18100/_progress.json"
+        with urllib.request.urlopen(url) as resp:
+            etag = resp.headers["ETag"]
+            last_modified = resp.headers["Last-Modified"]
+            assert resp.headers["Cache-Control"] == "no-cache"
+            assert json.loads(resp.read()) == {"phases": {}}
+        for headers in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+            try:
+                urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+                assert False, "expected 304"
+            except urllib.error.HTTPError as e:
+                assert e.code == 304
+        time.sleep(0.05)
+        atomic_write_text(p / "_progress.json", '{"phases": {"director": "running"}}')
+        time.sleep(0.7)
+        with urllib.request.urlopen(urllib.request.Request(url, headers={"If-None-Match": etag})) as resp:
+            assert resp.status == 200
+            assert resp.headers["ETag"] != etag
+            assert json.loads(resp.read())["phases"] == {"director": "running"}
+
+
+def test_state_file_cache_serves_unchanged_file_from_memory():
+    from mp_story_monitor.atomic import atomic_write_text
+    from mp_story_monitor.serve_progress import _StateFileCache
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp).resolve()
+        atomic_write_text(p / "_progress.json", "{}")
+        cache = _StateFileCache()
+        first = cache.get(p, "_progress.json")
+        assert cache.get(p, "_progress.json") is first
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.get(p, "_director_progress.json") is None
+
+
+def test_gzip_negotiation():
+    import gzip
+    from mp_story_monitor.atomic import atomic_write_text
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        big = {"scenes": [{"id": f"C01_S{i:02d}", "assets": ["a" * 40]} for i in range(100)]}
+        atomic_write_text(p / "_director_progress.json", json.dumps(big))
+        atomic_write_text(p / "_progress.json", "{}")
+        _start_server(p, 18101)
+        gz = {"Accept-Encoding": "gzip"}
+        for path in ("/_director_progress.json", "/progress_viewer.html"):
+            req = urllib.request.Request(f"http://127.0.0.1:18101{path}", headers=gz)
+            with urllib.request.urlopen(req) as resp:
+                assert resp.headers["Content-Encoding"] == "gzip"
+                assert resp.headers["Vary"] == "Accept-Encoding"
+                body = gzip.decompress(resp.read())
+            if path.endswith(".json"):
+                assert json.loads(body) == big
+        # Small bodies and clients without gzip get identity encoding
+        req = urllib.request.Request("http://127.0.0.1:18101/_progress.json", headers=gz)
+        with urllib.request.urlopen(req) as resp:
+            assert resp.headers["Content-Encoding"] is None
+        with urllib.request.urlopen("http://127.0.0.1:18101/_director_progress.json") as resp:
+            assert resp.headers["Content-Encoding"] is None
+            assert json.loads(resp.read()) == big
+
+
+def test_static_text_files_are_compressed_and_revalidated():
+    import gzip
+    import urllib.error
+    from mp_story_monitor.atomic import atomic_write_text
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        script = "".join(f"console.log({i});\n" for i in range(200))
+        atomic_write_text(p / "app.js", script)
+        atomic_write_text(p / "style.css", "body { margin: 0 }")
+        atomic_write_text(p / "_progress.json", "{}")
+        _start_server(p, 18109)
+        gz = {"Accept-Encoding": "gzip"}
+        req = urllib.request.Request("http://127.0.0.1:18109/app.js", headers=gz)
+        with urllib.request.urlopen(req) as resp:
+            assert resp.headers["Content-Type"] == "text/javascript; charset=utf-8"
+            assert resp.headers["Content-Encoding"] == "gzip"
+            assert resp.headers["Vary"] == "Accept-Encoding"
+            etag = resp.headers["ETag"]
+            assert etag.endswith('-gz"')
+            assert gzip.decompress(resp.read()).decode() == script
+        req = urllib.request.Request("http://127.0.0.1:18109/app.js", headers={**gz, "If-None-Match": etag})
+        try:
+            urllib.request.urlopen(req)
+            assert False, "expected 304"
+        except urllib.error.HTTPError as e:
+            assert e.code == 304
+        # A changed file is re-read; small files go out uncompressed
+        atomic_write_text(p / "app.js", script + "done();\n")
+        with urllib.request.urlopen(urllib.request.Request("http://127.0.0.1:18109/app.js", headers=gz)) as resp:
+            assert resp.headers["ETag"] != etag
+            assert gzip.decompress(resp.read()).decode().endswith("done();\n")
+        with urllib.request.urlopen(urllib.request.Request("http://127.0.0.1:18109/style.css", headers=gz)) as resp:
+            assert resp.headers["Content-Encoding"] is None
+            assert resp.headers["ETag"] is not None
+            assert resp.read() == b"body { margin: 0 }"
+
+
+def test_snapshot_omits_sections_client_already_has():
+    from mp_story_monitor.atomic import atomic_write_text
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        atomic_write_text(p / "_progress.json", '{"phases": {"director": "running"}}')
+        atomic_write_text(p / "_director_progress.json", '{"chapters": []}')
+        _start_server(p, 18102)
+        _post(18102, "/api/reset-asset", {"asset_name": "x"})
+        with urllib.request.urlopen("http://127.0.0.1:18102/api/snapshot") as resp:
+            snap = json.loads(resp.read())
+        assert snap["progress"] == {"phases": {"director": "running"}}
+        assert snap["director"] == {"chapters": []}
+        assert snap["commands"][0]["target"] == "x"
+        versions = snap["versions"]
+        time.sleep(0.05)
+        atomic_write_text(p / "_progress.json", '{"phases": {"director": "done"}}')
+        time.sleep(0.7)
+        query = "&".join(f"{k}={v}" for k, v in versions.items())
+        with urllib.request.urlopen(f"http://127.0.0.1:18102/api/snapshot?{query}") as resp:
+            snap = json.loads(resp.read())
+        assert snap["progress"] == {"phases": {"director": "done"}}
+        assert "director" not in snap and "commands" not in snap
+        assert snap["versions"]["director"] == versions["director"]
+        assert snap["versions"]["progress"] != versions["progress"]
+
+
+def test_media_range_requests():
+    import urllib.error
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        data = bytes(range(256)) * 40
+        (p / "C01_S01").mkdir()
+        (p / "C01_S01" / "clip.mp4").write_bytes(data)
+        _start_server(p, 18103)
+        url = "http://127.0.0.1:18103/C01_S01/clip.mp4"
+        with urllib.request.urlopen(url) as resp:
+            assert resp.headers["Content-Type"] == "video/mp4"
+            assert resp.headers["Accept-Ranges"] == "bytes"
+            etag = resp.headers["ETag"]
+            assert resp.read() == data
+        req = urllib.request.Request(url, headers={"Range": "bytes=100-199"})
+        with urllib.request.urlopen(req) as resp:
+            assert resp.status == 206
+            assert resp.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+            assert resp.read() == data[100:200]
+        req = urllib.request.Request(url, headers={"Range": "bytes=-10"})
+        with urllib.request.urlopen(req) as resp:
+            assert resp.read() == data[-10:]
+        # If-Range with a stale validator sends the whole file
+        req = urllib.request.Request(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        with urllib.request.urlopen(req) as resp:
+            assert resp.status == 200 and len(resp.read()) == len(data)
+        for headers, code in (({"Range": f"bytes={len(data)}-"}, 416), ({"If-None-Match": etag}, 304)):
+            try:
+                urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+                assert False, f"expected {code}"
+            except urllib.error.HTTPError as e:
+                assert e.code == code
+
+
+def test_reset_returns_202_and_job_status():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / "_progress.json").write_text("{}")
+        (p / "test_asset.png").write_bytes(b"fake")
+        _start_server(p, 18104)
+        req = urllib.request.Request(
+            "http://127.0.0.1:18104/api/reset-asset",
+            data=json.dumps({"asset_name": "test_asset"}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req) as resp:
+            assert resp.status == 202
+            result = json.loads(resp.read())
+        assert result["status"] == "pending"
+        deadline = time.time() + 10
+        while True:
+            with urllib.request.urlopen(f"http://127.0.0.1:18104/api/jobs/{result['command_id']}") as resp:
+                job = json.loads(resp.read())
+            if job["status"] == "done" or time.time() > deadline:
+                break
+            time.sleep(0.05)
+        assert job["status"] == "done"
+        assert job["files_deleted"] == 1
+        with urllib.request.urlopen("http://127.0.0.1:18104/api/jobs") as resp:
+            assert [j["command_id"] for j in json.loads(resp.read())["jobs"]] == [result["command_id"]]
+
+
+def test_metrics_endpoint_reports_polls_by_endpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / "_progress.json").write_text('{"phases": {}}')
+        _start_server(p, 18105)
+        for _ in range(3):
+            with urllib.request.urlopen("http://127.0.0.1:18105/_progress.json") as resp:
+                resp.read()
+        with urllib.request.urlopen("http://127.0.0.1:18105/api/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            text = resp.read().decode()
+        assert 'mp_story_monitor_http_requests_total{endpoint="_progress.json",method="GET",status="200"}' in text
+        assert "mp_story_monitor_state_cache_hit_ratio" in text
+        with urllib.request.urlopen("http://127.0.0.1:18105/api/metrics?format=json") as resp:
+            data = json.loads(resp.read())
+        polls = [s for s in data["http_request_duration_seconds"]["series"]
+                 if s["labels"]["endpoint"] == "_progress.json"]
+        assert polls and polls[0]["count"] >= 3 and polls[0]["p99"] is not None
+
+
+def test_post_reset_batch_records_command_and_job_per_target():
+    from mp_story_monitor.commands import read_commands
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / "_progress.json").write_text("{}")
+        scene = p / "Chapter01" / "scene_00"
+        scene.mkdir(parents=True)
+        (scene / "hero.png").write_bytes(b"fake")
+        (scene / "villain.png").write_bytes(b"fake")
+        (scene / "scene_00_wan.mp4").write_bytes(b"fake")
+        _start_server(p, 18106)
+        assert _post(18106, "/api/reset-batch", {"targets": [{"bogus": 1}]})["ok"] is False
+        result = _post(18106, "/api/reset-batch", {"targets": [
+            {"asset_name": "hero"}, {"asset_name": "villain"}, {"scene_id": "C01_S00"},
+        ]})
+        assert result["ok"] is True
+        assert [c["action"] for c in result["commands"]] == ["reset_asset", "reset_asset", "reset_scene"]
+        deadline = time.time() + 10
+        jobs = []
+        while time.time() < deadline:
+            jobs = []
+            for c in result["commands"]:
+                with urllib.request.urlopen(f"http://127.0.0.1:18106/{c['job']}") as resp:
+                    jobs.append(json.loads(resp.read()))
+            if all(j["status"] == "done" for j in jobs):
+                break
+            time.sleep(0.05)
+        assert [j["files_deleted"] for j in jobs] == [1, 1, 1]
+        assert {c.id for c in read_commands(p)} == {c["command_id"] for c in result["commands"]}
+
+
+def test_post_soft_reset_and_undo():
+    from mp_story_monitor.commands import read_commands
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / "_progress.json").write_text("{}")
+        (p / "hero.png").write_bytes(b"fake")
+        _start_server(p, 18107)
+        result = _post(18107, "/api/reset-asset", {"asset_name": "hero", "soft": True})
+        assert result["ok"] is True and result["soft"] is True
+        cid = result["command_id"]
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            with urllib.request.urlopen(f"http://127.0.0.1:18107/api/jobs/{cid}") as resp:
+                if json.loads(resp.read())["status"] == "done":
+                    break
+            time.sleep(0.05)
+        assert not (p / "hero.png").exists()
+        assert (p / ".trash" / cid / "hero.png").exists()
+        with urllib.request.urlopen("http://127.0.0.1:18107/api/trash") as resp:
+            trash = json.loads(resp.read())["trash"]
+        assert [t["trash_id"] for t in trash] == [cid] and trash[0]["files"] == 1
+
+        traversal = _post(18107, "/api/undo-reset", {"command_id": "../../" + p.name})
+        assert traversal["ok"] is False and "Nothing to undo" in traversal["error"]
+        undone = _post(18107, "/api/undo-reset", {"command_id": cid})
+        assert undone == {"ok": True, "command_ids": [cid], "files_restored": 1, "conflicts": []}
+        assert (p / "hero.png").read_bytes() == b"fake"
+        assert [c.status for c in read_commands(p) if c.id == cid] == ["undone"]
+        assert _post(18107, "/api/undo-reset", {"command_id": cid})["ok"] is False
+
+
+def test_story_watchers_are_bounded():
+    from mp_story_monitor import serve_progress as sp
+
+    old_max = sp.WATCHED_STORIES_MAX
+    sp.WATCHED_STORIES_MAX = 2
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            stories = []
+            for i in range(4):
+                p = Path(tmp) / f"story{i}"
+                p.mkdir()
+                (p / "_progress.json").write_text(f'{{"i": {i}}}')
+                stories.append(p)
+            watchers = []
+            for p in stories:
+                assert sp._state_file_cache.get(p, "_progress.json").body == f'{{"i": {stories.index(p)}}}'.encode()
+                watchers.append(sp._watchers[p])
+            assert len(sp._watchers) <= 2
+            assert list(sp._watchers)[-1] == stories[-1]
+            assert not watchers[0]._thread.is_alive()
+            # An evicted story gets a fresh watcher and re-reads its files
+            (stories[0] / "_progress.json").write_text('{"i": "new"}')
+            assert sp._state_file_cache.get(stories[0], "_progress.json").body == b'{"i": "new"}'
+    finally:
+        sp.WATCHED_STORIES_MAX = old_max
+
+
+def test_state_cache_sees_writes_the_watcher_misses():
+    from mp_story_monitor import serve_progress as sp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / "_progress.json").write_text('{"v": 1}')
+        assert sp._state_file_cache.get(p, "_progress.json").body == b'{"v": 1}'
+        # A silent watcher, as for a write made by another NFS client
+        sp._watchers[p].close()
+        (p / "_progress.json.tmp").write_text('{"v": 22}')
+        os.replace(p / "_progress.json.tmp", p / "_progress.json")
+        assert sp._state_file_cache.get(p, "_progress.json").body == b'{"v": 22}'
+        (p / "_progress.json").unlink()
+        assert sp._state_file_cache.get(p, "_progress.json") is None
+
+
+def test_stream_subscribers_are_capped():
+    import urllib.error
+    from mp_story_monitor import serve_progress as sp
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / "_progress.json").write_text("{}")
+        # Streams left open by other tests in this process count too
+        already_open = sum(hub.streams for hub in sp._stream_hubs.values())
+        threading.Thread(
+            target=sp.serve, args=(p, 18108), kwargs={"max_streams": already_open + 1}, daemon=True
+        ).start()
+        time.sleep(0.5)
+        first = urllib.request.urlopen("http://127.0.0.1:18108/api/stream", timeout=10)
+        assert first.readline() == b"retry: 2000\n"
+        try:
+            urllib.request.urlopen("http://127.0.0.1:18108/api/stream", timeout=10)
+            assert False, "expected 503"
+        except urllib.error.HTTPError as e:
+            assert e.code == 503
+            assert e.headers["Retry-After"] == "5"
+        # Other requests are unaffected
+        with urllib.request.urlopen("http://127.0.0.1:18108/_progress.json") as r:
+            assert r.status == 200
+        first.close()
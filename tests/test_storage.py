@@ -0,0 +1,111 @@
+import tempfile
+import time
+from pathlib import Path
+
+from mp_story_monitor.storage import (
+    FileProgressStore,
+    MemoryProgressStore,
+    SQLiteProgressStore,
+    progress_status,
+)
+from mp_story_monitor.tracker import ProgressTracker, PROGRESS_JSON_FILENAME, check_stale
+
+
+def test_progress_status():
+    assert progress_status({"phases": {"a": "done", "b": "running"}}) == "running"
+    assert progress_status({"phases": {"a": "done", "b": "skipped"}}) == "complete"
+    assert progress_status({"phases": {"a": "done"}, "error": "boom"}) == "error"
+    assert progress_status({"phases": {"a": "pending"}}) == "pending"
+
+
+def test_tracker_with_memory_store_writes_no_progress_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        store = MemoryProgressStore()
+        tracker = ProgressTracker(p, store=store)
+        tracker.start("production")
+        tracker.set_phase_progress("production", 2, 4)
+        assert not (p / PROGRESS_JSON_FILENAME).exists()
+        assert store.read(p)["phase_progress"]["production"] == {"complete": 2, "total": 4}
+        assert [s.status for s in store.list_stories()] == ["running"]
+        tracker.error("production", "boom")
+        assert store.read(p)["error"] == "boom"
+        tracker.complete()
+
+
+def test_check_stale_uses_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        store = MemoryProgressStore()
+        store.write(p, {"pid": 2 ** 22 + 12345, "phases": {"production": "running"}})
+        assert check_stale(p, store=store) is True
+        assert store.read(p)["phases"]["production"] == "error"
+
+
+def test_sqlite_store_fleet_queries():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = SQLiteProgressStore(root / "progress.db")
+        trackers = []
+        for i in range(5):
+            story = root / f"story_{i}"
+            story.mkdir()
+            t = ProgressTracker(story, store=store)
+            t.start("production")
+            trackers.append(t)
+        trackers[0].complete()
+        running = store.list_stories(status="running")
+        assert len(running) == 4
+        assert store.list_stories(status="complete")[0].story_path == str((root / "story_0").resolve())
+        assert store.stale_stories(older_than_sec=600) == []
+        time.sleep(0.05)
+        assert len(store.stale_stories(older_than_sec=0.01)) == 4
+        plan = store._conn().execute(
+            "EXPLAIN QUERY PLAN SELECT story_path FROM progress WHERE status = ? AND updated_ts < ?",
+            ("running", 0),
+        ).fetchall()
+        assert "idx_progress_status_updated" in str(plan)
+        for t in trackers[1:]:
+            t.complete()
+
+
+def test_file_store_lists_story_folders():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for i in range(3):
+            story = root / f"story_{i}"
+            story.mkdir()
+            ProgressTracker(story).set_phase_progress("production", 0, 1)
+        (root / "not_a_story").mkdir()
+        assert len(FileProgressStore(root).list_stories()) == 3
+
+
+def test_progress_store_is_abstract():
+    import pytest
+    from mp_story_monitor.storage import ProgressStore
+
+    with pytest.raises(TypeError):
+        ProgressStore()
+
+
+def test_sqlite_store_closes_thread_connections():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = SQLiteProgressStore(root / "progress.db")
+        story = root / "story"
+        worker = threading.Thread(target=store.write, args=(story, {"phases": {"production": "running"}}))
+        worker.start()
+        worker.join()
+        assert len(store._conns) == 2
+        # The next connection opened reaps the exited thread's one
+        reader = threading.Thread(target=store.read, args=(story,))
+        reader.start()
+        reader.join()
+        assert worker not in [owner for owner, _ in store._conns.values()]
+        store.close()
+        assert store._conns == {}
+        # Usable again after close()
+        assert store.read(story)["phases"] == {"production": "running"}
+        store.close()
@@ -0,0 +1,165 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from mp_story_monitor.tracker import ProgressTracker, PROGRESS_JSON_FILENAME
+
+
+def _read_progress(path: Path) -> dict:
+    return json.loads((path / PROGRESS_JSON_FILENAME).read_text())
+
+
+def test_set_phase_progress_writes_immediately_by_default():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p)
+        tracker.set_phase_progress("production", 3, 10)
+        assert _read_progress(p)["phase_progress"]["production"] == {"complete": 3, "total": 10}
+        assert tracker.updates_received == 1
+        assert tracker.writes_performed == 1
+
+
+def test_coalesced_updates_are_batched():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, coalesce_writes=True, max_write_latency=0.05)
+        for i in range(1, 1001):
+            tracker.set_phase_progress("production", i, 1000)
+        assert tracker.updates_received == 1000
+        assert tracker.writes_performed < 10
+        time.sleep(0.3)
+        assert _read_progress(p)["phase_progress"]["production"]["complete"] == 1000
+
+
+def test_explicit_flush_and_complete_persist_pending_updates():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, coalesce_writes=True, max_write_latency=60)
+        tracker.set_phase_progress("production", 1, 5)
+        assert not (p / PROGRESS_JSON_FILENAME).exists()
+        tracker.flush()
+        assert _read_progress(p)["phase_progress"]["production"]["complete"] == 1
+        tracker.set_phase_progress("production", 5, 5)
+        tracker.complete()
+        assert _read_progress(p)["phase_progress"]["production"]["complete"] == 5
+
+
+def test_snapshot_version_increases_across_trackers():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p)
+        tracker.set_phase_progress("production", 1, 2)
+        tracker.set_phase_progress("production", 2, 2)
+        first = _read_progress(p)["version"]
+        assert first == 2
+        ProgressTracker(p).set_phase_progress("production", 2, 2)
+        assert _read_progress(p)["version"] == first + 1
+        # Atomic publish leaves no temp files behind
+        assert sorted(f.name for f in p.iterdir()) == [PROGRESS_JSON_FILENAME]
+
+
+def test_write_progress_error_bumps_version():
+    from mp_story_monitor.tracker import write_progress_error
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p)
+        tracker.set_phase_progress("production", 1, 2)
+        tracker.error("production", "boom")
+        data = _read_progress(p)
+        assert data["error"] == "boom"
+        version = data["version"]
+        tracker.set_phase_progress("production", 2, 2)
+        assert _read_progress(p)["version"] > version
+        write_progress_error(p, "again")
+        assert _read_progress(p)["version"] > version + 1
+
+
+def test_start_after_stale_run_does_not_reuse_version():
+    import subprocess
+    import sys
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        (p / PROGRESS_JSON_FILENAME).write_text(json.dumps({
+            "version": 5, "pid": dead.pid, "phases": {"production": "running"},
+        }))
+        tracker = ProgressTracker(p)
+        tracker.start("production")
+        tracker._stop_heartbeat()
+        # check_stale published 6 for its error snapshot, the tracker's own write is 7
+        assert _read_progress(p)["version"] == 7
+
+
+def test_error_persists_pending_updates_and_stops_flusher():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, coalesce_writes=True, max_write_latency=60)
+        tracker.advance("production", 3)
+        flusher = tracker._flusher_thread
+        tracker.error("production", "boom")
+        data = _read_progress(p)
+        assert data["error"] == "boom"
+        assert data["phase_progress"]["production"]["complete"] == 3
+        flusher.join(timeout=2)
+        assert not flusher.is_alive()
+        # Later coalesced updates start a new flusher instead of hitting a stale pending flag
+        tracker.max_write_latency = 0.1
+        tracker.advance("production", 2)
+        deadline = time.monotonic() + 2
+        while _read_progress(p)["phase_progress"]["production"]["complete"] != 5:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+
+def test_advance_from_many_threads_loses_no_updates():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p, max_write_latency=0.02)
+        tracker.add_total("production", 8000)
+
+        def worker():
+            for _ in range(1000):
+                tracker.advance("production")
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        tracker.flush()
+        assert _read_progress(p)["phase_progress"]["production"] == {"complete": 8000, "total": 8000}
+        assert tracker.updates_received == 8001
+        assert tracker.writes_performed < 1000
+
+
+def test_exited_threads_shards_are_folded_into_the_base():
+    import threading
+
+    from mp_story_monitor.counters import ShardedCounters
+
+    counters = ShardedCounters()
+    counters.add("production", total=100)
+    for _ in range(50):
+        t = threading.Thread(target=counters.add, args=("production",), kwargs={"complete": 2})
+        t.start()
+        t.join()
+    assert counters.totals() == {"production": (100, 100)}
+    assert counters.operations() == 51
+    assert len(counters._shards) == 1  # only this thread's
+
+
+def test_set_phase_progress_resets_base_for_advance():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        tracker = ProgressTracker(p)
+        tracker.advance("production", 3)
+        tracker.set_phase_progress("production", 10, 20)
+        tracker.advance("production", 2)
+        tracker.flush()
+        assert _read_progress(p)["phase_progress"]["production"] == {"complete": 12, "total": 20}
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from mp_story_monitor.reset import delete_asset_outputs, reset_batch, reset_scene
+from mp_story_monitor.trash import (
+    TRASH_DIRNAME, TrashReaper, list_trash, purge_trash, undo_trash,
+)
+
+
+def _story(tmp: str) -> Path:
+    p = Path(tmp)
+    scene = p / "Chapter01" / "scene_00"
+    scene.mkdir(parents=True)
+    for name in ("hero.png", "hero_narration.mp3", "scene_00_wan.mp4"):
+        (scene / name).write_bytes(b"fake")
+    other = p / "Chapter01" / "scene_01"
+    other.mkdir()
+    (other / "villain.png").write_bytes(b"fake")
+    (other / "scene.json").write_text("{}")
+    (p / "final_stitched_v1.mp4").write_bytes(b"fake")
+    return p
+
+
+def test_soft_scene_reset_moves_whole_directory_and_undo_restores_it():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        scene = p / "Chapter01" / "scene_00"
+        inode = os.stat(scene).st_ino
+        assert reset_scene(p, "C01_S00", trash_id="cmd_1") == 4
+        assert scene.is_dir() and not any(scene.iterdir())
+        tomb = p / TRASH_DIRNAME / "cmd_1"
+        assert os.stat(tomb / "Chapter01" / "scene_00").st_ino == inode  # renamed, not copied
+        manifest = json.loads((tomb / "_manifest.json").read_text())
+        assert manifest["files"] == 4
+        assert {e["kind"] for e in manifest["entries"]} == {"dir", "file"}
+
+        restored, conflicts = undo_trash(p, "cmd_1")
+        assert (restored, conflicts) == (4, [])
+        assert sorted(f.name for f in scene.iterdir()) == ["hero.png", "hero_narration.mp3", "scene_00_wan.mp4"]
+        assert (p / "final_stitched_v1.mp4").exists()
+        assert not tomb.exists()
+        assert undo_trash(p, "cmd_1") is None
+
+
+def test_soft_reset_keeps_non_output_files_and_reports_conflicts():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        assert delete_asset_outputs(p, "villain", trash_id="cmd_2") == 1
+        other = p / "Chapter01" / "scene_01"
+        assert sorted(f.name for f in other.iterdir()) == ["scene.json"]
+        (other / "villain.png").write_bytes(b"regenerated")
+        restored, conflicts = undo_trash(p, "cmd_2")
+        assert restored == 0 and conflicts == ["Chapter01/scene_01/villain.png"]
+        assert (other / "villain.png").read_bytes() == b"regenerated"
+
+
+def test_batch_shares_one_tombstone_and_walks_skip_trash():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        counts = reset_batch(p, [("asset", "hero"), ("asset", "villain")], trash_id="cmd_a", command_ids=["cmd_a", "cmd_b"])
+        assert counts == [2, 1]
+        assert list_trash(p)[0]["command_ids"] == ["cmd_a", "cmd_b"]
+        # The trashed copies are not found by later resets
+        assert delete_asset_outputs(p, "hero") == 0
+        restored, _ = undo_trash(p, "cmd_b")
+        assert restored == 3
+
+
+def test_purge_and_reaper_remove_expired_tombstones():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        reset_scene(p, "C01_S00", trash_id="old")
+        delete_asset_outputs(p, "villain", trash_id="new")
+        assert purge_trash(p, retention_sec=3600) == 0
+        assert purge_trash(p, retention_sec=3600, now=time.time() + 7200) == 2
+        assert list_trash(p) == []
+        (p / "Chapter01" / "scene_01" / "villain.png").write_bytes(b"again")
+        assert reset_scene(p, "C01_S01", trash_id="again") == 1
+        assert TrashReaper(lambda: [p], retention_sec=0).reap() == 1
+
+
+def test_undo_rejects_ids_outside_the_trash():
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp) / "story"
+        p.mkdir()
+        _story(str(p))
+        other = Path(tmp) / "other"
+        other.mkdir()
+        (other / "keep.png").write_bytes(b"mine")
+        reset_scene(p, "C01_S00", trash_id="cmd_1")
+        for bad in ("../../other", "../cmd_1", "..", ".hidden", "cmd_1/..", "a\\b", ""):
+            assert undo_trash(p, bad) is None
+        assert (other / "keep.png").read_bytes() == b"mine"
+        (p / TRASH_DIRNAME / "escape").symlink_to(other)
+        assert undo_trash(p, "escape") is None
+        assert (other / "keep.png").exists()
+
+
+def test_move_dir_puts_back_files_written_after_the_plan():
+    from mp_story_monitor.trash import TrashBatch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p = _story(tmp)
+        scene = p / "Chapter01" / "scene_00"
+        # scene_00_wan.mp4 stands in for a file the pipeline wrote after the reset listed the directory
+        batch = TrashBatch(p, "cmd_1")
+        batch.move_dir(scene, ["hero.png", "hero_narration.mp3"])
+        batch.commit()
+        assert sorted(f.name for f in scene.iterdir()) == ["scene_00_wan.mp4"]
+        tomb = p / TRASH_DIRNAME / "cmd_1" / "Chapter01" / "scene_00"
+        assert sorted(f.name for f in tomb.iterdir()) == ["hero.png", "hero_narration.mp3"]
+        assert list_trash(p)[0]["files"] == 2
+        assert undo_trash(p, "cmd_1") == (2, [])
+        assert sorted(f.name for f in scene.iterdir()) == ["hero.png", "hero_narration.mp3", "scene_00_wan.mp4"]
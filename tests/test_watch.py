@@ -0,0 +1,34 @@
+"""Tests for FileWatcher change notification."""
+import tempfile
+import time
+from pathlib import Path
+
+from mp_story_monitor.atomic import atomic_write_text
+from mp_story_monitor.watch import FileWatcher
+
+
+def _check_watcher(use_inotify):
+    with tempfile.TemporaryDirectory() as tmp:
+        p = Path(tmp)
+        watcher = FileWatcher(p, ["_progress.json"], poll_interval=0.05, use_inotify=use_inotify)
+        try:
+            time.sleep(0.1)
+            assert watcher.generation == 0
+            atomic_write_text(p / "_progress.json", "{}")
+            generation = watcher.wait(0, timeout=5)
+            assert generation > 0
+            assert watcher.changed_since(0) == ["_progress.json"]
+            # Unwatched files do not bump the generation
+            (p / "other.txt").write_text("x")
+            assert watcher.wait(generation, timeout=0.3) == generation
+        finally:
+            watcher.close()
+        return watcher.backend
+
+
+def test_poll_backend_detects_atomic_replace():
+    assert _check_watcher(use_inotify=False) == "poll"
+
+
+def test_default_backend_detects_atomic_replace():
+    assert _check_watcher(use_inotify=None) in ("inotify", "poll")